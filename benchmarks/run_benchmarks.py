@@ -0,0 +1,373 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.stubs import StubNlp, StubSentimentPipeline
+from benchmarks.synthetic import generate_reviews
+from src.instrumentation import peak_rss_mb
+from src.review_preprocessor import ReviewPreprocessor
+from src.review_store import CsvReviewStore, get_store
+
+# name -> setup(context) returning a zero-argument callable to time
+BENCHMARKS = {}
+
+# Bank keys of the synthetic corpus -> bank names in the Banks table
+DB_BANK_NAMES = {'cbe': 'CBE', 'boe': 'BOE', 'dashen': 'Dashen'}
+
+
+def benchmark(name):
+    """Register a benchmark setup function under name"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class BenchmarkContext:
+    def __init__(self, rows, seed, work_dir):
+        """
+        Shared inputs for one harness run
+
+        Args:
+            rows (int): Synthetic reviews to generate
+            seed (int): Generator seed
+            work_dir (str): Scratch directory for files the benchmarks write
+        """
+        self.rows = rows
+        self.seed = seed
+        self.work_dir = work_dir
+        self.raw = generate_reviews(rows, seed=seed)
+        self._processed = None
+        self._analyzed_path = None
+
+    @property
+    def processed(self):
+        """Cleaned and deduplicated corpus, built on first use"""
+        if self._processed is None:
+            self._processed = ReviewPreprocessor().process_reviews(self.raw.copy())
+        return self._processed
+
+    def path(self, name):
+        """Path of a scratch file"""
+        return os.path.join(self.work_dir, name)
+
+    def directory(self, name):
+        """Scratch directory, created on first use"""
+        path = os.path.join(self.work_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @property
+    def analyzed_path(self):
+        """Analyzed-reviews CSV scored with the stub model, built on first use"""
+        if self._analyzed_path is None:
+            from src.sentiment_analyzer import SentimentAnalyzer
+            analyzed, _ = SentimentAnalyzer(analyzer=StubSentimentPipeline()).analyze_reviews(self.processed.copy())
+            self._analyzed_path = self.path('analyzed_reviews.csv')
+            analyzed.to_csv(self._analyzed_path, index=False)
+        return self._analyzed_path
+
+
+@benchmark('clean_review')
+def bench_clean_review(ctx):
+    preprocessor = ReviewPreprocessor()
+    texts = ctx.raw['review'].tolist()
+    return lambda: [preprocessor.clean_review(text) for text in texts]
+
+
+@benchmark('clean_reviews')
+def bench_clean_reviews(ctx):
+    preprocessor = ReviewPreprocessor()
+    texts = ctx.raw['review']
+    return lambda: preprocessor.clean_reviews(texts)
+
+
+@benchmark('process_reviews')
+def bench_process_reviews(ctx):
+    preprocessor = ReviewPreprocessor()
+    return lambda: preprocessor.process_reviews(ctx.raw.copy())
+
+
+@benchmark('near_duplicates')
+def bench_near_duplicates(ctx):
+    preprocessor = ReviewPreprocessor()
+    return lambda: preprocessor.assign_clusters(ctx.processed)
+
+
+@benchmark('load_data_csv')
+def bench_load_data_csv(ctx):
+    store = CsvReviewStore(ctx.directory('csv_store'))
+    store.write(ctx.processed, 'processed')
+    return lambda: ReviewPreprocessor(store=store).load_data()
+
+
+@benchmark('load_data_parquet')
+def bench_load_data_parquet(ctx):
+    store = get_store('parquet', ctx.directory('parquet_store'))
+    store.write(ctx.processed, 'processed')
+    return lambda: ReviewPreprocessor(store=store).load_data()
+
+
+@benchmark('sentiment')
+def bench_sentiment(ctx):
+    from src.sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer(batch_size=64, analyzer=StubSentimentPipeline())
+    return lambda: analyzer.analyze_reviews(ctx.processed.copy())
+
+
+@benchmark('themes')
+def bench_themes(ctx):
+    from src.theme_analyzer import ThemeAnalyzer
+    analyzer = ThemeAnalyzer(nlp=StubNlp())
+    return lambda: analyzer.identify_themes(ctx.processed.copy())
+
+
+@benchmark('theme_model')
+def bench_theme_model(ctx):
+    from src.theme_model import IncrementalThemeModel
+    texts = ctx.processed['review_text'].tolist()
+    banks = ctx.processed['bank_name'].astype(str).tolist()
+    return lambda: IncrementalThemeModel().partial_fit(texts, banks).top_keywords()
+
+
+@benchmark('aggregates')
+def bench_aggregates(ctx):
+    from src.aggregates import AggregateCube
+    analyzed = pd.read_csv(ctx.analyzed_path)
+    return lambda: AggregateCube.from_frame(analyzed).daily_sentiment(days=7)
+
+
+@benchmark('search')
+def bench_search(ctx):
+    from src.search_index import ReviewSearchIndex
+    search_index = ReviewSearchIndex(os.path.join(ctx.directory('search'), 'index.sqlite'))
+    search_index.add(pd.read_csv(ctx.analyzed_path))
+
+    def queries():
+        search_index.search('login otp')
+        search_index.search('app', bank='dashen', ratings=[1, 2], label='NEGATIVE')
+        search_index.search('transfer', start='2024-01-01', end='2024-01-31')
+    return queries
+
+
+@benchmark('drift')
+def bench_drift(ctx):
+    from src.drift_monitor import DriftMonitor
+    analyzed = pd.read_csv(ctx.analyzed_path)
+    chunks = [analyzed.iloc[start:start + 500] for start in range(0, len(analyzed), 500)]
+
+    def observe():
+        monitor = DriftMonitor(min_reviews=50)
+        for chunk in chunks:
+            monitor.observe(chunk)
+        return monitor.close_days()
+    return observe
+
+
+@benchmark('db_insert')
+def bench_db_insert(ctx):
+    from scripts.database_setup import SQLiteConnectionManager, create_tables, insert_banks, load_reviews
+
+    input_dir = ctx.directory('db_input')
+    store = CsvReviewStore(input_dir)
+    store.write(ctx.processed, 'processed')
+    review_files = {
+        DB_BANK_NAMES[bank]: os.path.join(input_dir, 'processed', f'{bank}_review.csv')
+        for bank in store.banks('processed')
+    }
+
+    def run():
+        db_path = ctx.path('db_insert.sqlite')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        manager = SQLiteConnectionManager(db_path)
+        try:
+            with manager.connection() as connection:
+                create_tables(connection, manager.dialect)
+                insert_banks(connection, manager.dialect)
+            return load_reviews(manager, review_files)
+        finally:
+            manager.close()
+    return run
+
+
+@benchmark('db_sync')
+def bench_db_sync(ctx):
+    from scripts.database_setup import SQLiteConnectionManager, SQLiteDialect, create_tables, sync_analyzed_reviews
+    analyzed_path = ctx.analyzed_path
+
+    def run():
+        db_path = ctx.path('db_sync.sqlite')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        manager = SQLiteConnectionManager(db_path)
+        try:
+            with manager.connection() as connection:
+                create_tables(connection, SQLiteDialect)
+                return sync_analyzed_reviews(connection, analyzed_path, SQLiteDialect)
+        finally:
+            manager.close()
+    return run
+
+
+def run_benchmarks(rows=10000, seed=0, repeat=3, only=None, work_dir=None):
+    """
+    Run the registered benchmarks on a synthetic corpus
+
+    Args:
+        rows (int): Synthetic reviews to generate
+        seed (int): Generator seed
+        repeat (int): Timed runs per benchmark; the median is reported
+        only (list): Benchmark names to run (None for all)
+        work_dir (str): Scratch directory (a temporary one by default)
+
+    Returns:
+        dict: {'meta': run settings and environment, 'results': name -> timings}
+    """
+    names = list(only or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    owns_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='review-bench-')
+    results = {}
+    try:
+        ctx = BenchmarkContext(rows, seed, work_dir)
+        for name in names:
+            try:
+                # The DB loaders print progress; keep it out of the results table
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn = BENCHMARKS[name](ctx)
+                    # One untimed warm-up run absorbs lazy imports and caches
+                    fn()
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        fn()
+                        timings.append(time.perf_counter() - start)
+            except ImportError as e:
+                logging.warning(f"Skipping benchmark {name}: {str(e)}")
+                results[name] = {'skipped': str(e)}
+                continue
+            median = statistics.median(timings)
+            results[name] = {
+                'rows': rows,
+                'repeat': repeat,
+                'median_seconds': round(median, 6),
+                'min_seconds': round(min(timings), 6),
+                'rows_per_second': round(rows / median, 1) if median > 0 else None,
+                'peak_rss_mb': peak_rss_mb()
+            }
+            print(f"{name:<20} {median:>10.4f}s  {results[name]['rows_per_second'] or 0:>14,.0f} rows/s")
+    finally:
+        if owns_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'rows': rows,
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, tolerance=0.2):
+    """
+    Compare median timings against a saved baseline
+
+    A benchmark regresses when its median is more than tolerance slower
+    than the baseline's; results for a different corpus size are not compared.
+
+    Args:
+        current (dict): run_benchmarks output
+        baseline (dict): Earlier run_benchmarks output
+        tolerance (float): Allowed slowdown as a fraction
+
+    Returns:
+        list: One dict per benchmark with name, status and ratio
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if 'median_seconds' not in result:
+            status, ratio = 'skipped', None
+        elif not base or 'median_seconds' not in base:
+            status, ratio = 'new', None
+        elif base['rows'] != result['rows']:
+            status, ratio = 'incomparable', None
+        else:
+            ratio = result['median_seconds'] / base['median_seconds'] if base['median_seconds'] else None
+            if ratio is None:
+                status = 'incomparable'
+            elif ratio > 1 + tolerance:
+                status = 'regression'
+            elif ratio < 1 / (1 + tolerance):
+                status = 'improvement'
+            else:
+                status = 'ok'
+        rows.append({'name': name, 'status': status, 'ratio': round(ratio, 3) if ratio else None})
+    return rows
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def parse_args(argv=None):
+    """Command-line options for the benchmark harness"""
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks on a synthetic review corpus")
+    parser.add_argument('--rows', type=int, default=10000, help="Synthetic reviews (1k to 10M)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--only', help="Comma-separated benchmark names")
+    parser.add_argument('--output', default='benchmarks/results/latest.json', help="Results JSON")
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', help="Also save these results as a baseline here")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before a regression")
+    parser.add_argument('--work-dir', help="Keep generated files here instead of a temporary directory")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    only = args.only.split(',') if args.only else None
+    current = run_benchmarks(args.rows, args.seed, args.repeat, only, args.work_dir)
+
+    _write_json(args.output, current)
+    if args.save_baseline:
+        _write_json(args.save_baseline, current)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            comparison = compare(current, json.load(f), args.tolerance)
+        current['comparison'] = comparison
+        _write_json(args.output, current)
+        for row in comparison:
+            ratio = f"{row['ratio']:.2f}x" if row['ratio'] else '-'
+            print(f"{row['name']:<20} {row['status']:<13} {ratio}")
+        if any(row['status'] == 'regression' for row in comparison):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
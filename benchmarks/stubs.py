@@ -0,0 +1,55 @@
+import re
+
+POSITIVE_WORDS = {'great', 'excellent', 'love', 'good', 'best', 'well', 'nice', 'fast', 'easy', 'thank'}
+NEGATIVE_WORDS = {'worst', 'slow', 'terrible', 'useless', 'crashing', 'not', 'disappointed', 'fix'}
+STOP_WORDS = {'the', 'a', 'an', 'is', 'it', 'i', 'this', 'with', 'for', 'on', 'my', 'and', 'when',
+              'after', 'during', 'using', 'every', 'since', 'could', 'be', 'very'}
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class StubSentimentPipeline:
+    """
+    Lexicon scorer with the call signature of a transformers sentiment pipeline
+
+    Stands in for DistilBERT so sentiment benchmarks run offline; it measures
+    the batching, caching and DataFrame plumbing around the model, not the
+    model itself.
+    """
+
+    def __call__(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        results = []
+        for text in [texts] if single else texts:
+            words = text.lower().split()
+            score = sum(w in POSITIVE_WORDS for w in words) - sum(w in NEGATIVE_WORDS for w in words)
+            label = 'POSITIVE' if score >= 0 else 'NEGATIVE'
+            results.append({'label': label, 'score': min(0.99, 0.6 + 0.1 * abs(score))})
+        return results
+
+
+class StubToken:
+    __slots__ = ('text', 'pos_', 'is_stop')
+
+    def __init__(self, text):
+        lowered = text.lower()
+        self.text = text
+        self.is_stop = lowered in STOP_WORDS
+        if not text[0].isalnum():
+            self.pos_ = 'PUNCT'
+        elif lowered in POSITIVE_WORDS or lowered in NEGATIVE_WORDS:
+            self.pos_ = 'ADJ'
+        else:
+            self.pos_ = 'NOUN'
+
+
+class StubNlp:
+    """Regex tokenizer with the __call__/pipe interface ThemeAnalyzer uses from spaCy"""
+
+    def __call__(self, text):
+        if not isinstance(text, str):
+            raise TypeError("text must be str")
+        return [StubToken(word) for word in _WORD_RE.findall(text)]
+
+    def pipe(self, texts, batch_size=1, n_process=1):
+        for text in texts:
+            yield self(text)
@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pandas as pd
+
+BANKS = ('cbe', 'boe', 'dashen')
+
+# Sentence pieces by sentiment; ratings pick the mood, so text and rating agree
+OPENERS = {
+    'positive': ["Great app", "Excellent service", "I love this app", "Very good", "Best banking app",
+                 "Works well", "Nice update", "Fast and easy"],
+    'neutral': ["It is okay", "Average app", "Not bad", "Decent", "Could be better", "Works sometimes"],
+    'negative': ["Worst app ever", "Very slow", "Terrible experience", "Useless", "Keeps crashing",
+                 "Not working", "Disappointed"]
+}
+TOPICS = ["login", "password reset", "money transfer", "payment", "balance check", "airtime purchase",
+          "statement download", "OTP code", "customer support", "account registration", "the new update",
+          "screen design", "transaction history", "bill payment", "fingerprint login"]
+CLOSERS = ["", "", "!", "!!", " please fix it.", " thank you.", " 👍", " 😡", " since yesterday.",
+           " every time.", " on my phone.", " ...", " 5 stars", " ቆንጆ ነው"]
+CONNECTORS = [" with ", " for ", " when using ", " after ", " during "]
+
+
+def _mood(ratings):
+    return np.where(ratings >= 4, 'positive', np.where(ratings == 3, 'neutral', 'negative'))
+
+
+def generate_reviews(n, seed=0, start_date='2023-01-01', days=365, duplicate_rate=0.05, banks=BANKS):
+    """
+    Seeded synthetic reviews in the scraper's review/rating/date/bank/source layout
+
+    Texts are built from sentiment-matched phrase pieces with punctuation,
+    emoji and occasional Amharic, ratings skew towards 5 and 1 like real
+    Play Store reviews, and duplicate_rate of the rows repeat an earlier
+    review of the same bank.
+
+    Args:
+        n (int): Number of reviews
+        seed (int): Random seed; equal seeds give identical frames
+        start_date (str): First review date
+        days (int): Dates are spread over this many days
+        duplicate_rate (float): Share of rows copied from earlier rows
+        banks (tuple): Bank keys
+
+    Returns:
+        pd.DataFrame: review, rating, date, bank, source
+    """
+    rng = np.random.default_rng(seed)
+    ratings = rng.choice([1, 2, 3, 4, 5], size=n, p=[0.25, 0.07, 0.08, 0.12, 0.48])
+    moods = _mood(ratings)
+
+    texts = np.empty(n, dtype=object)
+    for mood, openers in OPENERS.items():
+        rows = np.flatnonzero(moods == mood)
+        if len(rows) == 0:
+            continue
+        openers = np.array(openers, dtype=object)
+        texts[rows] = (openers[rng.integers(0, len(openers), len(rows))]
+                       + np.array(CONNECTORS, dtype=object)[rng.integers(0, len(CONNECTORS), len(rows))]
+                       + np.array(TOPICS, dtype=object)[rng.integers(0, len(TOPICS), len(rows))]
+                       + np.array(CLOSERS, dtype=object)[rng.integers(0, len(CLOSERS), len(rows))])
+
+    bank = np.array(banks, dtype=object)[rng.integers(0, len(banks), n)]
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(rng.integers(0, days, n), unit='D')
+
+    # Repeat earlier reviews (text and rating) within the same bank
+    duplicates = np.flatnonzero(rng.random(n) < duplicate_rate)
+    duplicates = duplicates[duplicates > 0]
+    sources = (rng.random(len(duplicates)) * duplicates).astype(np.int64)
+    texts[duplicates] = texts[sources]
+    ratings[duplicates] = ratings[sources]
+    bank[duplicates] = bank[sources]
+
+    return pd.DataFrame({
+        'review': texts,
+        'rating': ratings,
+        'date': dates.strftime('%Y-%m-%d'),
+        'bank': bank,
+        'source': 'google_play'
+    })
+
+
+def iter_reviews(n, seed=0, chunk_size=1000000, **kwargs):
+    """
+    Generate n reviews in chunks so 10M-row corpora never sit in memory at once
+
+    Each chunk uses its own derived seed, so the sequence is reproducible.
+
+    Yields:
+        pd.DataFrame: Up to chunk_size reviews
+    """
+    for index, start in enumerate(range(0, n, chunk_size)):
+        yield generate_reviews(min(chunk_size, n - start), seed=seed * 100003 + index, **kwargs)
+
+
+def write_raw_csvs(raw_dir, n, seed=0, chunk_size=1000000):
+    """
+    Write a synthetic corpus as {bank}_review.csv files, like the scraper's raw output
+
+    Returns:
+        dict: Bank -> CSV path
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    paths = {bank: os.path.join(raw_dir, f'{bank}_review.csv') for bank in BANKS}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+    for chunk in iter_reviews(n, seed=seed, chunk_size=chunk_size):
+        for bank, bank_df in chunk.groupby('bank'):
+            path = paths[bank]
+            bank_df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+    return paths
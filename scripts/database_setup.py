@@ -1,10 +1,267 @@
+import sqlite3
+import time
+from contextlib import contextmanager
 import pandas as pd
 import oracledb
+from src.instrumentation import instrumented, metrics
+from src.review_preprocessor import ReviewPreprocessor
+from src.sentiment_analyzer import ANALYZED_AT
 
 # Database configuration
-USERNAME = 'wonde'  
-PASSWORD = '1234'   
-DSN = 'localhost/XEPDB1'   
+USERNAME = 'wonde'
+PASSWORD = '1234'
+DSN = 'localhost/XEPDB1'
+
+# Strings up to this many bytes bind as VARCHAR2; a batch with a longer
+# review text binds review_text as a CLOB (see prepare_upsert_batch)
+MAX_VARCHAR_BIND = 4000
+
+# keywords is a VARCHAR2(4000) column; 1000 characters stay within 4000 bytes of UTF-8
+MAX_KEYWORDS_CHARS = 1000
+
+
+class OracleDialect:
+    """SQL and bind settings for the Oracle schema"""
+    error = oracledb.DatabaseError
+
+    create_banks_sql = """
+    CREATE TABLE Banks (
+        bank_id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        bank_name VARCHAR2(50) NOT NULL
+    )
+    """
+    create_reviews_sql = """
+    CREATE TABLE Reviews (
+        review_id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        review_text CLOB,
+        rating NUMBER,
+        review_date DATE,
+        bank_id NUMBER,
+        content_hash VARCHAR2(64),
+        sentiment_label VARCHAR2(16),
+        sentiment_score NUMBER,
+        keywords VARCHAR2(4000),
+        updated_at TIMESTAMP,
+        FOREIGN KEY (bank_id) REFERENCES Banks(bank_id)
+    )
+    """
+    create_sync_state_sql = """
+    CREATE TABLE Sync_State (
+        sync_name VARCHAR2(50) PRIMARY KEY,
+        watermark VARCHAR2(50)
+    )
+    """
+    create_content_hash_index_sql = "CREATE UNIQUE INDEX reviews_content_hash_uk ON Reviews (content_hash)"
+    # Bank names are matched case-insensitively, so 'cbe' and 'CBE' are one bank
+    create_bank_name_index_sql = "CREATE UNIQUE INDEX banks_name_uk ON Banks (LOWER(bank_name))"
+    # Columns added to a Reviews table created before the sync columns existed
+    migrate_reviews_sql = [
+        """
+        ALTER TABLE Reviews ADD (
+            content_hash VARCHAR2(64),
+            sentiment_label VARCHAR2(16),
+            sentiment_score NUMBER,
+            keywords VARCHAR2(4000),
+            updated_at TIMESTAMP
+        )
+        """
+    ]
+    upsert_bank_sql = """
+    MERGE INTO Banks b
+    USING (SELECT :1 AS bank_name FROM dual) s
+    ON (LOWER(b.bank_name) = LOWER(s.bank_name))
+    WHEN NOT MATCHED THEN INSERT (bank_name) VALUES (s.bank_name)
+    """
+    select_bank_sql = "SELECT bank_id FROM Banks WHERE LOWER(bank_name) = LOWER(:1)"
+    select_banks_sql = "SELECT bank_id, bank_name FROM Banks"
+    # Rows whose values did not change are matched but not rewritten; NULL
+    # analysis columns (reviews loaded before they were analyzed) keep the
+    # values already stored
+    upsert_review_sql = """
+    MERGE INTO Reviews r
+    USING (
+        SELECT :1 AS content_hash, :2 AS review_text, :3 AS rating,
+               TO_DATE(:4, 'YYYY-MM-DD') AS review_date, :5 AS bank_id,
+               :6 AS sentiment_label, :7 AS sentiment_score, :8 AS keywords
+        FROM dual
+    ) s
+    ON (r.content_hash = s.content_hash)
+    WHEN MATCHED THEN UPDATE SET
+        r.rating = s.rating,
+        r.sentiment_label = NVL(s.sentiment_label, r.sentiment_label),
+        r.sentiment_score = NVL(s.sentiment_score, r.sentiment_score),
+        r.keywords = NVL(s.keywords, r.keywords),
+        r.updated_at = SYSTIMESTAMP
+        WHERE DECODE(r.rating, s.rating, 0, 1) = 1
+           OR s.sentiment_label IS NOT NULL AND DECODE(r.sentiment_label, s.sentiment_label, 0, 1) = 1
+           OR s.sentiment_score IS NOT NULL AND DECODE(r.sentiment_score, s.sentiment_score, 0, 1) = 1
+           OR s.keywords IS NOT NULL AND DECODE(r.keywords, s.keywords, 0, 1) = 1
+    WHEN NOT MATCHED THEN INSERT (
+        content_hash, review_text, rating, review_date, bank_id,
+        sentiment_label, sentiment_score, keywords, updated_at
+    ) VALUES (
+        s.content_hash, s.review_text, s.rating, s.review_date, s.bank_id,
+        s.sentiment_label, s.sentiment_score, s.keywords, SYSTIMESTAMP
+    )
+    """
+    select_watermark_sql = "SELECT watermark FROM Sync_State WHERE sync_name = :1"
+    upsert_watermark_sql = """
+    MERGE INTO Sync_State t
+    USING (SELECT :1 AS sync_name, :2 AS watermark FROM dual) s
+    ON (t.sync_name = s.sync_name)
+    WHEN MATCHED THEN UPDATE SET t.watermark = s.watermark
+    WHEN NOT MATCHED THEN INSERT (sync_name, watermark) VALUES (s.sync_name, s.watermark)
+    """
+
+    @staticmethod
+    def prepare_upsert_batch(cursor, texts):
+        """
+        Size the review_text bind of the MERGE for the whole batch
+
+        LONG binds are not allowed inside MERGE ... USING, so batches with
+        texts over 4000 bytes bind review_text as a CLOB instead.
+        """
+        longest = max((len(t.encode('utf-8')) for t in texts if isinstance(t, str)), default=1)
+        text_type = longest if longest <= MAX_VARCHAR_BIND else oracledb.DB_TYPE_CLOB
+        cursor.setinputsizes(None, text_type, None, None, None, None, None, None)
+
+
+class SQLiteDialect:
+    """SQLite stand-in for the Oracle schema, used for local runs and tests"""
+    error = sqlite3.DatabaseError
+
+    create_banks_sql = """
+    CREATE TABLE Banks (
+        bank_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bank_name TEXT NOT NULL
+    )
+    """
+    create_reviews_sql = """
+    CREATE TABLE Reviews (
+        review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        review_text TEXT,
+        rating INTEGER,
+        review_date TEXT,
+        bank_id INTEGER,
+        content_hash TEXT,
+        sentiment_label TEXT,
+        sentiment_score REAL,
+        keywords TEXT,
+        updated_at TEXT,
+        FOREIGN KEY (bank_id) REFERENCES Banks(bank_id)
+    )
+    """
+    create_sync_state_sql = """
+    CREATE TABLE Sync_State (
+        sync_name TEXT PRIMARY KEY,
+        watermark TEXT
+    )
+    """
+    create_content_hash_index_sql = "CREATE UNIQUE INDEX reviews_content_hash_uk ON Reviews (content_hash)"
+    # Bank names are matched case-insensitively, so 'cbe' and 'CBE' are one bank
+    create_bank_name_index_sql = "CREATE UNIQUE INDEX banks_name_uk ON Banks (LOWER(bank_name))"
+    # Columns added to a Reviews table created before the sync columns existed
+    migrate_reviews_sql = [
+        "ALTER TABLE Reviews ADD COLUMN content_hash TEXT",
+        "ALTER TABLE Reviews ADD COLUMN sentiment_label TEXT",
+        "ALTER TABLE Reviews ADD COLUMN sentiment_score REAL",
+        "ALTER TABLE Reviews ADD COLUMN keywords TEXT",
+        "ALTER TABLE Reviews ADD COLUMN updated_at TEXT"
+    ]
+    upsert_bank_sql = "INSERT INTO Banks (bank_name) VALUES (?) ON CONFLICT DO NOTHING"
+    select_bank_sql = "SELECT bank_id FROM Banks WHERE LOWER(bank_name) = LOWER(?)"
+    select_banks_sql = "SELECT bank_id, bank_name FROM Banks"
+    # Rows whose values did not change are matched but not rewritten; NULL
+    # analysis columns (reviews loaded before they were analyzed) keep the
+    # values already stored
+    upsert_review_sql = """
+    INSERT INTO Reviews (
+        content_hash, review_text, rating, review_date, bank_id,
+        sentiment_label, sentiment_score, keywords, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (content_hash) DO UPDATE SET
+        rating = excluded.rating,
+        sentiment_label = COALESCE(excluded.sentiment_label, Reviews.sentiment_label),
+        sentiment_score = COALESCE(excluded.sentiment_score, Reviews.sentiment_score),
+        keywords = COALESCE(excluded.keywords, Reviews.keywords),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE Reviews.rating IS NOT excluded.rating
+       OR excluded.sentiment_label IS NOT NULL AND Reviews.sentiment_label IS NOT excluded.sentiment_label
+       OR excluded.sentiment_score IS NOT NULL AND Reviews.sentiment_score IS NOT excluded.sentiment_score
+       OR excluded.keywords IS NOT NULL AND Reviews.keywords IS NOT excluded.keywords
+    """
+    select_watermark_sql = "SELECT watermark FROM Sync_State WHERE sync_name = ?"
+    upsert_watermark_sql = "INSERT OR REPLACE INTO Sync_State (sync_name, watermark) VALUES (?, ?)"
+
+    @staticmethod
+    def prepare_upsert_batch(cursor, texts):
+        """SQLite binds values dynamically; nothing to prepare"""
+
+
+class OracleConnectionManager:
+    dialect = OracleDialect
+
+    def __init__(self, user=USERNAME, password=PASSWORD, dsn=DSN, min_sessions=1, max_sessions=4, increment=1):
+        """
+        Session pool shared by all loaders instead of a connection per call
+
+        Args:
+            user (str): Database user
+            password (str): Database password
+            dsn (str): Oracle DSN
+            min_sessions (int): Sessions opened up front
+            max_sessions (int): Upper bound on pooled sessions
+            increment (int): Sessions added when the pool grows
+        """
+        try:
+            self.pool = oracledb.create_pool(
+                user=user, password=password, dsn=dsn,
+                min=min_sessions, max=max_sessions, increment=increment
+            )
+            print("Database session pool established.")
+        except oracledb.DatabaseError as e:
+            print(f"Error establishing database session pool: {str(e)}")
+            raise
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection and return it to the pool afterwards"""
+        connection = self.pool.acquire()
+        try:
+            yield connection
+        finally:
+            self.pool.release(connection)
+
+    def close(self):
+        """Close the session pool"""
+        self.pool.close()
+
+
+class SQLiteConnectionManager:
+    dialect = SQLiteDialect
+
+    def __init__(self, path=':memory:'):
+        """
+        SQLite connection manager with the same interface as OracleConnectionManager
+
+        A single connection is reused, which also keeps ':memory:' databases
+        alive between calls.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+
+    @contextmanager
+    def connection(self):
+        """Yield the shared SQLite connection"""
+        yield self._connection
+
+    def close(self):
+        """Close the SQLite connection"""
+        self._connection.close()
+
 
 def create_connection():
     """Create a connection to the Oracle database."""
@@ -16,84 +273,240 @@ def create_connection():
         print(f"Error establishing database connection: {str(e)}")
         raise
 
-def create_tables(connection):
+def create_tables(connection, dialect=OracleDialect):
     """Create the Banks and Reviews tables in the database."""
+    cursor = connection.cursor()
     try:
-        cursor = connection.cursor()
-        
         # Create Banks table
-        cursor.execute("""
-        CREATE TABLE Banks (
-            bank_id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-            bank_name VARCHAR2(50) NOT NULL
-        )
-        """)
+        cursor.execute(dialect.create_banks_sql)
+        cursor.execute(dialect.create_bank_name_index_sql)
         print("Banks table created successfully.")
-        
+
         # Create Reviews table
-        cursor.execute("""
-        CREATE TABLE Reviews (
-            review_id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-            review_text CLOB,
-            rating NUMBER,
-            review_date DATE,
-            bank_id NUMBER,
-            FOREIGN KEY (bank_id) REFERENCES Banks(bank_id)
-        )
-        """)
+        cursor.execute(dialect.create_reviews_sql)
+        cursor.execute(dialect.create_content_hash_index_sql)
         print("Reviews table created successfully.")
-        
+
+        # Create Sync_State table for incremental sync watermarks
+        cursor.execute(dialect.create_sync_state_sql)
+        print("Sync_State table created successfully.")
+
         connection.commit()
-    except oracledb.DatabaseError as e:
+    except dialect.error as e:
         print(f"Error creating tables: {str(e)}")
         connection.rollback()
     finally:
         cursor.close()
 
-def insert_banks(connection):
-    """Insert bank names into the Banks table."""
+def insert_banks(connection, dialect=OracleDialect):
+    """Insert bank names into the Banks table; banks already there are kept."""
+    cursor = connection.cursor()
     try:
-        cursor = connection.cursor()
         banks = ['CBE', 'BOE', 'Dashen']
-        
-        for bank in banks:
-            cursor.execute("INSERT INTO Banks (bank_name) VALUES (:1)", (bank,))
-        
+
+        cursor.executemany(dialect.upsert_bank_sql, [(bank,) for bank in banks])
+
         connection.commit()
         print(f"Inserted {len(banks)} banks into the database.")
-    except oracledb.DatabaseError as e:
+    except dialect.error as e:
         print(f"Error inserting banks: {str(e)}")
         connection.rollback()
     finally:
         cursor.close()
 
-def insert_reviews(connection, reviews_path, bank_name):
-    """Insert reviews into the Reviews table based on the bank."""
+def _review_rows(df, bank_name, bank_id, preprocessor):
+    """
+    upsert_review_sql bind tuples for a chunk of not yet analyzed reviews
+
+    Rows are keyed by the same content hash as sync_analyzed_reviews, so
+    reloading a file updates rows in place and a later sync fills in the
+    analysis of the loaded rows instead of inserting them again. Missing
+    values (and the analysis columns) are NULL.
+    """
+    # Ensure the date column is in the correct format (YYYY-MM-DD)
+    dates = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+    ratings = pd.to_numeric(df['rating'], errors='coerce')
+    texts = df['review_text'].astype(object).where(df['review_text'].notna(), None)
+    hashes = preprocessor.content_hashes(df.assign(bank_name=bank_name))
+    return [
+        (content_hash, text, None if pd.isna(rating) else int(rating), None if pd.isna(date) else date,
+         bank_id, None, None, None)
+        for content_hash, text, rating, date in zip(hashes, texts, ratings, dates)
+    ]
+
+@instrumented('db_load')
+def insert_reviews(connection, reviews_path, bank_name, batch_size=5000, dialect=OracleDialect):
+    """
+    Insert reviews into the Reviews table based on the bank.
+
+    The CSV is read in chunks of batch_size rows; each chunk is sent with a
+    single executemany (array binding) and committed, so memory stays bounded
+    and a failure only rolls back the current batch. Rows go through the
+    content-hash upsert, so loading the same file again does not duplicate
+    reviews and keeps any analysis already synced for them.
+
+    Returns:
+        int: Number of reviews loaded (inserted or matched)
+    """
+    cursor = connection.cursor()
+    loaded = 0
+    preprocessor = ReviewPreprocessor()
     try:
-        cursor = connection.cursor()
-        
-        # Load the reviews DataFrame
-        df = pd.read_csv(reviews_path)
-        
-        # Check and convert the date format if necessary
-        if 'date' in df.columns:
-            # Ensure the date column is in the correct format (YYYY-MM-DD)
-            df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d')
-        
         # Get bank_id from the Banks table
-        cursor.execute("SELECT bank_id FROM Banks WHERE bank_name = :1", (bank_name,))
+        cursor.execute(dialect.select_bank_sql, (bank_name,))
         bank_id = cursor.fetchone()[0]
-        
-        for _, row in df.iterrows():
-            cursor.execute("""
-            INSERT INTO Reviews (review_text, rating, review_date, bank_id)
-            VALUES (:1, :2, TO_DATE(:3, 'YYYY-MM-DD'), :4)
-            """, (row['review_text'], row['rating'], row['date'], bank_id))
-        
-        connection.commit()
-        print(f"Inserted {len(df)} reviews for {bank_name} into the database.")
-    except oracledb.DatabaseError as e:
+
+        # Load the reviews in batches
+        for chunk in pd.read_csv(reviews_path, chunksize=batch_size):
+            rows = _review_rows(chunk, bank_name, bank_id, preprocessor)
+            batch_start = time.perf_counter()
+            dialect.prepare_upsert_batch(cursor, [row[1] for row in rows])
+            cursor.executemany(dialect.upsert_review_sql, rows)
+            connection.commit()
+            metrics.observe('db_batch', time.perf_counter() - batch_start)
+            loaded += len(rows)
+
+        print(f"Loaded {loaded} reviews for {bank_name} into the database.")
+    except dialect.error as e:
         print(f"Error inserting reviews for {bank_name}: {str(e)}")
         connection.rollback()
     finally:
-        cursor.close()
\ No newline at end of file
+        cursor.close()
+    return loaded
+
+def load_reviews(manager, review_files, batch_size=5000):
+    """
+    Bulk load review CSVs through a connection manager
+
+    Args:
+        manager (OracleConnectionManager or SQLiteConnectionManager): Connection source
+        review_files (dict): Bank name -> processed reviews CSV path
+        batch_size (int): Rows per executemany batch and commit
+
+    Returns:
+        int: Total number of reviews loaded
+    """
+    total = 0
+    for bank_name, reviews_path in review_files.items():
+        with manager.connection() as connection:
+            total += insert_reviews(connection, reviews_path, bank_name, batch_size, manager.dialect)
+    return total
+
+def migrate_schema(connection, dialect=OracleDialect):
+    """
+    Add the sync columns, unique indexes and Sync_State table to an existing schema.
+
+    The bank name index cannot be created while Banks holds the same name
+    twice; merge those rows first and migrate again.
+    """
+    cursor = connection.cursor()
+    statements = dialect.migrate_reviews_sql + [dialect.create_content_hash_index_sql,
+                                                 dialect.create_bank_name_index_sql,
+                                                 dialect.create_sync_state_sql]
+    try:
+        for statement in statements:
+            try:
+                cursor.execute(statement)
+            except dialect.error as e:
+                # Already migrated (column, index or table exists)
+                print(f"Skipping migration step: {str(e)}")
+        connection.commit()
+        print("Schema migrated for review sync.")
+    finally:
+        cursor.close()
+
+def get_sync_watermark(connection, sync_name, dialect=OracleDialect):
+    """Return the newest analyzed_at change time shipped by a sync, or None."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(dialect.select_watermark_sql, (sync_name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        cursor.close()
+
+def _bank_ids(connection, bank_names, dialect):
+    """Map bank names (case-insensitively) to bank_id, adding unknown banks"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(dialect.select_banks_sql)
+        ids = {name.lower(): bank_id for bank_id, name in cursor.fetchall()}
+        missing = sorted({str(b) for b in bank_names if str(b).lower() not in ids})
+        if missing:
+            cursor.executemany(dialect.upsert_bank_sql, [(bank,) for bank in missing])
+            cursor.execute(dialect.select_banks_sql)
+            ids = {name.lower(): bank_id for bank_id, name in cursor.fetchall()}
+        return ids
+    finally:
+        cursor.close()
+
+@instrumented('db_sync')
+def sync_analyzed_reviews(connection, analyzed_path, dialect=OracleDialect, batch_size=5000,
+                          full=False, sync_name='analyzed_reviews'):
+    """
+    Upsert analyzed reviews (sentiment and keywords) keyed by content hash.
+
+    Only rows changed since the last sync are shipped: the watermark is the
+    newest analyzed_at the analyzer stamped on a shipped row, so re-scored
+    old reviews are sent however far back their review date is, while rows
+    whose results did not change keep their stamp and are not sent again.
+    Run the sync after the analysis has written its output, not during it.
+    Files (or rows) without analyzed_at are shipped in full; so is
+    everything with full=True.
+
+    Returns:
+        int: Number of reviews shipped
+    """
+    watermark = None if full else get_sync_watermark(connection, sync_name, dialect)
+    preprocessor = ReviewPreprocessor()
+    cursor = connection.cursor()
+    shipped = 0
+    newest = watermark
+    try:
+        for chunk in pd.read_csv(analyzed_path, chunksize=batch_size):
+            changed = (chunk[ANALYZED_AT] if ANALYZED_AT in chunk.columns
+                       else pd.Series(None, index=chunk.index, dtype=object))
+            if watermark:
+                chunk = chunk[changed.isna() | (changed > watermark)]
+            if chunk.empty:
+                continue
+            dates = pd.to_datetime(chunk['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+
+            bank_ids = _bank_ids(connection, chunk['bank_name'].unique(), dialect)
+            hashes = preprocessor.content_hashes(chunk)
+            ratings = pd.to_numeric(chunk['rating'], errors='coerce')
+            scores = pd.to_numeric(chunk['sentiment_score'], errors='coerce')
+            keywords = chunk['keywords'] if 'keywords' in chunk.columns else pd.Series(None, index=chunk.index)
+            rows = [
+                (content_hash, text,
+                 None if pd.isna(rating) else int(rating),
+                 None if pd.isna(date) else date,
+                 bank_ids[str(bank).lower()],
+                 None if pd.isna(label) else label,
+                 None if pd.isna(score) else float(score),
+                 None if pd.isna(words) else str(words)[:MAX_KEYWORDS_CHARS])
+                for content_hash, text, rating, date, bank, label, score, words in zip(
+                    hashes, chunk['review_text'], ratings, dates, chunk['bank_name'],
+                    chunk['sentiment_label'], scores, keywords)
+            ]
+            batch_start = time.perf_counter()
+            dialect.prepare_upsert_batch(cursor, [row[1] for row in rows])
+            cursor.executemany(dialect.upsert_review_sql, rows)
+            connection.commit()
+            metrics.observe('db_batch', time.perf_counter() - batch_start)
+            shipped += len(rows)
+
+            chunk_newest = changed[chunk.index].dropna().max()
+            if isinstance(chunk_newest, str) and (newest is None or chunk_newest > newest):
+                newest = chunk_newest
+
+        if newest and newest != watermark:
+            cursor.execute(dialect.upsert_watermark_sql, (sync_name, newest))
+            connection.commit()
+        print(f"Synced {shipped} analyzed reviews (watermark {newest}).")
+    except dialect.error as e:
+        print(f"Error syncing analyzed reviews: {str(e)}")
+        connection.rollback()
+    finally:
+        cursor.close()
+    return shipped
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import pandas as pd
+
+FACT_KEYS = ['day', 'bank_name', 'rating', 'sentiment_label']
+TERM_KEYS = ['day', 'bank_name', 'term']
+
+# Table files of any generation, including unfinished writes
+_TABLE_FILE_RE = re.compile(r'(facts|terms)\.\d+\.csv(\.tmp)?')
+
+# Label recorded for rows that were never scored
+UNSCORED_LABEL = 'UNSCORED'
+
+
+def _strings(series, fill):
+    """Plain str values with missing ones replaced by fill"""
+    return series.astype(object).where(series.notna(), fill).astype(str)
+
+
+class AggregateCube:
+    def __init__(self, terms_per_day=100):
+        """
+        Materialized daily aggregates of analyzed reviews for dashboards and plots
+
+        Two small tables replace the review-level frame for plotting:
+        facts holds review counts, scored counts and sentiment score sums
+        per day x bank x rating x sentiment label, and terms holds keyword
+        counts per day x bank. update folds in a batch of analyzed reviews
+        by summing its aggregates into the existing rows, so the cube is
+        maintained in time proportional to the batch and the cube size,
+        never the corpus.
+
+        Only the terms_per_day most frequent terms of each day and bank are
+        kept; counts of rarer terms are approximate once a day is spread
+        over several updates.
+
+        Args:
+            terms_per_day (int): Terms kept per day and bank
+        """
+        self.terms_per_day = terms_per_day
+        self.facts = pd.DataFrame({
+            'day': pd.Series(dtype='datetime64[ns]'), 'bank_name': pd.Series(dtype=object),
+            'rating': pd.Series(dtype='Int8'), 'sentiment_label': pd.Series(dtype=object),
+            'count': pd.Series(dtype='int64'), 'scored': pd.Series(dtype='int64'),
+            'score_sum': pd.Series(dtype='float64')
+        })
+        self.terms = pd.DataFrame({
+            'day': pd.Series(dtype='datetime64[ns]'), 'bank_name': pd.Series(dtype=object),
+            'term': pd.Series(dtype=object), 'count': pd.Series(dtype='int64')
+        })
+        # Free-form progress markers saved with the cube, e.g. chunks folded in
+        self.meta = {}
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build a cube from analyzed reviews in one pass"""
+        return cls(**kwargs).update(df)
+
+    @staticmethod
+    def _days(df):
+        return pd.to_datetime(df['date'], errors='coerce').dt.normalize()
+
+    def _batch_facts(self, df, days):
+        scores = (pd.to_numeric(df['sentiment_score'], errors='coerce') if 'sentiment_score' in df.columns
+                  else pd.Series(float('nan'), index=df.index))
+        labels = (_strings(df['sentiment_label'], UNSCORED_LABEL) if 'sentiment_label' in df.columns
+                  else pd.Series(UNSCORED_LABEL, index=df.index))
+        frame = pd.DataFrame({
+            'day': days,
+            'bank_name': _strings(df['bank_name'], ''),
+            'rating': pd.to_numeric(df['rating'], errors='coerce').astype('Int8'),
+            'sentiment_label': labels,
+            'score': scores
+        })
+        return frame.groupby(FACT_KEYS, dropna=False).agg(
+            count=('score', 'size'), scored=('score', 'count'), score_sum=('score', 'sum')
+        ).reset_index()
+
+    def _batch_terms(self, df, days):
+        # spaCy keywords when the reviews were analyzed, raw words otherwise
+        source = df['keywords'] if 'keywords' in df.columns else df['review_text'].str.lower()
+        words = pd.DataFrame({
+            'day': days,
+            'bank_name': _strings(df['bank_name'], ''),
+            'term': _strings(source, '').str.split()
+        }).explode('term').dropna(subset=['term'])
+        return words.groupby(TERM_KEYS, dropna=False).size().rename('count').reset_index()
+
+    def _top_terms(self, terms):
+        ordered = terms.sort_values('count', ascending=False, kind='stable')
+        return ordered.groupby(['day', 'bank_name'], dropna=False).head(self.terms_per_day)
+
+    def update(self, df):
+        """
+        Fold a batch of analyzed reviews into the cube
+
+        Args:
+            df (pd.DataFrame): Reviews with date, bank_name and rating, plus
+                sentiment_label/sentiment_score and keywords when available
+
+        Returns:
+            AggregateCube: self
+        """
+        if df.empty:
+            return self
+        days = self._days(df)
+        facts = pd.concat([self.facts, self._batch_facts(df, days)], ignore_index=True)
+        self.facts = facts.groupby(FACT_KEYS, dropna=False)[['count', 'scored', 'score_sum']].sum().reset_index()
+        terms = pd.concat([self.terms, self._batch_terms(df, days)], ignore_index=True)
+        self.terms = self._top_terms(terms.groupby(TERM_KEYS, dropna=False)['count'].sum().reset_index())
+        logging.info(f"Aggregate cube updated with {len(df)} reviews "
+                     f"({len(self.facts)} fact rows, {len(self.terms)} term rows)")
+        return self
+
+    def slice(self, bank=None, start=None, end=None):
+        """
+        Sub-cube of one bank and/or a date range
+
+        Args:
+            bank (str): Only this bank (None for all)
+            start: First day to keep (None for no lower bound)
+            end: Last day to keep (None for no upper bound)
+
+        Returns:
+            AggregateCube: New cube over the matching rows
+        """
+        cube = AggregateCube(self.terms_per_day)
+        tables = []
+        for table in (self.facts, self.terms):
+            mask = pd.Series(True, index=table.index)
+            if bank is not None:
+                mask &= table['bank_name'] == bank
+            if start is not None:
+                mask &= table['day'] >= pd.Timestamp(start)
+            if end is not None:
+                mask &= table['day'] <= pd.Timestamp(end)
+            tables.append(table[mask].reset_index(drop=True))
+        cube.facts, cube.terms = tables
+        return cube
+
+    def fingerprint(self):
+        """Content hash of the cube's tables, independent of row order and column dtypes"""
+        digest = hashlib.sha256()
+        for table, keys in ((self.facts, FACT_KEYS), (self.terms, TERM_KEYS)):
+            ordered = table.sort_values(keys, kind='stable', na_position='first')
+            digest.update(ordered.to_csv(index=False, date_format='%Y-%m-%d').encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def _window(self, table, days):
+        """Rows of the last days days, counted back from the latest day in the cube"""
+        if days is None or table.empty:
+            return table
+        latest = self.facts['day'].max()
+        return table[table['day'] >= latest - pd.Timedelta(days=days - 1)]
+
+    def daily_sentiment(self, days=None):
+        """
+        Mean sentiment score per day and bank
+
+        Args:
+            days (int): Only the most recent days (None for all)
+
+        Returns:
+            pd.DataFrame: day, bank_name, sentiment_score, reviews
+        """
+        facts = self._window(self.facts, days)
+        daily = facts.groupby(['day', 'bank_name'])[['scored', 'score_sum', 'count']].sum().reset_index()
+        daily = daily[daily['scored'] > 0]
+        return pd.DataFrame({
+            'day': daily['day'],
+            'bank_name': daily['bank_name'],
+            'sentiment_score': daily['score_sum'] / daily['scored'],
+            'reviews': daily['count']
+        }).reset_index(drop=True)
+
+    def rating_counts(self):
+        """
+        Returns:
+            pd.DataFrame: rating, bank_name, count
+        """
+        counts = self.facts.groupby(['rating', 'bank_name'])['count'].sum().reset_index()
+        return counts.sort_values(['rating', 'bank_name'], kind='stable').reset_index(drop=True)
+
+    def label_counts(self):
+        """
+        Returns:
+            pd.DataFrame: bank_name, sentiment_label, count
+        """
+        return self.facts.groupby(['bank_name', 'sentiment_label'])['count'].sum().reset_index()
+
+    def term_frequencies(self, bank=None, days=None, top_n=200):
+        """
+        Most frequent terms, for word clouds
+
+        Args:
+            bank (str): Only this bank (None for all)
+            days (int): Only the most recent days (None for all)
+            top_n (int): Terms returned
+
+        Returns:
+            dict: Term -> count, most frequent first
+        """
+        terms = self._window(self.terms, days)
+        if bank is not None:
+            terms = terms[terms['bank_name'] == bank]
+        totals = terms.groupby('term')['count'].sum().sort_values(ascending=False, kind='stable')
+        return {term: int(count) for term, count in totals.head(top_n).items()}
+
+    def save(self, directory):
+        """
+        Write the cube as facts.<n>.csv, terms.<n>.csv and meta.json in directory
+
+        Every save writes a new generation n of both tables, then replaces
+        meta.json, which names the generation, in one rename. A crash at any
+        point leaves meta.json pointing at a complete, consistent pair of
+        tables, so the tables and the progress markers in meta never
+        disagree. Older generations are removed afterwards.
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = self._saved_generation(directory) + 1
+        for name, table in (('facts', self.facts), ('terms', self.terms)):
+            path = os.path.join(directory, f"{name}.{generation}.csv")
+            table.to_csv(f"{path}.tmp", index=False, date_format='%Y-%m-%d')
+            os.replace(f"{path}.tmp", path)
+        path = os.path.join(directory, 'meta.json')
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'terms_per_day': self.terms_per_day, 'generation': generation, 'meta': self.meta}, f)
+        os.replace(f"{path}.tmp", path)
+
+        current = {f"facts.{generation}.csv", f"terms.{generation}.csv"}
+        for name in os.listdir(directory):
+            if _TABLE_FILE_RE.fullmatch(name) and name not in current:
+                os.remove(os.path.join(directory, name))
+        logging.info(f"Aggregate cube saved to {directory} (generation {generation})")
+
+    @staticmethod
+    def _saved_generation(directory):
+        """Generation named by the meta.json in directory (0 for none)"""
+        path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['generation']
+
+    @classmethod
+    def load(cls, directory):
+        """Read a cube written by save"""
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            settings = json.load(f)
+        cube = cls(settings['terms_per_day'])
+        cube.meta = settings['meta']
+        generation = settings['generation']
+        facts = pd.read_csv(os.path.join(directory, f'facts.{generation}.csv'), keep_default_na=False,
+                            na_values={'day': [''], 'rating': ['']})
+        terms = pd.read_csv(os.path.join(directory, f'terms.{generation}.csv'), keep_default_na=False,
+                            na_values={'day': ['']})
+        if not facts.empty:
+            facts['day'] = pd.to_datetime(facts['day'])
+            facts['bank_name'] = facts['bank_name'].astype(str)
+            facts['sentiment_label'] = facts['sentiment_label'].astype(str)
+            facts['rating'] = facts['rating'].astype('Int8')
+            cube.facts = facts
+        if not terms.empty:
+            terms['day'] = pd.to_datetime(terms['day'])
+            terms['bank_name'] = terms['bank_name'].astype(str)
+            terms['term'] = terms['term'].astype(str)
+            cube.terms = terms
+        return cube
+
+    @classmethod
+    def load_or_create(cls, directory, **kwargs):
+        """Load the cube in directory, or start an empty one if there is none"""
+        if directory and os.path.exists(os.path.join(directory, 'meta.json')):
+            return cls.load(directory)
+        return cls(**kwargs)
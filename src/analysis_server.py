@@ -0,0 +1,353 @@
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from .language_detector import SKIPPED_LABEL, expand_to_rows, model_mask
+from .schema import enforce_schema
+from .sentiment_analyzer import stamp_analyzed
+
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch=64, max_wait=0.005, name='micro-batcher'):
+        """
+        Combine concurrent requests into batched calls on one worker thread
+
+        The worker takes the first queued request, then keeps collecting
+        until max_batch items are pending or max_wait seconds have passed,
+        calls fn once on everything and hands each caller its slice.
+
+        Args:
+            fn (callable): Takes a list of items, returns one result per item
+            max_batch (int): Items per call to fn
+            max_wait (float): Seconds to wait for more requests after the first
+            name (str): Worker thread name
+        """
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items):
+        """
+        Queue items for the next batch
+
+        Returns:
+            Future: Resolves to the results for these items, in order
+        """
+        future = Future()
+        items = list(items)
+        if not items:
+            future.set_result([])
+        else:
+            self._queue.put((items, future))
+        return future
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            pending = [request]
+            size = len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    # Finish this batch, then stop
+                    self._queue.put(None)
+                    break
+                pending.append(request)
+                size += len(request[0])
+            self._process(pending)
+
+    def _process(self, pending):
+        items = [item for request_items, _ in pending for item in request_items]
+        try:
+            results = self.fn(items)
+        except Exception as e:
+            logging.error(f"Batch of {len(items)} items failed: {str(e)}")
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for request_items, future in pending:
+            future.set_result(results[start:start + len(request_items)])
+            start += len(request_items)
+        self.batches += 1
+        self.items += len(items)
+
+    def close(self):
+        """Process what is queued and stop the worker"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class LatencyStats:
+    def __init__(self, window=1000):
+        """
+        Request counts and latency percentiles per endpoint
+
+        Args:
+            window (int): Most recent requests kept per endpoint for percentiles
+        """
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = Counter()
+        self._errors = Counter()
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            self._samples[endpoint].append(seconds)
+            self._counts[endpoint] += 1
+            if error:
+                self._errors[endpoint] += 1
+
+    @staticmethod
+    def _percentile(samples, q):
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: endpoint -> count, errors and p50/p95/p99 latency in milliseconds
+        """
+        with self._lock:
+            report = {}
+            for endpoint, samples in self._samples.items():
+                ordered = sorted(samples)
+                report[endpoint] = {
+                    'count': self._counts[endpoint],
+                    'errors': self._errors[endpoint],
+                    **{f'p{q}_ms': round(self._percentile(ordered, q) * 1000, 3) for q in (50, 95, 99)}
+                }
+            return report
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the AnalysisServer attached to the HTTP server"""
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        analysis = self.server.analysis
+        if self.path == '/health':
+            self._send_json(200, analysis.health())
+        elif self.path == '/metrics':
+            self._send_json(200, analysis.metrics())
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        analysis = self.server.analysis
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            texts = payload.get('texts')
+            if not isinstance(texts, list):
+                raise ValueError("Request body must be a JSON object with a 'texts' list")
+            status, body = 200, analysis.handle(self.path, texts)
+        except KeyError:
+            status, body = 404, {'error': f"Unknown path: {self.path}"}
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            logging.error(f"Error handling {self.path}: {str(e)}")
+            status, body = 500, {'error': str(e)}
+        analysis.latency.record(self.path, time.perf_counter() - start, error=status != 200)
+        self._send_json(status, body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+
+class AnalysisServer:
+    def __init__(self, sentiment_analyzer, theme_analyzer, host='127.0.0.1', port=8765,
+                 max_batch=64, max_wait=0.005):
+        """
+        Local HTTP service holding warm sentiment and theme models
+
+        Endpoints (POST bodies are {"texts": [...]}):
+            POST /sentiment -> {"results": [{"label", "score"}, ...]}
+            POST /keywords  -> {"keywords": [...]}
+            POST /themes    -> {"themes": [...]}
+            GET  /health    -> status and uptime
+            GET  /metrics   -> per-endpoint latency percentiles and batching counts
+
+        Sentiment and keyword requests from concurrent clients are combined
+        by a MicroBatcher each, so the models see full batches even when
+        every client sends a handful of reviews.
+
+        Args:
+            sentiment_analyzer (SentimentAnalyzer): Loaded sentiment model
+            theme_analyzer (ThemeAnalyzer): Loaded spaCy pipeline and theme taxonomy
+            host (str): Interface to bind
+            port (int): Port to bind (0 picks a free one)
+            max_batch (int): Items per model call
+            max_wait (float): Seconds to wait for more requests before a call
+        """
+        self.sentiment_analyzer = sentiment_analyzer
+        self.theme_analyzer = theme_analyzer
+        self.sentiment_batcher = MicroBatcher(
+            lambda texts: sentiment_analyzer._score_texts(texts, sentiment_analyzer.batch_size),
+            max_batch, max_wait, name='sentiment-batcher'
+        )
+        self.keyword_batcher = MicroBatcher(theme_analyzer.extract_keywords_bulk, max_batch, max_wait,
+                                            name='keyword-batcher')
+        self.latency = LatencyStats()
+        self.started = time.time()
+        self.httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.analysis = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path, texts):
+        """
+        Run one POST request
+
+        Raises:
+            KeyError: Unknown path
+        """
+        if path == '/sentiment':
+            return {'results': self.sentiment_batcher.submit(texts).result()}
+        if path == '/keywords':
+            return {'keywords': self.keyword_batcher.submit(texts).result()}
+        if path == '/themes':
+            return {'themes': self.theme_analyzer.tag_themes(pd.Series(texts, dtype=object)).tolist()}
+        raise KeyError(path)
+
+    def health(self):
+        return {'status': 'ok', 'uptime_s': round(time.time() - self.started, 3)}
+
+    def metrics(self):
+        batchers = {'sentiment': self.sentiment_batcher, 'keywords': self.keyword_batcher}
+        return {
+            'uptime_s': round(time.time() - self.started, 3),
+            'endpoints': self.latency.snapshot(),
+            'batching': {
+                name: {
+                    'batches': b.batches,
+                    'items': b.items,
+                    'mean_batch_size': round(b.items / b.batches, 2) if b.batches else 0.0
+                }
+                for name, b in batchers.items()
+            }
+        }
+
+    def serve_forever(self):
+        logging.info(f"Analysis server listening on {self.url}")
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name='analysis-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        """Stop serving and drain the batchers"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.sentiment_batcher.close()
+        self.keyword_batcher.close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class AnalysisClient:
+    def __init__(self, base_url='http://127.0.0.1:8765', timeout=300, request_size=512):
+        """
+        Client for AnalysisServer, usable in place of SentimentAnalyzer and
+        ThemeAnalyzer in the streaming pipeline
+
+        Args:
+            base_url (str): Server address
+            timeout (float): Seconds per HTTP request
+            request_size (int): Texts sent per request
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.request_size = request_size
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def _post_texts(self, path, key, texts):
+        # JSON has no NaN, so missing texts go over as null
+        texts = [text if isinstance(text, str) else None for text in texts]
+        results = []
+        for start in range(0, len(texts), self.request_size):
+            results.extend(self._request(path, {'texts': texts[start:start + self.request_size]})[key])
+        return results
+
+    def health(self):
+        return self._request('/health')
+
+    def metrics(self):
+        return self._request('/metrics')
+
+    def analyze_sentiment_batch(self, texts):
+        """One {'label', 'score'} dict per text, in input order"""
+        return self._post_texts('/sentiment', 'results', list(texts))
+
+    def analyze_reviews(self, df, batch_size=None):
+        """
+        Same contract as SentimentAnalyzer.analyze_reviews, scored by the server
+
+        Returns:
+            tuple: (df with sentiment_label/sentiment_score/analyzed_at, mean score by bank and rating)
+        """
+        try:
+            mask = model_mask(df)
+            results = self.analyze_sentiment_batch(df['review_text'].to_numpy()[mask].tolist())
+            df['sentiment_label'] = expand_to_rows([r['label'] for r in results], mask, SKIPPED_LABEL, df.index)
+            df['sentiment_score'] = expand_to_rows(
+                [r['score'] for r in results], mask, float('nan'), df.index
+            ).astype(float)
+            stamp_analyzed(df)
+            enforce_schema(df)
+            return df, df.groupby(['bank_name', 'rating'], observed=True)['sentiment_score'].mean()
+        except Exception as e:
+            logging.error(f"Error in remote sentiment analysis: {str(e)}")
+            raise
+
+    def extract_keywords_bulk(self, texts):
+        """Same contract as ThemeAnalyzer.extract_keywords_bulk"""
+        return self._post_texts('/keywords', 'keywords', list(texts))
+
+    def tag_themes(self, texts):
+        """Same contract as ThemeAnalyzer.tag_themes"""
+        return pd.Series(self._post_texts('/themes', 'themes', texts.tolist()), index=texts.index)
@@ -1,8 +1,21 @@
 import pandas as pd
 import logging
-from sentiment_analyzer import SentimentAnalyzer
-from theme_analyzer import ThemeAnalyzer
-from review_preprocessor import ReviewPreprocessor
+import os
+# Model libraries (transformers, spaCy, scikit-learn) are imported when the
+# analyzers are constructed, so importing this module stays cheap
+from .sentiment_analyzer import SentimentAnalyzer, stamp_analyzed
+from .sentiment_cache import SentimentCache
+from .theme_analyzer import ThemeAnalyzer
+from .review_preprocessor import ReviewPreprocessor
+from .review_store import CsvReviewStore
+from .stream_ledger import StreamLedger, review_keys
+from .paths import DATA_DIR, data_path
+from .language_detector import expand_to_rows, model_mask
+from .schema import log_memory
+from .theme_model import IncrementalThemeModel
+from .aggregates import AggregateCube
+from .search_index import ReviewSearchIndex
+from .drift_monitor import DriftMonitor
 
 def setup_logging():
     """Setup logging configuration"""
@@ -11,40 +24,85 @@ def setup_logging():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
-def main():
-    """Main function to run sentiment and theme analysis"""
+def save_results(df, store=None):
+    """Save analyzed reviews to the store, or to CSV with a backup location"""
+    if store is not None:
+        store.write(df, 'analyzed')
+        return
+
+    output_path = data_path('analyzed_reviews.csv')
+    try:
+        logging.info(f"Attempting to save results to {output_path}")
+        df.to_csv(output_path, index=False)
+        logging.info(f"Results saved to {output_path}")
+    except Exception as e:
+        logging.error(f"Error saving results to {output_path}: {str(e)}")
+        # Try to save to a different location
+        backup_path = 'analyzed_reviews_backup.csv'
+        logging.info(f"Attempting to save results to backup location: {backup_path}")
+        df.to_csv(backup_path, index=False)
+        logging.info(f"Results saved to backup location: {backup_path}")
+
+def _previous_results(store=None):
+    """The last saved analyzed reviews, or None when there are none (or they cannot be read)"""
+    try:
+        previous = (store or CsvReviewStore()).read('analyzed')
+        return previous if not previous.empty else None
+    except Exception as e:
+        logging.warning(f"Could not read the previous analyzed reviews, stamping every row: {str(e)}")
+        return None
+
+def main(store=None, backend='torch', aggregates_dir=data_path('aggregates'), search_index_path=None,
+         collapse_near_duplicates=False):
+    """
+    Main function to run sentiment and theme analysis
+
+    Args:
+        store (CsvReviewStore or ParquetReviewStore): Storage backend for
+            processed and analyzed reviews; None keeps the CSV paths
+        backend (str): Sentiment inference backend ('torch', 'onnx' or 'quantized')
+        aggregates_dir (str): Where to write the AggregateCube of the run
+            (None to skip)
+        search_index_path (str): Optional ReviewSearchIndex file to add the
+            analyzed reviews to
+        collapse_near_duplicates (bool): Keep one review per cluster of
+            near-duplicates across the whole corpus before analysis
+    """
     try:
         setup_logging()
         logging.info("Starting review analysis")
 
         # Load and preprocess data
-        preprocessor = ReviewPreprocessor()
+        preprocessor = ReviewPreprocessor(store=store)
         df = preprocessor.load_data()
-        df = preprocessor.process_reviews(df)
+        df = preprocessor.process_reviews(df, collapse_near_duplicates)
+        log_memory(df, "Processed reviews")
 
-        # Sentiment Analysis
-        sentiment_analyzer = SentimentAnalyzer()
+        # Sentiment Analysis (previously scored reviews come from the cache)
+        sentiment_cache = SentimentCache()
+        sentiment_analyzer = SentimentAnalyzer(cache=sentiment_cache, backend=backend)
         df, agg_sentiment = sentiment_analyzer.analyze_reviews(df)
-        logging.info("Sentiment analysis completed")
+        logging.info(f"Sentiment analysis completed (cache: {sentiment_cache.stats()})")
+        sentiment_cache.close()
 
         # Theme Analysis
         theme_analyzer = ThemeAnalyzer()
         themes_by_bank = theme_analyzer.identify_themes(df)
         logging.info("Theme analysis completed")
 
+        # Reviews whose results match the last run keep their analyzed_at,
+        # so the database sync only ships what changed
+        stamp_analyzed(df, _previous_results(store))
+
         # Save results
-        output_path = 'data/analyzed_reviews.csv'
-        try:
-            logging.info(f"Attempting to save results to {output_path}")
-            df.to_csv(output_path, index=False)
-            logging.info(f"Results saved to {output_path}")
-        except Exception as e:
-            logging.error(f"Error saving results to {output_path}: {str(e)}")
-            # Try to save to a different location
-            backup_path = 'analyzed_reviews_backup.csv'
-            logging.info(f"Attempting to save results to backup location: {backup_path}")
-            df.to_csv(backup_path, index=False)
-            logging.info(f"Results saved to backup location: {backup_path}")
+        log_memory(df, "Analyzed reviews")
+        save_results(df, store)
+        if aggregates_dir:
+            AggregateCube.from_frame(df).save(aggregates_dir)
+        if search_index_path:
+            search_index = ReviewSearchIndex(search_index_path)
+            search_index.add(df)
+            search_index.close()
 
         # Print summary
         print("\nSentiment Analysis Summary:")
@@ -59,5 +117,198 @@ def main():
         logging.error(f"Error in main analysis: {str(e)}")
         raise
 
-if __name__ == "__main__":
-    main() 
\ No newline at end of file
+_TOTAL_COLUMNS = ['bank_name', 'rating', 'score_sum', 'count']
+
+def _merge_sentiment_totals(totals, chunk):
+    """Add a chunk's per bank/rating score sums and counts to the running totals"""
+    grouped = chunk.groupby(['bank_name', 'rating'], observed=True)['sentiment_score'].agg(['sum', 'count'])
+    grouped = grouped.reset_index().set_axis(_TOTAL_COLUMNS, axis=1)
+    grouped['bank_name'] = grouped['bank_name'].astype(str)
+    combined = pd.concat([pd.DataFrame(totals, columns=_TOTAL_COLUMNS), grouped], ignore_index=True)
+    combined = combined.groupby(['bank_name', 'rating'], as_index=False)[['score_sum', 'count']].sum()
+    # JSON-serialisable rows for the ledger
+    return combined.to_dict('split')['data']
+
+def _rebuild_from_output(state, update, output_path, chunk_size):
+    """Fold every committed row of the streaming output into a fresh derived state"""
+    if not os.path.getsize(output_path):
+        return
+    for chunk in pd.read_csv(output_path, chunksize=chunk_size):
+        # Empty keyword and theme strings come back from the CSV as NaN
+        for column in ('keywords', 'themes'):
+            if column in chunk.columns:
+                chunk[column] = chunk[column].fillna('')
+        update(state, chunk)
+
+def run_streaming(chunk_size=5000, output_path=data_path('analyzed_reviews.csv'), checkpoint_path=None,
+                  store=None, sentiment_analyzer=None, theme_analyzer=None, backend='torch',
+                  theme_model_path=None, aggregates_dir=None, search_index_path=None,
+                  drift_state_path=None, alert_sinks=(), collapse_near_duplicates=False):
+    """
+    Run load -> clean -> dedupe -> sentiment -> keywords/themes in bounded-size chunks
+
+    Reviews already analyzed are looked up in a StreamLedger (an SQLite
+    table of dedupe keys at checkpoint_path), so memory stays bounded and
+    each run only analyzes reviews that are not in the ledger yet: the rest
+    of an interrupted run, or whatever the store gained since the last one,
+    with any chunk size. Each batch of new reviews is appended to
+    output_path and then committed to the ledger together with the output
+    size and running aggregates; a rerun truncates the output back to the
+    committed size.
+
+    Derived state (theme model, aggregates, search index, drift monitor) is
+    always loaded and records the ledger and batch count it reflects. State
+    that does not match the ledger, because it is new, belongs to an older
+    ledger or was saved just before a commit that never happened, is
+    rebuilt from the committed output before new batches are folded in.
+
+    Args:
+        chunk_size (int): Reviews per chunk
+        output_path (str): CSV file receiving analyzed reviews
+        checkpoint_path (str): Ledger file (defaults to output_path + '.checkpoint.sqlite')
+        store (CsvReviewStore or ParquetReviewStore): Source of processed reviews
+        sentiment_analyzer (SentimentAnalyzer or AnalysisClient): Defaults to a cached SentimentAnalyzer
+        theme_analyzer (ThemeAnalyzer or AnalysisClient): Defaults to ThemeAnalyzer()
+        backend (str): Inference backend for the default SentimentAnalyzer
+        theme_model_path (str): Optional IncrementalThemeModel file; each new
+            chunk's keywords are folded into it (by bank) and it is saved
+            before the chunk's checkpoint
+        aggregates_dir (str): Optional AggregateCube directory, maintained
+            the same way for dashboards and plots
+        search_index_path (str): Optional ReviewSearchIndex file that each
+            new chunk is added to. Reviews already in it are kept, since
+            re-adding them is harmless.
+        drift_state_path (str): Optional DriftMonitor state file, maintained
+            like the theme model; once every chunk is in, the complete days
+            are checked for sentiment and theme drift in date order
+        alert_sinks (tuple): Where the DriftMonitor sends alerts, e.g. a
+            JsonLinesAlertSink or WebhookAlertSink
+        collapse_near_duplicates (bool): Keep one review per cluster of
+            near-duplicates within each chunk. Clusters spanning chunks are
+            only collapsed by preprocessing with the same option first.
+
+    Returns:
+        pd.Series: Mean sentiment score by bank and rating over all chunks
+    """
+    store = store or CsvReviewStore(DATA_DIR)
+    ledger = StreamLedger(checkpoint_path or f'{output_path}.checkpoint.sqlite')
+    progress = ledger.progress
+    if progress['batches_done'] and not os.path.exists(output_path):
+        logging.warning(f"{output_path} is missing but {ledger.path} records {progress['rows_written']} "
+                        f"analyzed rows; starting over")
+        ledger.reset()
+        progress = ledger.progress
+    if progress['batches_done']:
+        logging.info(f"Resuming after batch {progress['batches_done']} ({progress['rows_written']} rows)")
+
+    # Drop output rows written after the last committed batch
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'a+b') as f:
+        f.truncate(progress['output_bytes'])
+
+    # Incrementally maintained state: (object, path, create, update), saved before each batch is committed
+    derived = []
+    if theme_model_path:
+        derived.append((IncrementalThemeModel.load_or_create(theme_model_path), theme_model_path,
+                        IncrementalThemeModel,
+                        lambda model, chunk: model.partial_fit(chunk['keywords'], chunk['bank_name'].astype(str))))
+    if aggregates_dir:
+        derived.append((AggregateCube.load_or_create(aggregates_dir), aggregates_dir, AggregateCube,
+                        lambda cube, chunk: cube.update(chunk)))
+    search_index = None
+    if search_index_path:
+        # Re-adding indexed reviews is harmless, so a rebuild reuses the index
+        search_index = ReviewSearchIndex(search_index_path)
+        derived.append((search_index, search_index_path, lambda: search_index,
+                        lambda index, chunk: index.add(chunk)))
+    monitor = None
+    if drift_state_path:
+        monitor = DriftMonitor.load_or_create(drift_state_path)
+        derived.append((monitor, drift_state_path, DriftMonitor, lambda monitor, chunk: monitor.observe(chunk)))
+
+    position = {'ledger': ledger.ledger_id, 'batches_done': progress['batches_done']}
+    for i, (state, path, create, update) in enumerate(derived):
+        if {key: state.meta.get(key) for key in position} != position:
+            logging.info(f"Rebuilding {path} from the {progress['rows_written']} committed rows of {output_path}")
+            state = create()
+            _rebuild_from_output(state, update, output_path, chunk_size)
+            if isinstance(state, DriftMonitor):
+                # Alerts about history replayed in a rebuild are not sent again
+                state.close_days()
+                state.outbox = []
+                monitor = state
+            state.meta = dict(position)
+            state.save(path)
+            derived[i] = (state, path, create, update)
+    if monitor is not None:
+        monitor.sinks = list(alert_sinks)
+        # Alerts queued by a run that stopped before sending them
+        if monitor.emit_alerts():
+            monitor.save(drift_state_path)
+
+    preprocessor = ReviewPreprocessor(store=store)
+    sentiment_cache = None
+
+    for chunk in store.iter_chunks('processed', chunk_size):
+        # Clean and dedupe within the chunk, then skip reviews analyzed before
+        chunk = preprocessor.process_reviews(chunk, collapse_near_duplicates)
+        if chunk.empty:
+            continue
+        keys = review_keys(chunk)
+        new = ledger.unseen(keys)
+        chunk, keys = chunk[new], keys[new]
+        if chunk.empty:
+            continue
+        batch = progress['batches_done']
+
+        # Models are only loaded once there is work left to do
+        if sentiment_analyzer is None:
+            sentiment_cache = SentimentCache()
+            sentiment_analyzer = SentimentAnalyzer(cache=sentiment_cache, backend=backend)
+        if theme_analyzer is None:
+            theme_analyzer = ThemeAnalyzer()
+
+        chunk, _ = sentiment_analyzer.analyze_reviews(chunk)
+        # Non-English rows were skipped for sentiment; skip them here too
+        mask = model_mask(chunk)
+        english = chunk['review_text'][mask]
+        chunk['keywords'] = expand_to_rows(theme_analyzer.extract_keywords_bulk(english), mask, "", chunk.index)
+        chunk['themes'] = expand_to_rows(theme_analyzer.tag_themes(english).tolist(), mask, "", chunk.index)
+
+        with open(output_path, 'a', newline='', encoding='utf-8') as f:
+            chunk.to_csv(f, header=progress['output_bytes'] == 0, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for state, path, _, update in derived:
+            update(state, chunk)
+            state.meta = {'ledger': ledger.ledger_id, 'batches_done': batch + 1}
+            state.save(path)
+
+        progress = {
+            'batches_done': batch + 1,
+            'rows_written': progress['rows_written'] + len(chunk),
+            'output_bytes': os.path.getsize(output_path),
+            'sentiment_totals': _merge_sentiment_totals(progress['sentiment_totals'], chunk)
+        }
+        ledger.commit(keys, progress)
+        logging.info(f"Committed batch {batch + 1} ({progress['rows_written']} rows written)")
+
+    if sentiment_cache is not None:
+        logging.info(f"Sentiment cache: {sentiment_cache.stats()}")
+        sentiment_cache.close()
+    if search_index is not None:
+        search_index.close()
+    if monitor is not None:
+        # Days are scored in date order once the whole store has been read;
+        # alerts are saved with the state before they are sent
+        monitor.close_days()
+        monitor.save(drift_state_path)
+        monitor.emit_alerts()
+        monitor.save(drift_state_path)
+
+    ledger.close()
+
+    totals = pd.DataFrame(progress['sentiment_totals'], columns=_TOTAL_COLUMNS)
+    totals = totals.set_index(['bank_name', 'rating'])
+    return (totals['score_sum'] / totals['count']).rename('sentiment_score')
@@ -0,0 +1,318 @@
+import argparse
+import logging
+from .paths import DATA_DIR, data_path
+
+# Each command imports what it needs when it runs, so `--help` and light
+# commands never pay for transformers, spaCy, scikit-learn or matplotlib
+
+# Log files kept from when the scraper and preprocessor configured logging on import
+COMMAND_LOG_FILES = {
+    'scrape': 'scraper.log',
+    'preprocess': 'preprocessor.log'
+}
+
+
+def setup_logging(log_file=None, level=logging.INFO):
+    """
+    Log to the console and optionally to a file
+
+    Args:
+        log_file (str): Extra log file (None for console only)
+        level (int): Logging level
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s', handlers=handlers)
+
+
+def _store(args):
+    """Review store selected by --storage, or None for the original CSV paths"""
+    if not args.storage:
+        return None
+    from .review_store import get_store
+    return get_store(args.storage, args.data_dir)
+
+
+def run_scrape(args):
+    from .playstore_scraper import PlayStoreScraper
+
+    scraper = PlayStoreScraper(raw_dir=args.raw_dir, store=_store(args))
+    if args.mode == 'incremental':
+        scraper.scrape_incremental(page_size=args.page_size, max_pages=args.max_pages)
+    elif args.mode == 'concurrent':
+        scraper.scrape_concurrent(max_workers=args.workers, rate=args.rate, count=args.count)
+    else:
+        scraper.scrape_all()
+
+
+def run_preprocess(args):
+    from .review_preprocessor import ReviewPreprocessor
+
+    ReviewPreprocessor(store=_store(args)).process_all_banks(args.collapse_near_duplicates)
+
+
+def run_analyze(args):
+    from . import analyze_reviews
+
+    if not args.stream:
+        analyze_reviews.main(_store(args), backend=args.backend, aggregates_dir=args.aggregates,
+                             search_index_path=args.search_index,
+                             collapse_near_duplicates=args.collapse_near_duplicates)
+        return
+
+    sinks = []
+    if args.alerts_file or args.alert_webhook:
+        from .drift_monitor import JsonLinesAlertSink, WebhookAlertSink
+        if args.alerts_file:
+            sinks.append(JsonLinesAlertSink(args.alerts_file))
+        if args.alert_webhook:
+            sinks.append(WebhookAlertSink(args.alert_webhook))
+
+    client = None
+    if args.server:
+        from .analysis_server import AnalysisClient
+        client = AnalysisClient(args.server)
+    print(analyze_reviews.run_streaming(
+        args.chunk_size, args.output, args.checkpoint, store=_store(args),
+        sentiment_analyzer=client, theme_analyzer=client, backend=args.backend,
+        theme_model_path=args.theme_model, aggregates_dir=args.aggregates,
+        search_index_path=args.search_index, drift_state_path=args.drift_state, alert_sinks=sinks,
+        collapse_near_duplicates=args.collapse_near_duplicates
+    ))
+
+
+def run_load_db(args):
+    from scripts import database_setup
+
+    if args.sqlite:
+        manager = database_setup.SQLiteConnectionManager(args.sqlite)
+    else:
+        manager = database_setup.OracleConnectionManager()
+    try:
+        with manager.connection() as connection:
+            database_setup.create_tables(connection, manager.dialect)
+            database_setup.migrate_schema(connection, manager.dialect)
+            database_setup.sync_analyzed_reviews(connection, args.analyzed, manager.dialect,
+                                                 batch_size=args.batch_size, full=args.full)
+    finally:
+        manager.close()
+
+
+def run_plot(args):
+    from .visualization import Visualization
+
+    cube = Visualization.load_aggregates(args.aggregates, args.input)
+    if args.kind in ('trends', 'all'):
+        Visualization.plot_sentiment_trends(cube)
+    if args.kind in ('ratings', 'all'):
+        Visualization.plot_rating_distributions(cube)
+    if args.kind in ('cloud', 'all'):
+        Visualization.plot_keyword_cloud(cube)
+
+
+def run_report(args):
+    from .aggregates import AggregateCube
+    from .report_renderer import ReportRenderer
+
+    renderer = ReportRenderer(AggregateCube.load(args.aggregates), args.output_dir, formats=args.formats.split(','),
+                              period=args.period, workers=args.workers)
+    result = renderer.render(banks=args.banks, last=args.last, force=args.force)
+    print(f"{len(result['rendered'])} charts rendered, {len(result['skipped'])} unchanged, "
+          f"{len(result['failed'])} failed ({args.output_dir})")
+
+
+def run_index(args):
+    import pandas as pd
+    from .review_store import CsvReviewStore
+    from .search_index import ReviewSearchIndex
+
+    store = _store(args)
+    if store is not None:
+        chunks = store.iter_chunks(args.stage, args.chunk_size)
+    elif args.stage == 'analyzed':
+        chunks = pd.read_csv(args.analyzed, chunksize=args.chunk_size)
+    else:
+        chunks = CsvReviewStore(args.data_dir).iter_chunks(args.stage, args.chunk_size)
+    search_index = ReviewSearchIndex(args.index)
+    try:
+        changed = sum(search_index.add(chunk) for chunk in chunks)
+        print(f"{changed} reviews added or updated ({len(search_index)} indexed)")
+    finally:
+        search_index.close()
+
+
+def run_search(args):
+    import time
+    from .search_index import ReviewSearchIndex
+
+    search_index = ReviewSearchIndex(args.index)
+    try:
+        start = time.perf_counter()
+        results = search_index.search(args.query, bank=args.bank, ratings=args.rating, start=args.since,
+                                      end=args.until, label=args.label, limit=args.limit,
+                                      match_all=not args.any)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        search_index.close()
+    for row in results.itertuples(index=False):
+        print(f"[{row.bank_name} {row.review_date} {row.rating}* {row.sentiment_label}] {row.review_text}")
+    print(f"{len(results)} results in {elapsed_ms:.1f} ms")
+
+
+def run_serve(args):
+    from .analysis_server import AnalysisServer
+    from .sentiment_analyzer import SentimentAnalyzer
+    from .sentiment_cache import SentimentCache
+    from .theme_analyzer import ThemeAnalyzer
+
+    server = AnalysisServer(
+        SentimentAnalyzer(batch_size=args.max_batch, cache=SentimentCache(args.cache), backend=args.backend),
+        ThemeAnalyzer(),
+        host=args.host, port=args.port, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def _add_storage_arguments(parser):
+    parser.add_argument('--storage', choices=['csv', 'parquet'], help="Storage backend for reviews")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Root data directory for --storage")
+
+
+def _add_backend_argument(parser):
+    parser.add_argument('--backend', choices=['torch', 'onnx', 'quantized'], default='torch',
+                        help="Sentiment inference backend")
+
+
+def build_parser():
+    """Argument parser with one subcommand per pipeline stage"""
+    parser = argparse.ArgumentParser(prog='python -m src', description="Bank app review analytics pipeline")
+    parser.add_argument('--report', help="Write a JSON run report with per-stage timings here")
+    parser.add_argument('--prometheus', help="Also write the run metrics as a Prometheus textfile here")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scrape = commands.add_parser('scrape', help="Scrape Google Play reviews")
+    _add_storage_arguments(scrape)
+    scrape.add_argument('--raw-dir', default=data_path('raw'), help="Raw CSV directory without --storage")
+    scrape.add_argument('--mode', choices=['full', 'incremental', 'concurrent'], default='full')
+    scrape.add_argument('--page-size', type=int, default=200, help="Reviews per page with --mode incremental")
+    scrape.add_argument('--max-pages', type=int, default=50, help="Page limit with --mode incremental")
+    scrape.add_argument('--workers', type=int, default=8, help="Threads with --mode concurrent")
+    scrape.add_argument('--rate', type=float, default=2.0, help="Requests per second with --mode concurrent")
+    scrape.add_argument('--count', type=int, default=600, help="Reviews per target with --mode concurrent")
+    scrape.set_defaults(func=run_scrape)
+
+    preprocess = commands.add_parser('preprocess', help="Clean and deduplicate raw reviews")
+    _add_storage_arguments(preprocess)
+    preprocess.add_argument('--collapse-near-duplicates', action='store_true',
+                            help="Keep one review per cluster of near-duplicates (MinHash LSH)")
+    preprocess.set_defaults(func=run_preprocess)
+
+    analyze = commands.add_parser('analyze', help="Sentiment and theme analysis of processed reviews")
+    _add_storage_arguments(analyze)
+    _add_backend_argument(analyze)
+    analyze.add_argument('--stream', action='store_true', help="Process reviews in resumable chunks")
+    analyze.add_argument('--chunk-size', type=int, default=5000, help="Reviews per chunk with --stream")
+    analyze.add_argument('--output', default=data_path('analyzed_reviews.csv'), help="Output CSV with --stream")
+    analyze.add_argument('--checkpoint',
+                         help="Ledger of analyzed reviews with --stream (default: <output>.checkpoint.sqlite)")
+    analyze.add_argument('--server', help="Score through a running analysis server at this URL (with --stream)")
+    analyze.add_argument('--theme-model', help="Incrementally updated theme model file (.npz) with --stream")
+    analyze.add_argument('--aggregates', default=data_path('aggregates'), help="Aggregate cube directory for plots")
+    analyze.add_argument('--search-index', help="Also add analyzed reviews to this search index file")
+    analyze.add_argument('--drift-state', help="Drift monitor state file (.json) with --stream")
+    analyze.add_argument('--alerts-file', help="Append drift alerts to this JSON lines file")
+    analyze.add_argument('--alert-webhook', help="POST drift alerts to this URL")
+    analyze.add_argument('--collapse-near-duplicates', action='store_true',
+                         help="Keep one review per cluster of near-duplicates (within each chunk with --stream)")
+    analyze.set_defaults(func=run_analyze)
+
+    load_db = commands.add_parser('load-db', help="Upsert analyzed reviews into the database")
+    load_db.add_argument('--analyzed', default=data_path('analyzed_reviews.csv'), help="Analyzed reviews CSV")
+    load_db.add_argument('--sqlite', help="Load into this SQLite file instead of Oracle")
+    load_db.add_argument('--batch-size', type=int, default=5000)
+    load_db.add_argument('--full', action='store_true', help="Ship every row, ignoring the sync watermark")
+    load_db.set_defaults(func=run_load_db)
+
+    plot = commands.add_parser('plot', help="Plot analyzed reviews")
+    plot.add_argument('--input', default=data_path('analyzed_reviews.csv'),
+                      help="Analyzed reviews CSV, used when there is no aggregate cube")
+    plot.add_argument('--aggregates', default=data_path('aggregates'), help="Aggregate cube directory")
+    plot.add_argument('--kind', choices=['trends', 'ratings', 'cloud', 'all'], default='all')
+    plot.set_defaults(func=run_plot)
+
+    report = commands.add_parser('report', help="Render chart files per bank and period from the aggregate cube")
+    report.add_argument('--aggregates', default=data_path('aggregates'), help="Aggregate cube directory")
+    report.add_argument('--output-dir', default='reports', help="Charts go to <dir>/<bank>/<period>/")
+    report.add_argument('--formats', default='png', help="Comma-separated file formats, e.g. png,svg")
+    report.add_argument('--period', choices=['week', 'month'], default='week')
+    report.add_argument('--last', type=int, default=4, help="Number of most recent periods")
+    report.add_argument('--banks', nargs='+', help="Banks to report on (default: all)")
+    report.add_argument('--workers', type=int, help="Rendering processes (default: one per CPU, 0 for none)")
+    report.add_argument('--force', action='store_true', help="Redraw charts whose aggregates did not change")
+    report.set_defaults(func=run_report)
+
+    index = commands.add_parser('index', help="Add stored reviews to the full-text search index")
+    _add_storage_arguments(index)
+    index.add_argument('--index', default=data_path('review_index.sqlite'), help="Search index file")
+    index.add_argument('--stage', choices=['processed', 'analyzed'], default='analyzed')
+    index.add_argument('--analyzed', default=data_path('analyzed_reviews.csv'),
+                       help="Analyzed reviews CSV without --storage")
+    index.add_argument('--chunk-size', type=int, default=5000, help="Reviews per batch")
+    index.set_defaults(func=run_index)
+
+    search = commands.add_parser('search', help="Full-text search of indexed reviews")
+    search.add_argument('query', nargs='?', default='', help="Words to find (word* for prefixes)")
+    search.add_argument('--index', default=data_path('review_index.sqlite'), help="Search index file")
+    search.add_argument('--bank', help="Only this bank")
+    search.add_argument('--rating', type=int, nargs='+', help="Only these star ratings")
+    search.add_argument('--since', help="First review date (YYYY-MM-DD)")
+    search.add_argument('--until', help="Last review date (YYYY-MM-DD)")
+    search.add_argument('--label', help="Only this sentiment label, e.g. NEGATIVE")
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--any', action='store_true', help="Match any query word instead of all")
+    search.set_defaults(func=run_search)
+
+    serve = commands.add_parser('serve', help="Serve warm sentiment and theme models over HTTP")
+    _add_backend_argument(serve)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--max-batch', type=int, default=64, help="Texts per model call")
+    serve.add_argument('--max-wait-ms', type=float, default=5.0,
+                       help="Milliseconds to wait for more requests before a model call")
+    serve.add_argument('--cache', default=data_path('sentiment_cache.sqlite'), help="Sentiment cache path")
+    serve.set_defaults(func=run_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Run one pipeline command
+
+    Args:
+        argv (list): Arguments after the program name (defaults to sys.argv[1:])
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'analyze' and args.server and not args.stream:
+        parser.error("--server requires --stream")
+    if args.command == 'analyze' and args.drift_state and not args.stream:
+        parser.error("--drift-state requires --stream")
+    setup_logging(COMMAND_LOG_FILES.get(args.command))
+    try:
+        args.func(args)
+    finally:
+        # Written even when a stage fails, so slow or crashing runs can be inspected
+        if args.report or args.prometheus:
+            from .instrumentation import metrics
+            if args.report:
+                metrics.write_report(args.report)
+            if args.prometheus:
+                metrics.write_prometheus(args.prometheus)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import json
+import logging
+import math
+import os
+import urllib.request
+from datetime import datetime, timezone
+import pandas as pd
+from .paths import data_path
+from .theme_analyzer import THEME_SEPARATOR
+
+# Metrics tracked for every bank; theme metrics are added as 'theme:<id>'
+SENTIMENT_METRIC = 'sentiment_score'
+NEGATIVE_METRIC = 'negative_rate'
+THEME_PREFIX = 'theme:'
+
+STATE_VERSION = 2
+
+
+class JsonLinesAlertSink:
+    def __init__(self, path=data_path('drift_alerts.jsonl')):
+        """
+        Append alerts to a local file, one JSON object per line
+
+        Args:
+            path (str): Alerts file
+        """
+        self.path = path
+
+    def emit(self, alerts):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert) + '\n')
+
+
+class WebhookAlertSink:
+    def __init__(self, url, timeout=5.0):
+        """
+        POST alerts as {"alerts": [...]} JSON to a webhook
+
+        Delivery failures are logged and do not stop the pipeline.
+
+        Args:
+            url (str): Webhook URL
+            timeout (float): Seconds to wait for the webhook
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, alerts):
+        request = urllib.request.Request(self.url, data=json.dumps({'alerts': alerts}).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except Exception as e:
+            logging.error(f"Error sending {len(alerts)} drift alerts to {self.url}: {str(e)}")
+
+
+def _empty_window():
+    return {'reviews': 0, 'scored': 0, 'score_sum': 0.0, 'negative': 0, 'themes': {}, 'start': None, 'end': None}
+
+
+def _empty_bank():
+    return {'observations': 0, 'stats': {}, 'days': {}, 'pooled': _empty_window(),
+            'closed_through': None, 'late': 0}
+
+
+class DriftMonitor:
+    def __init__(self, alpha=0.2, threshold=3.0, warmup=5, min_reviews=50, min_std=0.02, settle_days=1,
+                 sinks=()):
+        """
+        Online sentiment drift and anomaly detection per bank
+
+        Analyzed reviews are summed into one window per bank and review day,
+        whatever order they arrive in. close_days then walks each bank's
+        complete days in date order, pooling consecutive days until they
+        hold min_reviews scored reviews. Every pooled window is one
+        observation of the mean sentiment score, the negative-review rate
+        and the share of reviews tagged with each theme. Every metric keeps
+        an exponentially weighted mean and variance, and an observation more
+        than threshold standard deviations from the mean becomes an alert.
+        Memory is constant per bank and metric plus the open days, so
+        history is never rescanned.
+
+        Alerts wait in an outbox that is saved with the state and only sent
+        by emit_alerts, so a caller can save first and a crash does not lose
+        them. Each alert carries a stable id for de-duplication downstream.
+
+        Args:
+            alpha (float): EWMA weight of the newest observation
+            threshold (float): Alert when |value - mean| exceeds this many standard deviations
+            warmup (int): Observations per metric before alerts are raised
+            min_reviews (int): Scored reviews per observation
+            min_std (float): Lower bound on the standard deviation, so
+                metrics that have been flat do not alert on noise
+            settle_days (int): A day is complete once the bank has reviews
+                this many days later; reviews that arrive for a closed day
+                are counted as late and left out
+            sinks (tuple): Objects with emit(alerts), e.g. JsonLinesAlertSink
+        """
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_reviews = min_reviews
+        self.min_std = min_std
+        self.settle_days = settle_days
+        self.sinks = list(sinks)
+        # bank -> {'observations', 'stats': metric -> {'mean', 'var', 'n'}, 'days': day -> window,
+        #          'pooled': window, 'closed_through': day, 'late': count}
+        self.banks = {}
+        # Alerts raised but not sent yet
+        self.outbox = []
+        # Free-form progress markers saved with the state, e.g. batches folded in
+        self.meta = {}
+
+    def _day_windows(self, df):
+        """(bank, day) -> sums of one batch, in the same shape as the stored windows"""
+        scores = (pd.to_numeric(df['sentiment_score'], errors='coerce') if 'sentiment_score' in df.columns
+                  else pd.Series(float('nan'), index=df.index))
+        scored = scores.notna()
+        labels = df['sentiment_label'].astype(str) if 'sentiment_label' in df.columns else ''
+        frame = pd.DataFrame({
+            'bank_name': df['bank_name'].astype(str),
+            'day': pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d'),
+            'scored': scored,
+            'score': scores.fillna(0.0),
+            'negative': scored & (labels == 'NEGATIVE')
+        }).dropna(subset=['day'])
+        sums = frame.groupby(['bank_name', 'day']).agg(
+            reviews=('scored', 'size'), scored=('scored', 'sum'), score_sum=('score', 'sum'),
+            negative=('negative', 'sum')
+        )
+        windows = {
+            (bank, day): {'reviews': int(reviews), 'scored': int(scored), 'score_sum': float(score_sum),
+                          'negative': int(negative), 'themes': {}, 'start': day, 'end': day}
+            for bank, day, reviews, scored, score_sum, negative in sums.reset_index().itertuples(index=False)
+        }
+        if 'themes' in df.columns:
+            themes = pd.DataFrame({'bank_name': frame['bank_name'], 'day': frame['day'],
+                                   'theme': df['themes'].astype(str)})[scored]
+            themes = themes.dropna(subset=['day'])
+            themes = themes.assign(theme=themes['theme'].str.split(THEME_SEPARATOR)).explode('theme')
+            themes = themes[themes['theme'].str.len() > 0]
+            for (bank, day, theme), count in themes.groupby(['bank_name', 'day', 'theme']).size().items():
+                windows[(bank, day)]['themes'][theme] = int(count)
+        return windows
+
+    @staticmethod
+    def _merge(window, other):
+        for key in ('reviews', 'scored', 'score_sum', 'negative'):
+            window[key] += other[key]
+        for theme, count in other['themes'].items():
+            window['themes'][theme] = window['themes'].get(theme, 0) + count
+        window['start'] = min(filter(None, (window['start'], other['start'])), default=None)
+        window['end'] = max(filter(None, (window['end'], other['end'])), default=None)
+
+    def _values(self, bank_state, window):
+        """Metric values of a full window; themes seen before but absent now are 0"""
+        scored = window['scored']
+        values = {SENTIMENT_METRIC: window['score_sum'] / scored, NEGATIVE_METRIC: window['negative'] / scored}
+        themes = {metric[len(THEME_PREFIX):] for metric in bank_state['stats'] if metric.startswith(THEME_PREFIX)}
+        for theme in themes | set(window['themes']):
+            values[f'{THEME_PREFIX}{theme}'] = window['themes'].get(theme, 0) / scored
+        return values
+
+    def _observe_window(self, bank, bank_state, window):
+        """Score one full window against the running statistics, then fold it in"""
+        alerts = []
+        for metric, value in self._values(bank_state, window).items():
+            # A metric first seen now (a new theme) starts from a zero baseline
+            stat = bank_state['stats'].setdefault(
+                metric, {'mean': 0.0, 'var': 0.0, 'n': bank_state['observations']}
+            )
+            if stat['n'] >= self.warmup:
+                std = max(math.sqrt(stat['var']), self.min_std)
+                z = (value - stat['mean']) / std
+                if abs(z) >= self.threshold:
+                    alerts.append({
+                        'id': f"{bank}|{metric}|{window['end']}",
+                        'bank_name': bank, 'metric': metric, 'value': round(value, 4),
+                        'expected': round(stat['mean'], 4), 'z_score': round(z, 2),
+                        'direction': 'up' if z > 0 else 'down', 'reviews': window['scored'],
+                        'window_start': window['start'], 'window_end': window['end'],
+                        'detected_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+                    })
+            # Exponentially weighted mean and variance
+            diff = value - stat['mean']
+            increment = self.alpha * diff
+            stat['mean'] += increment
+            stat['var'] = (1 - self.alpha) * (stat['var'] + diff * increment)
+            stat['n'] += 1
+        bank_state['observations'] += 1
+        return alerts
+
+    def observe(self, df):
+        """
+        Add a batch of analyzed reviews to the open day windows
+
+        Batches may arrive in any date order; nothing is scored until
+        close_days.
+
+        Args:
+            df (pd.DataFrame): Reviews with bank_name and date, plus
+                sentiment_label, sentiment_score and themes when available
+
+        Returns:
+            int: Reviews for days that were already closed (left out)
+        """
+        if df.empty:
+            return 0
+        late = 0
+        for (bank, day), window in self._day_windows(df).items():
+            bank_state = self.banks.setdefault(bank, _empty_bank())
+            if bank_state['closed_through'] is not None and day <= bank_state['closed_through']:
+                bank_state['late'] += window['reviews']
+                late += window['reviews']
+                continue
+            self._merge(bank_state['days'].setdefault(day, _empty_window()), window)
+        if late:
+            logging.info(f"Drift monitor left out {late} reviews for days already closed")
+        return late
+
+    def close_days(self, through=None):
+        """
+        Score every complete day in date order and queue the alerts
+
+        Args:
+            through (str): Close days up to this date (YYYY-MM-DD) instead of
+                settle_days before each bank's latest day
+
+        Returns:
+            list: Alerts raised, also added to the outbox
+        """
+        alerts = []
+        for bank, bank_state in sorted(self.banks.items()):
+            if not bank_state['days']:
+                continue
+            horizon = through
+            if horizon is None:
+                latest = pd.Timestamp(max(bank_state['days']))
+                horizon = (latest - pd.Timedelta(days=self.settle_days)).strftime('%Y-%m-%d')
+            for day in sorted(day for day in bank_state['days'] if day <= horizon):
+                self._merge(bank_state['pooled'], bank_state['days'].pop(day))
+                bank_state['closed_through'] = day
+                if bank_state['pooled']['scored'] >= self.min_reviews:
+                    alerts.extend(self._observe_window(bank, bank_state, bank_state['pooled']))
+                    bank_state['pooled'] = _empty_window()
+
+        for alert in alerts:
+            logging.warning(f"Drift alert for {alert['bank_name']}: {alert['metric']} {alert['direction']} "
+                            f"to {alert['value']} (expected {alert['expected']}, z={alert['z_score']})")
+        self.outbox.extend(alerts)
+        return alerts
+
+    def emit_alerts(self):
+        """
+        Send the outbox to every sink and empty it
+
+        Save the state before calling this, so queued alerts survive a
+        crash; alerts can then be sent twice but never lost.
+
+        Returns:
+            int: Number of alerts sent
+        """
+        alerts, self.outbox = self.outbox, []
+        if alerts:
+            for sink in self.sinks:
+                sink.emit(alerts)
+        return len(alerts)
+
+    def summary(self):
+        """
+        Current running statistics
+
+        Returns:
+            pd.DataFrame: bank_name, metric, mean, std, observations
+        """
+        rows = [(bank, metric, stat['mean'], math.sqrt(stat['var']), stat['n'])
+                for bank, bank_state in sorted(self.banks.items())
+                for metric, stat in sorted(bank_state['stats'].items())]
+        return pd.DataFrame(rows, columns=['bank_name', 'metric', 'mean', 'std', 'observations'])
+
+    def save(self, path):
+        """Atomically write the monitor state and outbox as JSON (sinks are not saved)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        state = {
+            'version': STATE_VERSION,
+            'settings': {'alpha': self.alpha, 'threshold': self.threshold, 'warmup': self.warmup,
+                         'min_reviews': self.min_reviews, 'min_std': self.min_std,
+                         'settle_days': self.settle_days},
+            'banks': self.banks,
+            'outbox': self.outbox,
+            'meta': self.meta
+        }
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path, sinks=()):
+        """Read a monitor written by save"""
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == 1:
+            # Version 1 windows were not kept per day; start over with the same settings
+            logging.warning(f"Drift monitor state in {path} predates per-day windows; starting a new one")
+            return cls(sinks=sinks, **state['settings'])
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported drift monitor state version in {path}: {state.get('version')}")
+        monitor = cls(sinks=sinks, **state['settings'])
+        monitor.banks = state['banks']
+        monitor.outbox = state['outbox']
+        monitor.meta = state['meta']
+        return monitor
+
+    @classmethod
+    def load_or_create(cls, path, sinks=(), **kwargs):
+        """Load the monitor at path, or start a new one if there is none"""
+        if path and os.path.exists(path):
+            return cls.load(path, sinks)
+        return cls(sinks=sinks, **kwargs)
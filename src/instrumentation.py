@@ -0,0 +1,241 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageRecord:
+    """Totals for one pipeline stage, accumulated over all its calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = None
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'rows': self.rows,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'rows_per_second': round(self.rows / self.wall_seconds, 3) if self.wall_seconds > 0 else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 3) if self.peak_rss_mb is not None else None
+        }
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Latency histogram with Prometheus-style bucket bounds
+
+        Counts are kept per bucket and made cumulative when exported.
+
+        Args:
+            buckets (tuple): Sorted bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'mean_seconds': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': {str(bound): n for bound, n in zip(self.buckets + ('+Inf',), self.counts)}
+        }
+
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Per-stage timings and latency histograms for one pipeline run
+
+        Stages record wall time, CPU time, rows handled and the process
+        peak RSS; histograms record per-batch model latencies. Everything
+        is accumulated in memory and written out at the end of a run with
+        write_report (JSON) and optionally write_prometheus (textfile
+        collector format).
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.started = time.time()
+            self.stages = {}
+            self.histograms = {}
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        """
+        Time a block of work as one call of a stage
+
+        The yielded record's rows can be set inside the block once the row
+        count is known.
+
+        Args:
+            name (str): Stage name, e.g. 'preprocess'
+            rows (int): Rows handled, if known up front
+        """
+        call = StageRecord()
+        call.rows = rows
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield call
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            rss = peak_rss_mb()
+            with self._lock:
+                record = self.stages.setdefault(name, StageRecord())
+                record.calls += 1
+                record.rows += call.rows or 0
+                record.wall_seconds += wall
+                record.cpu_seconds += cpu
+                if rss is not None:
+                    record.peak_rss_mb = max(record.peak_rss_mb or 0.0, rss)
+            logging.debug(f"Stage {name}: {wall:.3f}s wall, {cpu:.3f}s CPU, {call.rows} rows")
+
+    def observe(self, name, seconds):
+        """Add one latency sample to a histogram"""
+        with self._lock:
+            self.histograms.setdefault(name, LatencyHistogram()).observe(seconds)
+
+    def report(self):
+        """
+        Returns:
+            dict: Run start, per-stage totals and histograms
+        """
+        with self._lock:
+            return {
+                'started': self.started,
+                'duration_seconds': round(time.time() - self.started, 6),
+                'peak_rss_mb': peak_rss_mb(),
+                'stages': {name: record.to_dict() for name, record in self.stages.items()},
+                'histograms': {name: hist.to_dict() for name, hist in self.histograms.items()}
+            }
+
+    def write_report(self, path):
+        """Write the run report as JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        logging.info(f"Run report written to {path}")
+
+    def prometheus_text(self, prefix='review_pipeline'):
+        """Render stages and histograms in the Prometheus text exposition format"""
+        report = self.report()
+        lines = []
+        stage_metrics = [
+            ('calls', 'calls', 'Calls of the pipeline stage'),
+            ('rows', 'rows', 'Rows handled by the pipeline stage'),
+            ('wall_seconds', 'wall_seconds', 'Wall-clock seconds spent in the pipeline stage'),
+            ('cpu_seconds', 'cpu_seconds', 'CPU seconds spent in the pipeline stage'),
+            ('peak_rss_mb', 'peak_rss_megabytes', 'Process peak RSS after the pipeline stage')
+        ]
+        for key, metric, help_text in stage_metrics:
+            lines.append(f"# HELP {prefix}_stage_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_stage_{metric} gauge")
+            for name, stats in report['stages'].items():
+                if stats[key] is not None:
+                    lines.append(f'{prefix}_stage_{metric}{{stage="{name}"}} {stats[key]}')
+
+        metric = f"{prefix}_batch_latency_seconds"
+        lines.append(f"# HELP {metric} Model batch latency")
+        lines.append(f"# TYPE {metric} histogram")
+        with self._lock:
+            histograms = list(self.histograms.items())
+            for name, hist in histograms:
+                cumulative = 0
+                for bound, n in zip(hist.buckets + ('+Inf',), hist.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{name="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{name="{name}"}} {hist.sum}')
+                lines.append(f'{metric}_count{{name="{name}"}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='review_pipeline'):
+        """
+        Write a node_exporter textfile-collector file
+
+        The file is written next to its final path and renamed into place,
+        so the collector never reads a half-written file.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(tmp_path, path)
+        logging.info(f"Prometheus metrics written to {path}")
+
+
+def _count_rows(result):
+    """Rows in a stage result: a DataFrame, an int count, a dict of those, or a tuple's first item"""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, dict):
+        # e.g. scrape_all's {bank: DataFrame}
+        return sum(_count_rows(value) for value in result.values())
+    if isinstance(result, bool):
+        return 0
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def instrumented(name, rows=None):
+    """
+    Record every call of the decorated function as a stage of the shared metrics
+
+    Args:
+        name (str): Stage name
+        rows (callable): Optional rows(result, *args, **kwargs); by default the
+            rows are counted from the return value
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.stage(name) as call:
+                result = fn(*args, **kwargs)
+                call.rows = rows(result, *args, **kwargs) if rows else _count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+# Process-wide metrics shared by all pipeline stages
+metrics = Instrumentation()
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Sentiment label given to rows the English-only models do not score
+SKIPPED_LABEL = 'SKIPPED'
+
+# Languages the DistilBERT and spaCy models are run on
+MODEL_LANGUAGES = ('en',)
+
+# Character classes are written with literal characters so they mean the
+# same to Python's re and to the RE2 engine of pyarrow-backed strings
+_LATIN_PATTERN = '[A-Za-z\u00c0-\u024f]'
+# Ethiopic, Ethiopic Supplement, Ethiopic Extended and Extended-A
+_ETHIOPIC_SET = '\u1200-\u139f\u2d80-\u2ddf\uab00-\uab2f'
+_ETHIOPIC_PATTERN = f'[{_ETHIOPIC_SET}]'
+# Letters of other scripts: anything outside ASCII, Latin-1, Latin Extended,
+# Ethiopic and general punctuation that is not whitespace
+_OTHER_PATTERN = f'[^\u0000-\u024f{_ETHIOPIC_SET}\u2000-\u206f\\s]'
+
+
+class LanguageDetector:
+    def __init__(self, min_share=0.7):
+        """
+        Script-based language detection for review texts
+
+        Counts Latin and Ethiopic letters with vectorized string operations
+        and labels each text by its dominant script: 'en' (Latin), 'am'
+        (Ethiopic), 'mixed' (both, neither dominant), 'other' (another
+        script) or 'unknown' (no letters). The scraper only requests English
+        reviews, so Latin-script text is taken to be English; romanized
+        Amharic is therefore labelled 'en'.
+
+        Args:
+            min_share (float): Share of a text's letters a script needs to
+                decide its label
+        """
+        self.min_share = min_share
+
+    def detect(self, texts):
+        """
+        Detect the language of each text
+
+        Args:
+            texts (pd.Series or list): Review texts (non-strings count as empty)
+
+        Returns:
+            pd.Series: Language code per text, aligned with texts
+        """
+        texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+        texts = texts.where(texts.map(lambda text: isinstance(text, str)), '').astype(str)
+        latin = texts.str.count(_LATIN_PATTERN).to_numpy(dtype=np.int64)
+        ethiopic = texts.str.count(_ETHIOPIC_PATTERN).to_numpy(dtype=np.int64)
+        letters = latin + ethiopic + texts.str.count(_OTHER_PATTERN).to_numpy(dtype=np.int64)
+
+        total = np.maximum(letters, 1)
+        languages = np.select(
+            [letters == 0,
+             latin >= self.min_share * total,
+             ethiopic >= self.min_share * total,
+             (latin > 0) & (ethiopic > 0)],
+            ['unknown', 'en', 'am', 'mixed'],
+            default='other'
+        )
+        return pd.Series(languages, index=texts.index, dtype=object)
+
+
+def model_mask(df):
+    """
+    Rows the English-only models should score
+
+    Args:
+        df (pd.DataFrame): Reviews, optionally with a language column
+
+    Returns:
+        np.ndarray: Boolean mask; every row when df has no language column
+    """
+    if 'language' not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    return df['language'].isin(MODEL_LANGUAGES).to_numpy()
+
+
+def expand_to_rows(values, mask, fill, index):
+    """
+    Place per-row results of the masked rows back into a full-length Series
+
+    Args:
+        values (list): One result per True entry of mask, in row order
+        mask (np.ndarray): Rows that were processed
+        fill: Value for the rows that were skipped
+        index (pd.Index): Index of the full frame
+
+    Returns:
+        pd.Series: values at the masked rows, fill elsewhere
+    """
+    expanded = np.full(len(mask), fill, dtype=object)
+    expanded[mask] = values
+    return pd.Series(expanded, index=index)
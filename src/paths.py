@@ -0,0 +1,10 @@
+import os
+
+# Root of every file the pipeline reads and writes by default, relative to
+# the repository root that `python -m src` is run from
+DATA_DIR = 'data'
+
+
+def data_path(*parts):
+    """Path of a default data file or directory under DATA_DIR"""
+    return os.path.join(DATA_DIR, *parts)
@@ -2,22 +2,111 @@ from google_play_scraper import Sort, reviews
 import pandas as pd
 import logging
 import os
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from .instrumentation import instrumented
+from .paths import data_path
+
+try:
+    # Private google_play_scraper class, only needed to resume an unfinished
+    # sweep; without it a sweep restarts from the newest review
+    from google_play_scraper.features.reviews import _ContinuationToken
+except ImportError:
+    _ContinuationToken = None
+
+
+def _edge(reviews, newest=True):
+    """{'at', 'ids'} of the newest (or oldest) timestamp among review dicts"""
+    at = max(r['at'] for r in reviews) if newest else min(r['at'] for r in reviews)
+    return {'at': at.isoformat(), 'ids': [r['reviewId'] for r in reviews if r['at'] == at]}
+
+
+def _resume_token(token, page_size):
+    """Continuation token for a saved sweep, or None when this library version cannot build one"""
+    if _ContinuationToken is None:
+        logging.warning("google_play_scraper has no _ContinuationToken, restarting the sweep")
+        return None
+    try:
+        return _ContinuationToken(token=token, lang='en', country='us', sort=Sort.NEWEST, count=page_size,
+                                  filter_score_with=None, filter_device_with=None)
+    except TypeError as e:
+        logging.warning(f"Could not rebuild the continuation token, restarting the sweep: {str(e)}")
+        return None
+
+
+def _merge_edge(old, new, newest=True):
+    """The newer (or older) of two edges, with ids combined when they share a timestamp"""
+    if old is None:
+        return new
+    if old['at'] == new['at']:
+        return {'at': old['at'], 'ids': old['ids'] + [i for i in new['ids'] if i not in old['ids']]}
+    new_is_newer = datetime.fromisoformat(new['at']) > datetime.fromisoformat(old['at'])
+    return new if new_is_newer == newest else old
+
+
+def _already_swept(review, sweep):
+    """Whether a review lies in the contiguous range an unfinished sweep already stored"""
+    if not sweep:
+        return False
+    head_at = datetime.fromisoformat(sweep['head']['at'])
+    low_at = datetime.fromisoformat(sweep['low']['at'])
+    if review['at'] == head_at:
+        return review['reviewId'] in sweep['head']['ids']
+    if review['at'] == low_at:
+        return review['reviewId'] in sweep['low']['ids']
+    return low_at < review['at'] < head_at
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Thread-safe token bucket shared by all scraping workers
+
+        Args:
+            rate (float): Tokens added per second (sustained requests/sec)
+            capacity (float): Maximum burst size (defaults to rate, at least 1)
+            clock (callable): Monotonic time source
+            sleep (callable): Sleep function used while waiting for tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until the requested number of tokens is available"""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scraper.log'),
-        logging.StreamHandler()
-    ]
-)   
 
 class PlayStoreScraper:
-    def __init__(self):
+    def __init__(self, reviews_fn=None, raw_dir=data_path('raw'), state_path=None, store=None):
         """
         Initialize the scraper with target banking apps
+
+        Args:
+            reviews_fn (callable): Replacement for google_play_scraper.reviews,
+                e.g. an offline fake in tests
+            raw_dir (str): Directory holding the raw {bank}_review.csv files
+            state_path (str): JSON file with per-app watermarks for
+                incremental scraping (defaults to raw_dir/scrape_state.json)
+            store (CsvReviewStore or ParquetReviewStore): Storage backend for raw
+                reviews; None writes raw_dir/{bank}_review.csv directly
         """
         # Dictionary of banking apps with their Play Store IDs
         self.apps = {
@@ -26,8 +115,11 @@ class PlayStoreScraper:
             'dashen': 'com.dashen.dashensuperapp'
         }
         
-        # Create data directory if it doesn't exist
-        # os.makedirs('data/raw', exist_ok=True)
+        self.reviews_fn = reviews_fn or reviews
+        self.raw_dir = raw_dir
+        self.state_path = state_path or os.path.join(raw_dir, 'scrape_state.json')
+        self.store = store
+
     
     def get_reviews(self, app_id, count=600):
         """
@@ -42,7 +134,7 @@ class PlayStoreScraper:
         """
         try:
             # Fetch reviews from Play Store
-            result, _ = reviews(
+            result, _ = self.reviews_fn(
                 app_id,
                 lang='en',  # English reviews only
                 country='us',  # US reviews
@@ -59,6 +151,51 @@ class PlayStoreScraper:
             logging.error(f"Error fetching reviews for {app_id}: {str(e)}")
             return pd.DataFrame()
 
+    def _format_reviews(self, df, bank):
+        """
+        Convert raw Play Store results to the review/rating/date/bank/source layout
+
+        Args:
+            df (pd.DataFrame): Results as returned by google_play_scraper
+            bank (str): Bank key from self.apps
+
+        Returns:
+            pd.DataFrame: Formatted reviews
+        """
+        # Add bank name and source
+        df['bank'] = bank
+        df['source'] = 'google_play'
+
+        # Select and rename columns
+        df = df[['content', 'score', 'at', 'bank', 'source']]
+        df.columns = ['review', 'rating', 'date', 'bank', 'source']
+
+        # Truncate timestamps to the day; CSV output still reads YYYY-MM-DD
+        df['date'] = pd.to_datetime(df['date']).dt.normalize()
+        return df
+
+    def _save_reviews(self, df, bank, append=False):
+        """
+        Save formatted reviews for one bank to the raw store
+
+        Args:
+            df (pd.DataFrame): Formatted reviews
+            bank (str): Bank key from self.apps
+            append (bool): Append instead of replacing the bank's raw reviews
+        """
+        if self.store is not None:
+            self.store.write(df, 'raw', append=append)
+            return
+        os.makedirs(self.raw_dir, exist_ok=True)
+        file_path = os.path.join(self.raw_dir, f'{bank}_review.csv')
+        if append:
+            df.to_csv(file_path, mode='a', header=not os.path.exists(file_path), index=False)
+            logging.info(f"Appended {len(df)} new reviews for {bank} to {file_path}")
+        else:
+            df.to_csv(file_path, index=False)
+            logging.info(f"Saved {len(df)} reviews for {bank} to {file_path}")
+
+    @instrumented('scrape')
     def scrape_all(self):
         """
         Scrape reviews for all banking apps
@@ -74,21 +211,10 @@ class PlayStoreScraper:
                 df = self.get_reviews(app_id)
                 
                 if not df.empty:
-                    # Add bank name and source
-                    df['bank'] = bank
-                    df['source'] = 'google_play'
-                    
-                    # Select and rename columns
-                    df = df[['content', 'score', 'at', 'bank', 'source']]
-                    df.columns = ['review', 'rating', 'date', 'bank', 'source']
-                    
-                    # Convert timestamp to YYYY-MM-DD
-                    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+                    df = self._format_reviews(df, bank)
                     
                     # Save to CSV with new naming format
-                    file_path = f'../data/raw/{bank}_review.csv'
-                    df.to_csv(file_path, index=False)
-                    logging.info(f"Saved {len(df)} reviews for {bank} to {file_path}")
+                    self._save_reviews(df, bank)
                     
                     all_reviews[bank] = df
                     
@@ -96,4 +222,252 @@ class PlayStoreScraper:
                 logging.error(f"Error processing {bank}: {str(e)}")
                 continue
         
-        return all_reviews
\ No newline at end of file
+        return all_reviews
+
+    def load_state(self):
+        """
+        Load the per-app incremental scraping watermarks
+
+        Returns:
+            dict: app_id -> {'review_id', 'at', 'ids_at_watermark'}, plus a
+                'sweep' entry while a fetch cut short by max_pages is unfinished
+        """
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading scrape state {self.state_path}, starting fresh: {str(e)}")
+            return {}
+
+    def save_state(self, state):
+        """Atomically write the per-app watermarks"""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def get_new_reviews(self, app_id, watermark=None, page_size=200, max_pages=50, sweep=None):
+        """
+        Fetch reviews newer than a watermark, newest first
+
+        Pages through Sort.NEWEST results and stops at the first review older
+        than the watermark timestamp. Reviews sharing the watermark timestamp
+        are checked against the ids recorded for that timestamp.
+
+        A sweep that ran out of pages in an earlier run is resumed from its
+        continuation token; if the token is rejected (or this version of
+        google_play_scraper cannot rebuild it), paging restarts from the
+        newest review. Either way reviews the sweep already stored are
+        skipped.
+
+        Args:
+            app_id (str): Play Store app ID
+            watermark (dict): State entry from load_state, or None for a first run
+            page_size (int): Reviews requested per page
+            max_pages (int): Upper bound on pages fetched in one call
+            sweep (dict): Unfinished sweep from the state entry, if any
+
+        Returns:
+            tuple: (list of new review dicts, continuation token of the last page,
+                whether paging reached the watermark or the oldest review)
+        """
+        watermark_at = None
+        seen_ids = set()
+        if watermark and 'at' in watermark:
+            watermark_at = datetime.fromisoformat(watermark['at'])
+            seen_ids = set(watermark.get('ids_at_watermark', [])) | {watermark['review_id']}
+
+        token = None
+        if sweep and sweep.get('token'):
+            token = _resume_token(sweep['token'], page_size)
+        resuming = token is not None
+
+        new_reviews = []
+        complete = False
+        for _ in range(max_pages):
+            try:
+                result, token = self.reviews_fn(
+                    app_id,
+                    lang='en',
+                    country='us',
+                    sort=Sort.NEWEST,
+                    count=page_size,
+                    continuation_token=token
+                )
+            except Exception as e:
+                if not resuming:
+                    raise
+                logging.warning(f"Could not resume paging for {app_id}, restarting from the newest review: {str(e)}")
+                resuming, token = False, None
+                continue
+            resuming = False
+
+            for review in result:
+                if watermark_at and review['at'] < watermark_at:
+                    complete = True
+                    break
+                if review['reviewId'] not in seen_ids and not _already_swept(review, sweep):
+                    new_reviews.append(review)
+
+            if complete or not result or token is None or getattr(token, 'token', None) is None:
+                complete = True
+                break
+        else:
+            logging.warning(f"Stopped after {max_pages} pages for {app_id} before reaching the watermark; "
+                            f"the next run resumes from this page")
+
+        logging.info(f"Fetched {len(new_reviews)} new reviews for {app_id}")
+        return new_reviews, token, complete
+
+    @instrumented('scrape')
+    def scrape_incremental(self, page_size=200, max_pages=50):
+        """
+        Fetch only reviews not seen in earlier runs and append them to the raw store
+
+        Per-app watermarks (newest reviewId and timestamp) are kept in
+        self.state_path and only advanced after the new rows have been
+        appended. When max_pages runs out before the watermark is reached,
+        the watermark stays put and the unfinished sweep (its continuation
+        token and the range of reviews it stored) is saved instead, so the
+        next run resumes paging into the gap rather than skipping it.
+
+        Returns:
+            dict: Dictionary of DataFrames with the new reviews for each bank
+        """
+        state = self.load_state()
+        new_by_bank = {}
+
+        for bank, app_id in self.apps.items():
+            try:
+                logging.info(f"Incrementally scraping reviews for {bank}")
+                entry = state.get(app_id) or {}
+                sweep = entry.get('sweep')
+                new_reviews, token, complete = self.get_new_reviews(
+                    app_id, entry, page_size=page_size, max_pages=max_pages, sweep=sweep
+                )
+                if new_reviews:
+                    df = self._format_reviews(pd.DataFrame(new_reviews), bank)
+                    self._save_reviews(df, bank, append=True)
+                    new_by_bank[bank] = df
+                    sweep = {
+                        'head': _merge_edge(sweep and sweep['head'], _edge(new_reviews, newest=True)),
+                        'low': _merge_edge(sweep and sweep['low'], _edge(new_reviews, newest=False), newest=False)
+                    }
+                if not sweep:
+                    continue
+
+                if complete:
+                    # The sweep met the watermark: everything up to its head is stored
+                    head = sweep['head']
+                    if entry.get('at') == head['at']:
+                        head = _merge_edge({'at': entry['at'], 'ids': entry['ids_at_watermark']}, head)
+                    state[app_id] = {'review_id': head['ids'][-1], 'at': head['at'], 'ids_at_watermark': head['ids']}
+                else:
+                    sweep['token'] = getattr(token, 'token', None)
+                    state[app_id] = {**entry, 'sweep': sweep}
+                self.save_state(state)
+
+            except Exception as e:
+                logging.error(f"Error incrementally processing {bank}: {str(e)}")
+                continue
+
+        return new_by_bank
+
+    def build_targets(self, langs=('en',), countries=('us',)):
+        """
+        Build the app x language x country scrape targets
+
+        Returns:
+            list: Dicts with bank, app_id, lang and country keys
+        """
+        return [
+            {'bank': bank, 'app_id': app_id, 'lang': lang, 'country': country}
+            for bank, app_id in self.apps.items()
+            for lang in langs
+            for country in countries
+        ]
+
+    def _fetch_with_retries(self, target, bucket, count, max_retries, backoff_base, sleep):
+        """
+        Fetch one target, backing off exponentially between failed attempts
+
+        Returns:
+            list: Review dicts, or None if every attempt failed
+        """
+        name = f"{target['bank']} ({target['lang']}-{target['country']})"
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            try:
+                result, _ = self.reviews_fn(
+                    target['app_id'],
+                    lang=target['lang'],
+                    country=target['country'],
+                    sort=Sort.NEWEST,
+                    count=count
+                )
+                logging.info(f"Successfully fetched {len(result)} reviews for {name}")
+                return result
+            except Exception as e:
+                if attempt == max_retries:
+                    logging.error(f"Giving up on {name} after {attempt + 1} attempts: {str(e)}")
+                    return None
+                delay = backoff_base * (2 ** attempt) * (1 + random.random())
+                logging.warning(f"Error fetching {name} (attempt {attempt + 1}), retrying in {delay:.1f}s: {str(e)}")
+                sleep(delay)
+
+    @instrumented('scrape')
+    def scrape_concurrent(self, targets=None, max_workers=8, rate=2.0, burst=None,
+                          max_retries=3, backoff_base=1.0, count=600, sleep=time.sleep):
+        """
+        Scrape many app/locale targets concurrently under a global rate limit
+
+        Every request, including retries, takes a token from one shared
+        TokenBucket, so adding targets adds parallelism but never raises the
+        request rate. Reviews of all locales of a bank are merged (deduplicated
+        on reviewId) and saved to raw_dir/{bank}_review.csv like scrape_all.
+
+        Args:
+            targets (list): Target dicts from build_targets (defaults to every app in en-us)
+            max_workers (int): Thread pool size
+            rate (float): Global requests per second
+            burst (float): Token bucket capacity
+            max_retries (int): Retries per target after the first attempt
+            backoff_base (float): Base delay in seconds for exponential backoff
+            count (int): Number of reviews to fetch per target
+            sleep (callable): Sleep function used for backoff and rate limiting
+
+        Returns:
+            dict: Dictionary of DataFrames containing reviews for each bank
+        """
+        targets = targets if targets is not None else self.build_targets()
+        bucket = TokenBucket(rate, burst, sleep=sleep)
+        results_by_bank = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (target, executor.submit(self._fetch_with_retries, target, bucket,
+                                         count, max_retries, backoff_base, sleep))
+                for target in targets
+            ]
+            for target, future in futures:
+                result = future.result()
+                if result:
+                    results_by_bank.setdefault(target['bank'], []).extend(result)
+
+        all_reviews = {}
+        for bank, results in results_by_bank.items():
+            try:
+                df = pd.DataFrame(results).drop_duplicates(subset=['reviewId'])
+                df = self._format_reviews(df, bank)
+                self._save_reviews(df, bank)
+                all_reviews[bank] = df
+            except Exception as e:
+                logging.error(f"Error processing {bank}: {str(e)}")
+                continue
+
+        return all_reviews
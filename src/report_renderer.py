@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from .visualization import Visualization, use_headless_backend
+
+# Bumped when chart code changes, so unchanged inputs are still re-rendered
+RENDER_VERSION = 1
+
+PERIOD_FREQUENCIES = {'week': 'W-SUN', 'month': 'M'}
+
+
+def _trends(cube, path, fig):
+    return Visualization.plot_sentiment_trends(cube, output_path=path, show=False, fig=fig, days=None)
+
+
+def _ratings(cube, path, fig):
+    return Visualization.plot_rating_distributions(cube, output_path=path, show=False, fig=fig)
+
+
+def _cloud(cube, path, fig):
+    return Visualization.plot_keyword_cloud(cube, output_path=path, show=False, fig=fig)
+
+
+# Chart name -> draw(cube, output_path, fig) returning whether it succeeded
+CHART_FUNCTIONS = {'trends': _trends, 'ratings': _ratings, 'cloud': _cloud}
+
+# One figure per worker process, cleared and redrawn for every chart
+_figure = None
+
+
+def _init_worker():
+    """Switch the worker to the Agg backend and create its reusable figure"""
+    global _figure
+    use_headless_backend()
+    import matplotlib.pyplot as plt
+    _figure = plt.figure(figsize=(10, 5))
+
+
+def _render_job(job):
+    """
+    Draw one chart and save it in every requested format
+
+    Args:
+        job (tuple): (chart name, AggregateCube slice, output paths)
+
+    Returns:
+        bool: Whether every file was written
+    """
+    chart, cube, paths = job
+    if not CHART_FUNCTIONS[chart](cube, paths[0], _figure):
+        return False
+    for path in paths[1:]:
+        _figure.savefig(path)
+    return True
+
+
+class ReportRenderer:
+    def __init__(self, cube, output_dir='reports', formats=('png',), period='week', workers=None,
+                 charts=tuple(CHART_FUNCTIONS)):
+        """
+        Render per-bank, per-period charts from an AggregateCube to files
+
+        Every (bank, period, chart) becomes one job drawn on the Agg backend
+        by a process pool whose workers each reuse a single figure. A
+        manifest in output_dir records a fingerprint of each chart's input
+        slice, so later runs only redraw charts whose aggregates changed.
+
+        Args:
+            cube (AggregateCube): Aggregates to plot
+            output_dir (str): Charts go to output_dir/{bank}/{period}/{chart}.{format}
+            formats (tuple): File formats, e.g. ('png', 'svg')
+            period (str): 'week' or 'month'
+            workers (int): Worker processes (None for one per CPU, 0 to render in this process)
+            charts (tuple): Chart names from CHART_FUNCTIONS
+        """
+        if period not in PERIOD_FREQUENCIES:
+            raise ValueError(f"Unknown period: {period}")
+        unknown = [chart for chart in charts if chart not in CHART_FUNCTIONS]
+        if unknown:
+            raise ValueError(f"Unknown charts: {', '.join(unknown)}")
+        self.cube = cube
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.period = period
+        self.workers = workers
+        self.charts = tuple(charts)
+        self.manifest_path = os.path.join(output_dir, 'manifest.json')
+
+    def periods(self, last=4):
+        """
+        The last periods up to the latest day in the cube
+
+        Returns:
+            list: (label, first day, last day) tuples, oldest first
+        """
+        if self.cube.facts.empty:
+            return []
+        latest = pd.Period(self.cube.facts['day'].max(), freq=PERIOD_FREQUENCIES[self.period])
+        periods = []
+        for offset in range(last - 1, -1, -1):
+            period = latest - offset
+            start, end = period.start_time.normalize(), period.end_time.normalize()
+            label = f"{start:%G-W%V}" if self.period == 'week' else f"{start:%Y-%m}"
+            periods.append((label, start, end))
+        return periods
+
+    def plan(self, banks=None, last=4):
+        """
+        Every chart job for banks x the last periods, with its input fingerprint
+
+        Periods in which a bank has no reviews are left out.
+
+        Returns:
+            list: Dicts with key, chart, cube, paths and fingerprint
+        """
+        banks = banks or sorted(self.cube.facts['bank_name'].dropna().unique())
+        jobs = []
+        for bank in banks:
+            for label, start, end in self.periods(last):
+                cube = self.cube.slice(bank=bank, start=start, end=end)
+                if cube.facts.empty:
+                    continue
+                data_fingerprint = cube.fingerprint()
+                for chart in self.charts:
+                    stem = os.path.join(self.output_dir, str(bank), label, chart)
+                    jobs.append({
+                        'key': f"{bank}/{label}/{chart}",
+                        'chart': chart,
+                        'cube': cube,
+                        'paths': [f"{stem}.{fmt}" for fmt in self.formats],
+                        'fingerprint': f"{RENDER_VERSION}:{'+'.join(self.formats)}:{data_fingerprint}"
+                    })
+        return jobs
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _run(self, payloads):
+        """Render payloads serially or in the process pool; results in payload order"""
+        if self.workers == 0:
+            _init_worker()
+            return [_render_job(payload) for payload in payloads]
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            return list(pool.map(_render_job, payloads))
+
+    def render(self, banks=None, last=4, force=False):
+        """
+        Render the charts whose inputs changed since the last run
+
+        Args:
+            banks (list): Banks to report on (None for every bank in the cube)
+            last (int): Number of most recent periods
+            force (bool): Redraw every chart
+
+        Returns:
+            dict: 'rendered', 'skipped' and 'failed' lists of chart keys
+        """
+        manifest = self._load_manifest()
+        jobs = self.plan(banks, last)
+        stale = [job for job in jobs
+                 if force or manifest.get(job['key']) != job['fingerprint']
+                 or not all(os.path.exists(path) for path in job['paths'])]
+        for job in stale:
+            os.makedirs(os.path.dirname(job['paths'][0]), exist_ok=True)
+
+        results = self._run([(job['chart'], job['cube'], job['paths']) for job in stale]) if stale else []
+        summary = {'rendered': [], 'skipped': [], 'failed': []}
+        stale_keys = {job['key'] for job in stale}
+        for job, ok in zip(stale, results):
+            if ok:
+                manifest[job['key']] = job['fingerprint']
+                summary['rendered'].append(job['key'])
+            else:
+                manifest.pop(job['key'], None)
+                summary['failed'].append(job['key'])
+        summary['skipped'] = [job['key'] for job in jobs if job['key'] not in stale_keys]
+        self._save_manifest(manifest)
+        logging.info(f"Report charts: {len(summary['rendered'])} rendered, {len(summary['skipped'])} unchanged, "
+                     f"{len(summary['failed'])} failed")
+        return summary
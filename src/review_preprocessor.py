@@ -2,33 +2,71 @@ import pandas as pd
 import logging
 import os
 import glob
+import hashlib
+import re
+from .instrumentation import instrumented
+from .language_detector import LanguageDetector
+from .near_duplicates import NearDuplicateDetector
+from .paths import data_path
+from .schema import enforce_schema
+
+# clean_review keeps characters where str.isalnum() is true plus ' .,!?-'.
+# For ASCII text the characters to drop are a fixed byte set; for other text
+# the regex below is exactly equivalent ("\w" is isalnum() plus underscore).
+_KEPT_PUNCTUATION = ' .,!?-'
+_ASCII_DROPPED = bytes(i for i in range(128) if not (chr(i).isalnum() or chr(i) in _KEPT_PUNCTUATION))
+_DROPPED_RE = re.compile(r'[^\w .,!?-]|_')
+
+
+def _clean_text(text):
+    """Fast equivalent of ReviewPreprocessor.clean_review for a str"""
+    text = ' '.join(text.split())
+    if text.isascii():
+        text = text.encode('ascii').translate(None, _ASCII_DROPPED).decode('ascii')
+    else:
+        text = _DROPPED_RE.sub('', text)
+    return text.strip()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('preprocessor.log'),
-        logging.StreamHandler()
-    ]
-)
 
 class ReviewPreprocessor:
-    def __init__(self):
+    def __init__(self, store=None, near_duplicate_detector=None, language_detector=None):
         """
         Initialize the preprocessor
+
+        Args:
+            store (CsvReviewStore or ParquetReviewStore): Storage backend for
+                raw and processed reviews; None uses the CSV files under data/
+            near_duplicate_detector (NearDuplicateDetector): Clusters
+                near-duplicate reviews (defaults to NearDuplicateDetector())
+            language_detector (LanguageDetector): Labels each review's
+                language (defaults to LanguageDetector())
         """
+        self.store = store
+        self.near_duplicate_detector = near_duplicate_detector or NearDuplicateDetector()
+        self.language_detector = language_detector or LanguageDetector()
     
-    def load_data(self):
+    def load_data(self, columns=None, filters=None):
         """
         Load all processed review data and return a combined DataFrame
         
+        Args:
+            columns (list): Columns to load (store only; None loads all)
+            filters (list): (column, op, value) predicates pushed down to the
+                store, e.g. [('bank_name', '=', 'cbe')] (store only)
+
         Returns:
-            pd.DataFrame: Combined DataFrame with all processed reviews
+            pd.DataFrame: Combined DataFrame with all processed reviews, cast
+                to the compact review schema
         """
         try:
+            if self.store is not None:
+                df = self.store.read('processed', columns=columns, filters=filters)
+                if df.empty:
+                    logging.error("No processed reviews found in store")
+                return enforce_schema(df)
+
             # Find all processed review files
-            processed_files = glob.glob('../data/processed/*_review.csv')
+            processed_files = glob.glob(data_path('processed', '*_review.csv'))
             if not processed_files:
                 logging.error("No processed review files found")
                 return pd.DataFrame()
@@ -54,7 +92,7 @@ class ReviewPreprocessor:
             
             # Combine all DataFrames
             combined_df = pd.concat(dfs, ignore_index=True)
-            return combined_df
+            return enforce_schema(combined_df)
             
         except Exception as e:
             logging.error(f"Error loading data: {str(e)}")
@@ -84,15 +122,75 @@ class ReviewPreprocessor:
             logging.error(f"Error cleaning review text: {str(e)}")
             return ''
     
-    def process_reviews(self, df):
+    def clean_reviews(self, texts):
+        """
+        Clean a whole column of review texts
+
+        Produces exactly what clean_review returns for each value, but with
+        one precompiled byte translation (or regex for non-ASCII text) per
+        review instead of a per-character Python generator.
+
+        Args:
+            texts (pd.Series): Review texts
+
+        Returns:
+            pd.Series: Cleaned review texts with the same index
+        """
+        cleaned = [_clean_text(text) if isinstance(text, str) else '' for text in texts.tolist()]
+        return pd.Series(cleaned, index=texts.index)
+
+    def content_hashes(self, df):
+        """
+        Natural key per review: SHA-256 over bank, review date and cleaned text
+
+        Args:
+            df (pd.DataFrame): Reviews with bank_name, date and review_text
+
+        Returns:
+            pd.Series: 64-character hex digests with the same index
+        """
+        banks = df['bank_name'].astype(str).str.lower()
+        dates = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+        texts = df['review_text'].fillna('').astype(str)
+        hashes = [hashlib.sha256(f"{bank}\x00{date}\x00{text}".encode('utf-8')).hexdigest()
+                  for bank, date, text in zip(banks, dates, texts)]
+        return pd.Series(hashes, index=df.index)
+
+    def assign_clusters(self, df):
+        """
+        Label near-duplicate reviews of the same bank with a shared cluster
+
+        Args:
+            df (pd.DataFrame): Reviews with review_text and bank_name
+
+        Returns:
+            pd.DataFrame: Copy of df with cluster_id (numbered by first
+                appearance, so each cluster's first row is its representative)
+                and cluster_size
+        """
+        clustered = df.copy()
+        clustered['cluster_id'] = self.near_duplicate_detector.cluster(
+            clustered['review_text'].tolist(), clustered['bank_name'].to_numpy()
+        )
+        clustered['cluster_size'] = clustered.groupby('cluster_id')['cluster_id'].transform('size')
+        return clustered
+
+    @instrumented('preprocess')
+    def process_reviews(self, df, collapse_near_duplicates=False):
         """
         Process a DataFrame of reviews
         
         Args:
             df (pd.DataFrame): Raw reviews DataFrame
+            collapse_near_duplicates (bool): Keep one representative per
+                cluster of near-duplicate reviews (MinHash LSH), with
+                cluster_id and cluster_size columns, so each spam or
+                copy-paste cluster is analyzed and aggregated once
             
         Returns:
-            pd.DataFrame: Processed reviews DataFrame
+            pd.DataFrame: Processed reviews DataFrame with a language column;
+                SentimentAnalyzer and ThemeAnalyzer only run their English
+                models on rows labelled 'en'
         """
         try:
             if df.empty:
@@ -107,33 +205,54 @@ class ReviewPreprocessor:
                 processed_df = processed_df.rename(columns={'bank': 'bank_name'})
                 
             # Clean review text
-            processed_df['review_text'] = processed_df['review_text'].apply(self.clean_review)
+            processed_df['review_text'] = self.clean_reviews(processed_df['review_text'])
             
             # Remove empty reviews
             processed_df = processed_df[processed_df['review_text'].str.len() > 0]
             
             # Remove duplicates
             processed_df = processed_df.drop_duplicates(subset=['review_text', 'bank_name'])
+
+            # Collapse reviews that differ by a word or two
+            if collapse_near_duplicates:
+                processed_df = self.assign_clusters(processed_df).drop_duplicates(subset='cluster_id')
+
+            # Label the script/language so non-English rows skip the models
+            processed_df['language'] = self.language_detector.detect(processed_df['review_text'])
             
-            # Ensure date format
-            processed_df['date'] = pd.to_datetime(processed_df['date']).dt.strftime('%Y-%m-%d')
-            
-            return processed_df
+            # Compact column types; dates become day-precision datetimes
+            return enforce_schema(processed_df)
             
         except Exception as e:
             logging.error(f"Error processing reviews: {str(e)}")
             return pd.DataFrame()
     
-    def process_all_banks(self):  
+    def process_all_banks(self, collapse_near_duplicates=False):  
         """
         Process reviews for all banks
+
+        Args:
+            collapse_near_duplicates (bool): Passed on to process_reviews
         """
         try:
+            if self.store is not None:
+                for bank in self.store.banks('raw'):
+                    try:
+                        df = self.store.read('raw', filters=[('bank', '=', bank)])
+                        processed_df = self.process_reviews(df, collapse_near_duplicates)
+                        if not processed_df.empty:
+                            self.store.write(processed_df, 'processed')
+                            logging.info(f"Saved {len(processed_df)} processed reviews for {bank}")
+                    except Exception as e:
+                        logging.error(f"Error processing {bank}: {str(e)}")
+                        continue
+                return
+
             # Create processed directory if it doesn't exist
-            os.makedirs('../data/processed', exist_ok=True)
+            os.makedirs(data_path('processed'), exist_ok=True)
             
             # Get all raw review files
-            raw_files = glob.glob('../data/raw/*_review.csv')
+            raw_files = glob.glob(data_path('raw', '*_review.csv'))
             
             for file_path in raw_files:
                 try:
@@ -144,11 +263,11 @@ class ReviewPreprocessor:
                     df = pd.read_csv(file_path)
                     
                     # Process reviews
-                    processed_df = self.process_reviews(df)
+                    processed_df = self.process_reviews(df, collapse_near_duplicates)
                     
                     if not processed_df.empty:
                         # Save processed data with new naming format
-                        output_path = os.path.join('../data/processed', f'{bank}_review.csv')
+                        output_path = data_path('processed', f'{bank}_review.csv')
                         processed_df.to_csv(output_path, index=False)
                         logging.info(f"Saved {len(processed_df)} processed reviews for {bank}")
                     
@@ -0,0 +1,329 @@
+import glob
+import logging
+import os
+import shutil
+import uuid
+import pandas as pd
+from .paths import DATA_DIR
+from .schema import enforce_schema
+
+# Bank column used by each pipeline stage
+STAGE_BANK_COLUMNS = {
+    'raw': 'bank',
+    'processed': 'bank_name',
+    'analyzed': 'bank_name'
+}
+
+_FILTER_OPS = {
+    '=': lambda s, v: s == v,
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v)
+}
+
+
+def _filter_condition(operand, op, value):
+    """Build a condition from a pandas Series or a pyarrow dataset field"""
+    if op not in _FILTER_OPS:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    return _FILTER_OPS[op](operand, value)
+
+
+def apply_filters(df, filters):
+    """
+    Apply (column, op, value) filters to a DataFrame in memory
+
+    Args:
+        df (pd.DataFrame): Reviews
+        filters (list): Tuples like ('bank_name', '=', 'cbe'), all of which must hold
+
+    Returns:
+        pd.DataFrame: Matching rows
+    """
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        series = df[column]
+        if column == 'date':
+            series = pd.to_datetime(series)
+            value = [pd.Timestamp(v) for v in value] if op in ('in', 'not in') else pd.Timestamp(value)
+        mask &= _filter_condition(series, op, value)
+    return df[mask]
+
+
+class CsvReviewStore:
+    def __init__(self, base_dir=DATA_DIR):
+        """
+        CSV storage with the pipeline's original file layout
+
+        raw and processed reviews live in base_dir/{stage}/{bank}_review.csv,
+        analyzed reviews in base_dir/analyzed_reviews.csv.
+
+        Args:
+            base_dir (str): Root data directory
+        """
+        self.base_dir = base_dir
+
+    def _path(self, stage, bank=None):
+        if stage == 'analyzed':
+            return os.path.join(self.base_dir, 'analyzed_reviews.csv')
+        return os.path.join(self.base_dir, stage, f'{bank}_review.csv')
+
+    def banks(self, stage):
+        """Banks with stored reviews for a stage"""
+        if stage == 'analyzed':
+            df = self.read(stage, columns=[STAGE_BANK_COLUMNS[stage]])
+            return sorted(df[STAGE_BANK_COLUMNS[stage]].dropna().unique()) if not df.empty else []
+        files = glob.glob(os.path.join(self.base_dir, stage, '*_review.csv'))
+        return sorted(os.path.basename(f).replace('_review.csv', '') for f in files)
+
+    def write(self, df, stage, append=False):
+        """
+        Write reviews for a stage, one file per bank (single file for analyzed)
+
+        Args:
+            df (pd.DataFrame): Reviews containing the stage's bank column
+            stage (str): 'raw', 'processed' or 'analyzed'
+            append (bool): Append to existing files instead of replacing them
+        """
+        if stage == 'analyzed':
+            groups = [(None, df)]
+        else:
+            groups = df.groupby(STAGE_BANK_COLUMNS[stage], observed=True)
+        for bank, bank_df in groups:
+            path = self._path(stage, bank)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            write_header = not (append and os.path.exists(path))
+            bank_df.to_csv(path, mode='a' if append else 'w', header=write_header, index=False)
+            logging.info(f"Saved {len(bank_df)} {stage} reviews to {path}")
+
+    def read(self, stage, columns=None, filters=None):
+        """
+        Read reviews for a stage
+
+        CSV has no pushdown, so filters and projection are applied after parsing.
+
+        Args:
+            stage (str): 'raw', 'processed' or 'analyzed'
+            columns (list): Columns to return (None for all)
+            filters (list): (column, op, value) tuples, see apply_filters
+
+        Returns:
+            pd.DataFrame: Matching reviews
+        """
+        files = self._files(stage)
+        if not files:
+            return pd.DataFrame(columns=columns or [])
+
+        df = pd.concat([pd.read_csv(f, usecols=self._usecols(columns, filters)) for f in files],
+                       ignore_index=True)
+        df = apply_filters(df, filters)
+        return df[columns].reset_index(drop=True) if columns else df.reset_index(drop=True)
+
+    @staticmethod
+    def _usecols(columns, filters):
+        """Columns to parse: the projection plus anything the filters need"""
+        if not columns:
+            return None
+        return list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+
+    def _files(self, stage):
+        if stage == 'analyzed':
+            return [self._path(stage)] if os.path.exists(self._path(stage)) else []
+        return sorted(glob.glob(os.path.join(self.base_dir, stage, '*_review.csv')))
+
+    def iter_chunks(self, stage, chunk_size, columns=None, filters=None):
+        """
+        Stream reviews for a stage in chunks of at most chunk_size rows
+
+        Files are visited in a fixed order, so the chunk sequence is the
+        same on every call over unchanged data.
+
+        Yields:
+            pd.DataFrame: Next chunk of matching reviews
+        """
+        for file in self._files(stage):
+            for chunk in pd.read_csv(file, usecols=self._usecols(columns, filters), chunksize=chunk_size):
+                chunk = apply_filters(chunk, filters)
+                yield chunk[columns] if columns else chunk
+
+
+class ParquetReviewStore:
+    def __init__(self, base_dir=DATA_DIR):
+        """
+        Columnar storage as a Hive-partitioned Parquet dataset per stage
+
+        Each stage lives in base_dir/{stage}_parquet/ partitioned by bank and
+        review month ({bank_col}=cbe/month=2024-05/part-*.parquet). Monthly
+        rather than daily partitions keep files from becoming tiny; date
+        filters still prune partitions through the derived month column and
+        skip row groups through Parquet statistics. Columns are typed:
+        categorical bank, int8 rating, datetime64 date.
+
+        Args:
+            base_dir (str): Root data directory
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            logging.error("ParquetReviewStore requires pyarrow (pip install pyarrow)")
+            raise ImportError("pyarrow is required for the Parquet storage backend") from e
+        self.base_dir = base_dir
+
+    def _root(self, stage):
+        return os.path.join(self.base_dir, f'{stage}_parquet')
+
+    @staticmethod
+    def _typed(df, bank_col):
+        """Cast a frame to the stored column types and add the month partition"""
+        typed = enforce_schema(df.copy())
+        typed['month'] = typed['date'].dt.strftime('%Y-%m').fillna('unknown')
+        return typed
+
+    def banks(self, stage):
+        """Banks with stored reviews for a stage"""
+        bank_col = STAGE_BANK_COLUMNS[stage]
+        dirs = glob.glob(os.path.join(self._root(stage), f'{bank_col}=*'))
+        return sorted(os.path.basename(d).split('=', 1)[1] for d in dirs)
+
+    def write(self, df, stage, append=False):
+        """
+        Write reviews for a stage
+
+        Without append, every bank present in df has its partitions replaced,
+        matching the per-bank overwrite of the CSV layout.
+
+        Args:
+            df (pd.DataFrame): Reviews containing the stage's bank column
+            stage (str): 'raw', 'processed' or 'analyzed'
+            append (bool): Add new files next to existing ones instead of replacing
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df.empty:
+            return
+        bank_col = STAGE_BANK_COLUMNS[stage]
+        root = self._root(stage)
+        typed = self._typed(df, bank_col)
+
+        if not append:
+            for bank in typed[bank_col].unique():
+                shutil.rmtree(os.path.join(root, f'{bank_col}={bank}'), ignore_errors=True)
+
+        table = pa.Table.from_pandas(typed, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=root,
+            partition_cols=[bank_col, 'month'],
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        logging.info(f"Saved {len(typed)} {stage} reviews to {root}")
+
+    @staticmethod
+    def _month_filters(filters):
+        """Derive month partition filters from date filters for partition pruning"""
+        derived = []
+        for column, op, value in filters:
+            if column != 'date':
+                continue
+            if op in ('>', '>='):
+                derived.append(('month', '>=', pd.Timestamp(value).strftime('%Y-%m')))
+            elif op in ('<', '<='):
+                derived.append(('month', '<=', pd.Timestamp(value).strftime('%Y-%m')))
+            elif op in ('=', '=='):
+                derived.append(('month', '=', pd.Timestamp(value).strftime('%Y-%m')))
+        return derived
+
+    def _expression(self, filters):
+        """Combine (column, op, value) filters into one pyarrow dataset expression"""
+        import pyarrow.dataset as ds
+
+        expression = None
+        for column, op, value in list(filters or []) + self._month_filters(filters or []):
+            if column == 'date':
+                value = [pd.Timestamp(v) for v in value] if op in ('in', 'not in') else pd.Timestamp(value)
+            condition = _filter_condition(ds.field(column), op, value)
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def _to_pandas(self, table, stage):
+        df = table.to_pandas()
+        bank_col = STAGE_BANK_COLUMNS[stage]
+        if bank_col in df.columns:
+            df[bank_col] = df[bank_col].astype(str).astype('category')
+        return enforce_schema(df)
+
+    def iter_chunks(self, stage, chunk_size, columns=None, filters=None):
+        """
+        Stream reviews for a stage in record batches of at most chunk_size rows
+
+        Batches come back in dataset order, so the chunk sequence is the
+        same on every call over unchanged data.
+
+        Yields:
+            pd.DataFrame: Next chunk of matching reviews
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        root = self._root(stage)
+        if not os.path.isdir(root):
+            return
+        dataset = ds.dataset(root, format='parquet', partitioning='hive')
+        read_columns = columns or [name for name in dataset.schema.names if name != 'month']
+        for batch in dataset.to_batches(columns=read_columns, filter=self._expression(filters),
+                                        batch_size=chunk_size):
+            if batch.num_rows:
+                yield self._to_pandas(pa.Table.from_batches([batch]), stage)
+
+    def read(self, stage, columns=None, filters=None):
+        """
+        Read reviews for a stage with column projection and predicate pushdown
+
+        Bank filters and date ranges prune whole partitions; remaining
+        predicates are pushed to Parquet row-group statistics.
+
+        Args:
+            stage (str): 'raw', 'processed' or 'analyzed'
+            columns (list): Columns to return (None for all)
+            filters (list): (column, op, value) tuples, see apply_filters
+
+        Returns:
+            pd.DataFrame: Matching reviews
+        """
+        import pyarrow.dataset as ds
+
+        root = self._root(stage)
+        if not os.path.isdir(root):
+            return pd.DataFrame(columns=columns or [])
+
+        dataset = ds.dataset(root, format='parquet', partitioning='hive')
+        expression = self._expression(filters)
+        read_columns = columns or [name for name in dataset.schema.names if name != 'month']
+        return self._to_pandas(dataset.to_table(columns=read_columns, filter=expression), stage)
+
+
+def get_store(backend='csv', base_dir=DATA_DIR):
+    """
+    Create a review store
+
+    Args:
+        backend (str): 'csv' or 'parquet'
+        base_dir (str): Root data directory
+
+    Returns:
+        CsvReviewStore or ParquetReviewStore
+    """
+    if backend == 'csv':
+        return CsvReviewStore(base_dir)
+    if backend == 'parquet':
+        return ParquetReviewStore(base_dir)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,100 @@
+import logging
+import pandas as pd
+
+# Canonical column kinds of review frames at every stage (raw names included)
+REVIEW_SCHEMA = {
+    'review': 'text',
+    'review_text': 'text',
+    'keywords': 'text',
+    'themes': 'text',
+    'bank': 'category',
+    'bank_name': 'category',
+    'source': 'category',
+    'sentiment_label': 'category',
+    'language': 'category',
+    'rating': 'int8',
+    'sentiment_score': 'float32',
+    'date': 'date',
+    'cluster_id': 'int32',
+    'cluster_size': 'int32'
+}
+
+
+def text_dtype():
+    """Arrow-backed string dtype when pyarrow is installed, pandas' own otherwise"""
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype('pyarrow')
+    except ImportError:
+        return pd.StringDtype()
+
+
+def _integer(series, dtype):
+    """Cast to a numpy integer dtype, or its nullable twin when values are missing"""
+    series = pd.to_numeric(series, errors='coerce')
+    return series.astype(dtype) if series.notna().all() else series.astype(dtype.capitalize())
+
+
+def _cast(series, kind):
+    if kind == 'text':
+        return series.astype(text_dtype())
+    if kind == 'category':
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        return series.astype(str).where(series.notna()).astype('category')
+    if kind == 'float32':
+        return pd.to_numeric(series, errors='coerce').astype('float32')
+    if kind == 'date':
+        return pd.to_datetime(series, errors='coerce').dt.normalize()
+    return _integer(series, kind)
+
+
+def enforce_schema(df):
+    """
+    Cast the known columns of a review frame to their compact types
+
+    Bank, source, label and language become categoricals, rating int8,
+    sentiment_score float32, date a day-precision datetime64 and free text
+    Arrow-backed strings; unknown columns are left alone. Casting an
+    already typed frame is cheap, so stages can call this on their output.
+
+    Args:
+        df (pd.DataFrame): Reviews at any pipeline stage
+
+    Returns:
+        pd.DataFrame: df with its known columns cast (same object)
+    """
+    for column, kind in REVIEW_SCHEMA.items():
+        if column in df.columns:
+            try:
+                df[column] = _cast(df[column], kind)
+            except (TypeError, ValueError) as e:
+                logging.error(f"Could not cast column {column} to {kind}: {str(e)}")
+    return df
+
+
+def memory_report(df):
+    """
+    Deep memory usage of a frame, per column
+
+    Args:
+        df (pd.DataFrame): Any frame
+
+    Returns:
+        dict: rows, total_mb and {column: {'dtype', 'mb'}}
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    columns = {
+        column: {'dtype': str(df[column].dtype), 'mb': round(usage[column] / 2 ** 20, 3)}
+        for column in df.columns
+    }
+    return {'rows': len(df), 'total_mb': round(usage.sum() / 2 ** 20, 3), 'columns': columns}
+
+
+def log_memory(df, stage):
+    """Log a one-line memory summary of a stage's frame"""
+    report = memory_report(df)
+    widest = sorted(report['columns'].items(), key=lambda item: item[1]['mb'], reverse=True)[:3]
+    details = ', '.join(f"{column} {stats['mb']} MB ({stats['dtype']})" for column, stats in widest)
+    logging.info(f"{stage}: {report['rows']} rows in {report['total_mb']} MB; largest columns: {details}")
+    return report
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import pandas as pd
+from .paths import data_path
+from .review_preprocessor import ReviewPreprocessor
+
+# Query words; a trailing * asks for a prefix match
+_QUERY_TERM_RE = re.compile(r'\w+\*?')
+
+# Columns returned by search, best match first
+RESULT_COLUMNS = ['bank_name', 'review_date', 'rating', 'sentiment_label', 'sentiment_score',
+                  'review_text', 'keywords', 'rank']
+
+
+def _optional(series, convert):
+    """Python values for SQLite with missing ones as None"""
+    return [None if pd.isna(value) else convert(value) for value in series]
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def build_match_query(query, match_all=True):
+    """
+    FTS5 MATCH expression for free text typed by a user
+
+    Every word is quoted, so punctuation and FTS5 keywords in the query are
+    searched for instead of being parsed as query syntax.
+
+    Args:
+        query (str): Words to search for, e.g. "OTP login fail*"
+        match_all (bool): Require every word (False for any word)
+
+    Returns:
+        str: MATCH expression, or '' when the query has no words
+    """
+    terms = []
+    for term in _QUERY_TERM_RE.findall(query or ''):
+        prefix = term.endswith('*')
+        terms.append(f'"{term.rstrip("*")}"' + ('*' if prefix else ''))
+    return (' AND ' if match_all else ' OR ').join(terms)
+
+
+class ReviewSearchIndex:
+    def __init__(self, path=data_path('review_index.sqlite')):
+        """
+        Full-text index of reviews with bank, rating, date and sentiment filters
+
+        Reviews live in a plain table keyed by the preprocessor's content
+        hash, with an SQLite FTS5 index over their text and keywords kept in
+        sync by triggers. add upserts a batch, so the index is updated
+        incrementally as reviews are processed and later analyzed, and
+        search answers ranked (BM25) queries without loading the corpus.
+
+        Args:
+            path (str): SQLite database file (':memory:' for a throwaway index)
+        """
+        try:
+            if path != ':memory:':
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self.path = path
+            self.connection = sqlite3.connect(path)
+            self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                id INTEGER PRIMARY KEY,
+                content_hash TEXT NOT NULL UNIQUE,
+                bank_name TEXT,
+                review_date TEXT,
+                rating INTEGER,
+                sentiment_label TEXT,
+                sentiment_score REAL,
+                review_text TEXT,
+                keywords TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_reviews_bank_date ON reviews (bank_name COLLATE NOCASE, review_date);
+            CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews (review_date);
+            CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+                review_text, keywords, content='reviews', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS reviews_ai AFTER INSERT ON reviews BEGIN
+                INSERT INTO reviews_fts (rowid, review_text, keywords)
+                VALUES (new.id, new.review_text, new.keywords);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reviews_ad AFTER DELETE ON reviews BEGIN
+                INSERT INTO reviews_fts (reviews_fts, rowid, review_text, keywords)
+                VALUES ('delete', old.id, old.review_text, old.keywords);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reviews_au AFTER UPDATE OF review_text, keywords ON reviews BEGIN
+                INSERT INTO reviews_fts (reviews_fts, rowid, review_text, keywords)
+                VALUES ('delete', old.id, old.review_text, old.keywords);
+                INSERT INTO reviews_fts (rowid, review_text, keywords)
+                VALUES (new.id, new.review_text, new.keywords);
+            END;
+            CREATE TABLE IF NOT EXISTS index_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                meta TEXT NOT NULL
+            );
+            """)
+            row = self.connection.execute("SELECT meta FROM index_meta WHERE id = 1").fetchone()
+            # Free-form progress markers, e.g. chunks folded in by run_streaming
+            self.meta = json.loads(row[0]) if row else {}
+            self.preprocessor = ReviewPreprocessor()
+            logging.info(f"Review search index opened at {path}")
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open review search index at {path}: {str(e)}")
+            raise
+
+    def add(self, df):
+        """
+        Insert new reviews and update changed ones
+
+        Rows without sentiment_label, sentiment_score or keywords (e.g.
+        processed but not yet analyzed reviews) keep any values already
+        indexed for them. Unchanged rows are not rewritten.
+
+        Args:
+            df (pd.DataFrame): Reviews with review_text, bank_name, date and
+                rating, plus analysis columns when available
+
+        Returns:
+            int: Number of reviews inserted or updated
+        """
+        if df.empty:
+            return 0
+        missing = pd.Series(None, index=df.index, dtype=object)
+        rows = list(zip(
+            self.preprocessor.content_hashes(df),
+            df['bank_name'].astype(str),
+            _optional(pd.to_datetime(df['date'], errors='coerce'), _day),
+            _optional(pd.to_numeric(df['rating'], errors='coerce'), int),
+            _optional(df.get('sentiment_label', missing), str),
+            _optional(pd.to_numeric(df.get('sentiment_score', missing), errors='coerce'), float),
+            df['review_text'].fillna('').astype(str),
+            _optional(df.get('keywords', missing), str)
+        ))
+        try:
+            cursor = self.connection.executemany("""
+            INSERT INTO reviews (content_hash, bank_name, review_date, rating, sentiment_label,
+                                 sentiment_score, review_text, keywords)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (content_hash) DO UPDATE SET
+                rating = excluded.rating,
+                sentiment_label = COALESCE(excluded.sentiment_label, reviews.sentiment_label),
+                sentiment_score = COALESCE(excluded.sentiment_score, reviews.sentiment_score),
+                keywords = COALESCE(excluded.keywords, reviews.keywords)
+            WHERE reviews.rating IS NOT excluded.rating
+                OR excluded.sentiment_label IS NOT NULL AND reviews.sentiment_label IS NOT excluded.sentiment_label
+                OR excluded.sentiment_score IS NOT NULL AND reviews.sentiment_score IS NOT excluded.sentiment_score
+                OR excluded.keywords IS NOT NULL AND reviews.keywords IS NOT excluded.keywords
+            """, rows)
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error indexing reviews: {str(e)}")
+            self.connection.rollback()
+            raise
+        # rowcount leaves out the trigger writes to reviews_fts
+        logging.info(f"Indexed {len(rows)} reviews ({cursor.rowcount} new or changed)")
+        return cursor.rowcount
+
+    def add_store(self, store, stage='analyzed', chunk_size=5000):
+        """
+        Index every review of a store stage, chunk by chunk
+
+        Args:
+            store (CsvReviewStore or ParquetReviewStore): Review storage
+            stage (str): 'processed' or 'analyzed'
+            chunk_size (int): Reviews per batch
+
+        Returns:
+            int: Number of reviews inserted or updated
+        """
+        return sum(self.add(chunk) for chunk in store.iter_chunks(stage, chunk_size))
+
+    def search(self, query, bank=None, ratings=None, start=None, end=None, label=None,
+               limit=20, match_all=True):
+        """
+        Ranked reviews matching a text query and filters
+
+        Args:
+            query (str): Words to search for in review text and keywords
+                (see build_match_query); empty to filter only, newest first
+            bank (str): Only this bank (case-insensitive)
+            ratings (list): Only these star ratings
+            start: First review date to include
+            end: Last review date to include
+            label (str): Only this sentiment label
+            limit (int): Maximum results
+            match_all (bool): Require every query word (False for any word)
+
+        Returns:
+            pd.DataFrame: RESULT_COLUMNS, best match first (lower rank is better)
+        """
+        match = build_match_query(query, match_all)
+        conditions, params = [], []
+        if match:
+            source = "reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid"
+            rank = "bm25(reviews_fts, 1.0, 0.5)"
+            conditions.append("reviews_fts MATCH ?")
+            params.append(match)
+        else:
+            source, rank = "reviews r", "0.0"
+        if bank is not None:
+            conditions.append("r.bank_name = ? COLLATE NOCASE")
+            params.append(str(bank))
+        if ratings:
+            ratings = [int(rating) for rating in ratings]
+            conditions.append(f"r.rating IN ({','.join('?' * len(ratings))})")
+            params.extend(ratings)
+        if start is not None:
+            conditions.append("r.review_date >= ?")
+            params.append(_day(start))
+        if end is not None:
+            conditions.append("r.review_date <= ?")
+            params.append(_day(end))
+        if label is not None:
+            conditions.append("r.sentiment_label = ?")
+            params.append(label)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "rank, r.review_date DESC" if match else "r.review_date DESC"
+        sql = f"""
+        SELECT r.bank_name, r.review_date, r.rating, r.sentiment_label, r.sentiment_score,
+               r.review_text, r.keywords, {rank} AS rank
+        FROM {source} {where}
+        ORDER BY {order}
+        LIMIT ?
+        """
+        rows = self.connection.execute(sql, params + [int(limit)]).fetchall()
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+    def save(self, path=None):
+        """Commit the index and its meta markers (path is the index's own file)"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO index_meta (id, meta) VALUES (1, ?)", (json.dumps(self.meta),)
+        )
+        self.connection.commit()
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
@@ -1,18 +1,178 @@
+import argparse
+import os
+import shutil
+import time
 import pandas as pd
-from transformers import pipeline
 import logging
+from .instrumentation import instrumented, metrics
+from .language_detector import SKIPPED_LABEL, expand_to_rows, model_mask
+from .paths import data_path
+from .schema import enforce_schema
+from .stream_ledger import review_keys
+
+# Inference backends behind the same analyze_sentiment/analyze_reviews API
+BACKENDS = ('torch', 'onnx', 'quantized')
+
+# Column holding when a row was (re-)scored, as an ISO 8601 UTC timestamp;
+# the database sync ships rows changed since its watermark by this column
+ANALYZED_AT = 'analyzed_at'
+
+# Columns the database sync ships; a row whose values are unchanged keeps its stamp
+SYNCED_COLUMNS = ('rating', 'date', 'sentiment_label', 'sentiment_score', 'keywords')
+
+# Fixed sample for comparing a backend against torch
+PARITY_SAMPLE = [
+    "Great app, transfers are fast and easy",
+    "The app keeps crashing when I try to login",
+    "Very slow, money transfer failed twice",
+    "Excellent service, thank you",
+    "Worst banking app ever",
+    "I can not see my balance after the update",
+    "Simple and clean design, works well",
+    "Customer support never answers the phone",
+    "OTP code never arrives",
+    "Good but needs a dark mode",
+    "It is okay",
+    "Useless, uninstalling",
+    "Best app in Ethiopia",
+    "Login works but the statement page shows an error",
+    "Please fix the bug in airtime purchase",
+    "Fast and reliable",
+    "Too many ads and the screen freezes",
+    "I love the new update",
+    "Transaction pending for three days, no refund",
+    "Nice"
+]
+
+
+def _unchanged(current, earlier):
+    """Positional mask of values equal in both series, missing matching missing"""
+    if pd.api.types.is_numeric_dtype(current):
+        # Scores come back from CSV as float64 text of a float32 value
+        current = pd.to_numeric(current, errors='coerce').astype('float32')
+        earlier = pd.to_numeric(earlier, errors='coerce').astype('float32')
+    elif pd.api.types.is_datetime64_any_dtype(current):
+        earlier = pd.to_datetime(earlier, errors='coerce')
+    else:
+        current = current.astype(object).where(current.notna(), '').astype(str)
+        earlier = earlier.astype(object).where(earlier.notna(), '').astype(str)
+    return (current == earlier).to_numpy() | (current.isna() & earlier.isna()).to_numpy()
+
+
+def stamp_analyzed(df, previous=None, compare=SYNCED_COLUMNS):
+    """
+    Stamp the rows of a scored frame whose results changed with the current UTC time
+
+    Shared by every analyze_reviews implementation, so local and remote
+    scoring write the same columns. Rows found in previous (by review text
+    and bank) with the same compare values keep their earlier stamp, so
+    re-scoring an unchanged corpus leaves nothing for the database sync.
+
+    Args:
+        df (pd.DataFrame): Reviews with sentiment_label and sentiment_score
+        previous (pd.DataFrame): Earlier output of the same reviews with
+            ANALYZED_AT, e.g. the last analyzed_reviews.csv
+        compare (tuple): Columns that must match for a row to keep its stamp;
+            those missing from either frame are ignored
+
+    Returns:
+        pd.DataFrame: df with ANALYZED_AT set (same object)
+    """
+    stamps = pd.Series(pd.Timestamp.now(tz='UTC').isoformat(timespec='microseconds'), index=df.index, dtype=object)
+    if previous is not None and not previous.empty and ANALYZED_AT in previous.columns:
+        earlier = previous.set_axis(review_keys(previous).to_numpy())
+        earlier = earlier[~earlier.index.duplicated(keep='last')]
+        earlier = earlier.reindex(review_keys(df).to_numpy()).set_axis(df.index)
+        keep = earlier[ANALYZED_AT].notna().to_numpy(copy=True)
+        for column in compare:
+            if column in df.columns and column in earlier.columns:
+                keep &= _unchanged(df[column], earlier[column])
+        stamps[keep] = earlier[ANALYZED_AT].to_numpy()[keep]
+        logging.info(f"Kept the earlier {ANALYZED_AT} of {int(keep.sum())} unchanged reviews")
+    df[ANALYZED_AT] = stamps
+    return df
 
 class SentimentAnalyzer:
-    def __init__(self):
-        """Initialize sentiment analyzer with DistilBERT model"""
+    model_name = "distilbert-base-uncased-finetuned-sst-2-english"
+
+    def __init__(self, batch_size=32, cache=None, revision="main", backend="torch", analyzer=None):
+        """
+        Initialize sentiment analyzer with DistilBERT model
+
+        Args:
+            batch_size (int): Number of reviews per forward pass in
+                analyze_reviews. Values <= 1 score reviews one at a time.
+            cache (SentimentCache): Optional persistent result cache; not
+                used with an injected analyzer, whose results are not the model's
+            revision (str): Model revision, part of the cache key
+            backend (str): 'torch', 'onnx' (ONNX Runtime export via optimum)
+                or 'quantized' (dynamic int8 quantization of the Linear layers)
+            analyzer (callable): Prebuilt pipeline-like scorer used instead of
+                loading a model, e.g. a stub for offline benchmarks
+        """
         try:
-            self.analyzer = pipeline("sentiment-analysis", 
-                                   model="distilbert-base-uncased-finetuned-sst-2-english")
-            logging.info("Sentiment analyzer initialized successfully")
+            self.analyzer = analyzer if analyzer is not None else self._build_pipeline(backend, revision)
+            if analyzer is not None and cache is not None:
+                # Cached results are keyed by model_id, which an injected scorer does not match
+                logging.warning("Sentiment cache disabled for an injected analyzer")
+                cache = None
+            self.batch_size = batch_size
+            self.cache = cache
+            self.revision = revision
+            self.backend = backend
+            logging.info(f"Sentiment analyzer initialized successfully ({backend} backend)")
         except Exception as e:
             logging.error(f"Failed to initialize sentiment analyzer: {str(e)}")
             raise
 
+    @classmethod
+    def onnx_cache_dir(cls, revision="main"):
+        """Directory holding the ONNX export of the model at a revision"""
+        return data_path('onnx', f"{cls.model_name.replace('/', '--')}@{revision}")
+
+    @classmethod
+    def _build_pipeline(cls, backend, revision):
+        """Sentiment pipeline running on the requested inference backend"""
+        # transformers (and torch) are only imported once an analyzer is built
+        from transformers import pipeline
+
+        if backend == 'torch':
+            return pipeline("sentiment-analysis",
+                            model=cls.model_name,
+                            revision=revision)
+
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(cls.model_name, revision=revision)
+        if backend == 'onnx':
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+            except ImportError as e:
+                raise ImportError("The onnx backend requires optimum[onnxruntime]") from e
+            # Exporting to ONNX takes far longer than loading, so it is done
+            # once per revision and the saved model is loaded afterwards
+            cache_dir = cls.onnx_cache_dir(revision)
+            if os.path.exists(os.path.join(cache_dir, 'model.onnx')):
+                model = ORTModelForSequenceClassification.from_pretrained(cache_dir)
+            else:
+                logging.info(f"Exporting {cls.model_name} to ONNX in {cache_dir}")
+                model = ORTModelForSequenceClassification.from_pretrained(
+                    cls.model_name, revision=revision, export=True
+                )
+                # A half-written export never sits at cache_dir
+                tmp_dir = f"{cache_dir}.tmp"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                model.save_pretrained(tmp_dir)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                os.replace(tmp_dir, cache_dir)
+        elif backend == 'quantized':
+            import torch
+            from transformers import AutoModelForSequenceClassification
+            model = AutoModelForSequenceClassification.from_pretrained(cls.model_name, revision=revision)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            raise ValueError(f"Unknown sentiment backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
     def analyze_sentiment(self, text):
         """Analyze sentiment of a single text"""
         try:
@@ -25,20 +185,186 @@ class SentimentAnalyzer:
             logging.error(f"Error analyzing sentiment: {str(e)}")
             return {'label': 'ERROR', 'score': 0.0}
 
-    def analyze_reviews(self, df):
-        """Analyze sentiment for all reviews in dataframe"""
+    def _token_lengths(self, texts):
+        """Token count per text, used to group similar lengths into a batch"""
+        tokenizer = getattr(self.analyzer, 'tokenizer', None)
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer(texts, add_special_tokens=False, truncation=True)
+                return [len(ids) for ids in encoded['input_ids']]
+            except Exception as e:
+                logging.warning(f"Tokenizer length lookup failed, using word counts: {str(e)}")
+        return [len(text.split()) for text in texts]
+
+    def analyze_sentiment_batch(self, texts, batch_size=None):
+        """
+        Analyze sentiment of many texts with batched forward passes
+
+        Texts are sorted by token length so each batch is padded to a
+        similar length. A batch that fails is retried one text at a time
+        through analyze_sentiment, so a single bad review still only
+        produces an ERROR entry for itself.
+
+        Args:
+            texts (list): Review texts to score
+            batch_size (int): Texts per forward pass (defaults to self.batch_size)
+
+        Returns:
+            list: One {'label', 'score'} dict per text, in input order
+        """
+        batch_size = batch_size or self.batch_size
+        results = [None] * len(texts)
+
+        # Non-string values go straight through the per-row fallback
+        valid = []
+        for i, text in enumerate(texts):
+            if isinstance(text, str):
+                valid.append(i)
+            else:
+                results[i] = self.analyze_sentiment(text)
+
+        lengths = self._token_lengths([texts[i] for i in valid])
+        order = [valid[j] for j in sorted(range(len(valid)), key=lambda j: lengths[j])]
+
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch_idx]
+            try:
+                batch_start = time.perf_counter()
+                outputs = self.analyzer(batch_texts, batch_size=len(batch_texts), truncation=True)
+                metrics.observe('sentiment_batch', time.perf_counter() - batch_start)
+                for i, result in zip(batch_idx, outputs):
+                    results[i] = {'label': result['label'], 'score': result['score']}
+            except Exception as e:
+                logging.error(f"Error analyzing sentiment batch, falling back to single reviews: {str(e)}")
+                for i in batch_idx:
+                    results[i] = self.analyze_sentiment(texts[i])
+
+        return results
+
+    @property
+    def model_id(self):
+        """Model name, revision and non-torch backend, used to key cached results"""
+        model_id = f"{self.model_name}@{self.revision}"
+        return model_id if self.backend == 'torch' else f"{model_id}+{self.backend}"
+
+    def _score_texts(self, texts, batch_size):
+        """Score texts, serving what we can from the cache"""
+        cached = {}
+        if self.cache is not None:
+            lookup = [i for i, text in enumerate(texts) if isinstance(text, str)]
+            hits = self.cache.get_many([texts[i] for i in lookup], self.model_id)
+            cached = {lookup[j]: result for j, result in hits.items()}
+            stats = self.cache.stats()
+            logging.info(f"Sentiment cache: {len(cached)} hits, {len(texts) - len(cached)} to score "
+                         f"({stats['entries']} entries)")
+
+        missing = [i for i in range(len(texts)) if i not in cached]
+        missing_texts = [texts[i] for i in missing]
+        if batch_size and batch_size > 1:
+            scored = self.analyze_sentiment_batch(missing_texts, batch_size)
+        else:
+            scored = [self.analyze_sentiment(text) for text in missing_texts]
+
+        if self.cache is not None:
+            to_store = [(text, result) for text, result in zip(missing_texts, scored) if isinstance(text, str)]
+            if to_store:
+                self.cache.put_many([t for t, _ in to_store], [r for _, r in to_store], self.model_id)
+
+        results = [None] * len(texts)
+        for i, result in cached.items():
+            results[i] = result
+        for i, result in zip(missing, scored):
+            results[i] = result
+        return results
+
+    @instrumented('sentiment')
+    def analyze_reviews(self, df, batch_size=None):
+        """
+        Analyze sentiment for all reviews in dataframe
+
+        Args:
+            df (pd.DataFrame): Reviews with review_text, bank_name and rating
+            batch_size (int): Overrides self.batch_size for this call
+
+        Returns:
+            tuple: (df with sentiment_label/sentiment_score/analyzed_at, mean score by bank
+                and rating); rows whose language column is not English get SKIPPED and no score
+        """
         try:
-            # Apply sentiment analysis to each review
-            sentiments = df['review_text'].apply(self.analyze_sentiment)
-            
+            # Rows labelled non-English by the preprocessor are not scored
+            mask = model_mask(df)
+            texts = df['review_text'].to_numpy()[mask].tolist()
+
+            # Cached results first, then batched (or per-row) inference
+            # for the rest; results come back in row order
+            results = self._score_texts(texts, batch_size or self.batch_size)
+
             # Extract labels and scores
-            df['sentiment_label'] = sentiments.apply(lambda x: x['label'])
-            df['sentiment_score'] = sentiments.apply(lambda x: x['score'])
-            
+            df['sentiment_label'] = expand_to_rows([r['label'] for r in results], mask, SKIPPED_LABEL, df.index)
+            df['sentiment_score'] = expand_to_rows(
+                [r['score'] for r in results], mask, float('nan'), df.index
+            ).astype(float)
+            stamp_analyzed(df)
+            if not mask.all():
+                logging.info(f"Skipped sentiment for {int((~mask).sum())} non-English reviews")
+            enforce_schema(df)
+
             # Aggregate by bank and rating
-            agg_sentiment = df.groupby(['bank_name', 'rating'])['sentiment_score'].mean()
-            
+            agg_sentiment = df.groupby(['bank_name', 'rating'], observed=True)['sentiment_score'].mean()
+
             return df, agg_sentiment
         except Exception as e:
             logging.error(f"Error in batch sentiment analysis: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+
+def check_parity(reference, candidate, texts=None, min_agreement=0.95, score_tolerance=0.05):
+    """
+    Compare a candidate backend against a reference analyzer on a fixed sample
+
+    Args:
+        reference (SentimentAnalyzer): Usually the torch backend
+        candidate (SentimentAnalyzer): Backend under test
+        texts (list): Sample to score (defaults to PARITY_SAMPLE)
+        min_agreement (float): Minimum share of matching labels to pass
+        score_tolerance (float): Maximum mean absolute score difference to pass
+
+    Returns:
+        dict: Label agreement, score differences, timings and a passed flag
+    """
+    texts = list(texts or PARITY_SAMPLE)
+    timings = {}
+    outputs = {}
+    for name, analyzer in (('reference', reference), ('candidate', candidate)):
+        start = time.perf_counter()
+        outputs[name] = analyzer.analyze_sentiment_batch(texts)
+        timings[name] = time.perf_counter() - start
+
+    agreement = sum(r['label'] == c['label'] for r, c in zip(outputs['reference'], outputs['candidate'])) / len(texts)
+    # Compare P(positive) so a flipped label with similar confidence still counts as a large difference
+    diffs = [
+        abs((r['score'] if r['label'] == 'POSITIVE' else 1 - r['score']) -
+            (c['score'] if c['label'] == 'POSITIVE' else 1 - c['score']))
+        for r, c in zip(outputs['reference'], outputs['candidate'])
+    ]
+    mean_diff = sum(diffs) / len(diffs)
+    report = {
+        'samples': len(texts),
+        'label_agreement': agreement,
+        'mean_score_diff': mean_diff,
+        'max_score_diff': max(diffs),
+        'reference_seconds': timings['reference'],
+        'candidate_seconds': timings['candidate'],
+        'speedup': timings['reference'] / timings['candidate'] if timings['candidate'] else float('inf'),
+        'passed': agreement >= min_agreement and mean_diff <= score_tolerance
+    }
+    logging.info(f"Backend parity: {report}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a sentiment backend against the torch backend")
+    parser.add_argument('backend', choices=[b for b in BACKENDS if b != 'torch'])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(check_parity(SentimentAnalyzer(backend='torch'), SentimentAnalyzer(backend=args.backend)))
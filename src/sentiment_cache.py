@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from .paths import data_path
+
+
+class SentimentCache:
+    def __init__(self, path=data_path('sentiment_cache.sqlite'), max_entries=1000000):
+        """
+        Persistent sentiment result cache backed by SQLite
+
+        Entries are keyed by a SHA-256 of the model id and the cleaned
+        review text, so switching model or revision never serves stale
+        scores. When the cache grows past max_entries the least recently
+        used entries are evicted.
+
+        Args:
+            path (str): SQLite database file (':memory:' for a throwaway cache)
+            max_entries (int): Maximum number of cached results
+        """
+        try:
+            if path != ':memory:':
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self.path = path
+            self.max_entries = max_entries
+            self.hits = 0
+            self.misses = 0
+            # Not tied to the creating thread, so a server can score on a worker
+            # thread; callers must not use one cache from several threads at once
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                key TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+            """)
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache (last_used)"
+            )
+            self.connection.commit()
+            # Logical clock for LRU ordering; wall-clock time is too coarse
+            # on some platforms to order back-to-back writes
+            self._clock = self.connection.execute(
+                "SELECT COALESCE(MAX(last_used), 0) FROM sentiment_cache"
+            ).fetchone()[0]
+            logging.info(f"Sentiment cache opened at {path}")
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open sentiment cache at {path}: {str(e)}")
+            raise
+
+    def _tick(self):
+        """Advance and return the LRU clock"""
+        self._clock += 1
+        return self._clock
+
+    @staticmethod
+    def make_key(text, model_id):
+        """Content hash of a review text for a given model id"""
+        return hashlib.sha256(f"{model_id}\x00{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts, model_id):
+        """
+        Look up cached results for many texts
+
+        Args:
+            texts (list): Cleaned review texts
+            model_id (str): Model name and revision the results belong to
+
+        Returns:
+            dict: Position in texts -> {'label', 'score'} for every cache hit
+        """
+        keys = [self.make_key(text, model_id) for text in texts]
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = list(set(keys[start:start + 500]))
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT key, label, score FROM sentiment_cache WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update({key: {'label': label, 'score': score} for key, label, score in rows})
+
+        results = {i: found[key] for i, key in enumerate(keys) if key in found}
+        self.hits += len(results)
+        self.misses += len(keys) - len(results)
+
+        if found:
+            now = self._tick()
+            self.connection.executemany(
+                "UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            self.connection.commit()
+        return results
+
+    def put_many(self, texts, results, model_id):
+        """
+        Store results for many texts and evict old entries past the size cap
+
+        Args:
+            texts (list): Cleaned review texts
+            results (list): {'label', 'score'} dicts matching texts
+            model_id (str): Model name and revision the results belong to
+        """
+        now = self._tick()
+        rows = [(self.make_key(text, model_id), result['label'], float(result['score']), now)
+                for text, result in zip(texts, results) if result['label'] != 'ERROR']
+        if not rows:
+            return
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (key, label, score, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error writing to sentiment cache: {str(e)}")
+            self.connection.rollback()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries"""
+        count = self.connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute("""
+            DELETE FROM sentiment_cache WHERE key IN (
+                SELECT key FROM sentiment_cache ORDER BY last_used LIMIT ?
+            )
+            """, (excess,))
+            logging.info(f"Evicted {excess} entries from sentiment cache")
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        entries = self.connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries
+        }
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
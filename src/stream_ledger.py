@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import sqlite3
+import uuid
+import pandas as pd
+
+# Progress of a ledger with nothing committed yet
+_EMPTY_PROGRESS = {'batches_done': 0, 'rows_written': 0, 'output_bytes': 0, 'sentiment_totals': []}
+
+
+def review_keys(df):
+    """
+    64-bit dedupe key per review over (review_text, bank_name)
+
+    Returns:
+        pd.Series: Signed int64 keys (SQLite INTEGER) with the same index
+    """
+    hashes = pd.util.hash_pandas_object(df[['review_text', 'bank_name']].astype(str), index=False)
+    return pd.Series(hashes.to_numpy().view('int64'), index=df.index)
+
+
+class StreamLedger:
+    def __init__(self, path):
+        """
+        On-disk record of the reviews a streaming run has analyzed
+
+        Holds the dedupe key of every analyzed review plus the run's
+        progress (batches committed, output size, running sentiment
+        totals). Keys and progress are committed in one SQLite transaction
+        per batch, so memory stays bounded however large the corpus is and
+        a rerun analyzes exactly the reviews that are not in the ledger,
+        whatever order or chunking the store yields them in.
+
+        Args:
+            path (str): SQLite database file
+        """
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.path = path
+            self.connection = sqlite3.connect(path)
+            self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS analyzed (
+                key INTEGER PRIMARY KEY,
+                batch INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS progress (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                ledger_id TEXT NOT NULL,
+                state TEXT NOT NULL
+            );
+            """)
+            row = self.connection.execute("SELECT ledger_id, state FROM progress WHERE id = 1").fetchone()
+            if row is None:
+                self.reset()
+            else:
+                # Identifies this ledger, so derived state can tell which run it belongs to
+                self.ledger_id = row[0]
+                self.progress = json.loads(row[1])
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open stream ledger at {path}: {str(e)}")
+            raise
+
+    def reset(self):
+        """Forget every analyzed review and start a new ledger"""
+        self.ledger_id = uuid.uuid4().hex
+        self.progress = {**_EMPTY_PROGRESS, 'sentiment_totals': []}
+        self.connection.execute("DELETE FROM analyzed")
+        self._write_progress()
+        self.connection.commit()
+
+    def _write_progress(self):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO progress (id, ledger_id, state) VALUES (1, ?, ?)",
+            (self.ledger_id, json.dumps(self.progress))
+        )
+
+    def unseen(self, keys):
+        """
+        Which keys are not in the ledger yet
+
+        Args:
+            keys (pd.Series): Keys from review_keys
+
+        Returns:
+            pd.Series: Boolean mask with the same index
+        """
+        values = keys.tolist()
+        found = set()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(key for key, in self.connection.execute(
+                f"SELECT key FROM analyzed WHERE key IN ({placeholders})", chunk
+            ))
+        return ~keys.isin(found)
+
+    def commit(self, keys, progress):
+        """
+        Record a batch's keys and the progress after it, atomically
+
+        Args:
+            keys (pd.Series): Keys of the reviews in the batch
+            progress (dict): New progress; its batches_done numbers the batch
+        """
+        batch = progress['batches_done'] - 1
+        try:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO analyzed (key, batch) VALUES (?, ?)",
+                [(key, batch) for key in keys.tolist()]
+            )
+            self.progress = dict(progress)
+            self._write_progress()
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error committing batch {batch} to {self.path}: {str(e)}")
+            self.connection.rollback()
+            raise
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM analyzed").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
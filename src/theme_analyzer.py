@@ -1,13 +1,137 @@
-import spacy
+import json
+import os
+import re
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
 import logging
+import time
+from .instrumentation import instrumented, metrics
+from .language_detector import expand_to_rows, model_mask
+from .schema import enforce_schema
+from .theme_model import top_keywords_by_row
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'theme_taxonomy.json')
+
+# Separator between theme IDs in the per-review themes column
+THEME_SEPARATOR = ';'
+
+
+class ThemeTagger:
+    def __init__(self, taxonomy):
+        """
+        Compile a theme taxonomy into a single regex
+
+        Keywords match case-insensitively at the start of a word, so 'crash'
+        tags 'crashes' and 'crashed' but 'app' does not tag 'happy'. One
+        lookahead alternation finds the longest keyword at every word start;
+        shorter keywords that are prefixes of it are folded in at compile
+        time, so overlapping keywords from different themes all apply.
+
+        Args:
+            taxonomy (dict): Theme ID -> list of keywords
+        """
+        self.theme_ids = list(taxonomy)
+        theme_order = {theme: i for i, theme in enumerate(self.theme_ids)}
+        keyword_themes = {}
+        for theme, keywords in taxonomy.items():
+            for keyword in keywords:
+                keyword_themes.setdefault(keyword.lower(), set()).add(theme)
+
+        # Longest first, so the alternation prefers the longest keyword at a position
+        keywords = sorted(keyword_themes, key=lambda k: (-len(k), k))
+        self.keyword_themes = {
+            keyword: tuple(sorted(
+                {t for other, themes in keyword_themes.items() if keyword.startswith(other) for t in themes},
+                key=theme_order.get
+            ))
+            for keyword in keywords
+        }
+        alternation = '|'.join(re.escape(keyword) for keyword in keywords)
+        self.pattern = re.compile(rf'\b(?=({alternation}))') if keywords else None
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_TAXONOMY_PATH):
+        """Load a {theme: [keywords]} JSON taxonomy"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, text):
+        """
+        Theme IDs present in a text, in taxonomy order
+
+        Returns:
+            tuple: Matching theme IDs
+        """
+        if self.pattern is None or not isinstance(text, str):
+            return ()
+        themes = set()
+        for keyword in self.pattern.findall(text.lower()):
+            themes.update(self.keyword_themes[keyword])
+        return tuple(theme for theme in self.theme_ids if theme in themes)
+
+    def tag(self, texts):
+        """
+        Tag every text with its theme IDs
+
+        Args:
+            texts (pd.Series): Review texts
+
+        Returns:
+            pd.Series: THEME_SEPARATOR-joined theme IDs ('' when none match)
+        """
+        return pd.Series([THEME_SEPARATOR.join(self.match(text)) for text in texts.tolist()],
+                         index=texts.index)
+
+    def tag_matrix(self, texts):
+        """
+        One boolean column per theme
+
+        Args:
+            texts (pd.Series): Review texts
+
+        Returns:
+            pd.DataFrame: texts.index x theme IDs
+        """
+        matches = [set(self.match(text)) for text in texts.tolist()]
+        return pd.DataFrame(
+            {theme: [theme in m for m in matches] for theme in self.theme_ids},
+            index=texts.index
+        )
+
 
 class ThemeAnalyzer:
-    def __init__(self):
-        """Initialize theme analyzer with spaCy model"""
+    # Keyword extraction only reads token.pos_ and token.is_stop, which come
+    # from tok2vec + tagger + attribute_ruler; the rest of the pipeline is dead weight
+    unused_components = ["parser", "ner", "lemmatizer", "senter"]
+
+    def __init__(self, batch_size=256, n_process=1, taxonomy_path=DEFAULT_TAXONOMY_PATH, nlp=None,
+                 theme_model=None):
+        """
+        Initialize theme analyzer with spaCy model
+
+        Args:
+            batch_size (int): Texts per nlp.pipe batch in extract_keywords_bulk
+            n_process (int): Worker processes for nlp.pipe (-1 uses all cores)
+            taxonomy_path (str): JSON theme taxonomy, compiled once into a ThemeTagger
+            nlp (callable): Prebuilt spaCy-like pipeline used instead of loading
+                en_core_web_sm, e.g. a stub for offline benchmarks
+            theme_model (IncrementalThemeModel): When given, identify_themes
+                folds each call's reviews into this persistent model and
+                reports themes over everything it has seen, instead of
+                refitting TF-IDF on the call's reviews alone
+        """
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            # spaCy and scikit-learn are only imported once an analyzer is built
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            self.theme_tagger = ThemeTagger.from_file(taxonomy_path)
+            if nlp is None:
+                import spacy
+                nlp = spacy.load("en_core_web_sm", exclude=self.unused_components)
+            self.nlp = nlp
+            self.batch_size = batch_size
+            self.n_process = n_process
+            self.theme_model = theme_model
             self.vectorizer = TfidfVectorizer(
                 max_features=100,
                 ngram_range=(1, 2),
@@ -18,72 +142,173 @@ class ThemeAnalyzer:
             logging.error(f"Failed to initialize theme analyzer: {str(e)}")
             raise
 
+    @staticmethod
+    def _doc_keywords(doc):
+        """Nouns and proper nouns of a parsed doc, lowercased and space-joined"""
+        keywords = [token.text.lower() for token in doc
+                   if token.pos_ in ['NOUN', 'PROPN'] and not token.is_stop]
+        return ' '.join(keywords)
+
     def extract_keywords(self, text):
         """Extract keywords from text using spaCy"""
         try:
             doc = self.nlp(text)
             # Extract nouns and important phrases
-            keywords = [token.text.lower() for token in doc 
-                       if token.pos_ in ['NOUN', 'PROPN'] and not token.is_stop]
-            return ' '.join(keywords)
+            return self._doc_keywords(doc)
         except Exception as e:
             logging.error(f"Error extracting keywords: {str(e)}")
             return ""
 
-    def identify_themes(self, df):
-        """Identify themes from reviews using TF-IDF"""
+    @instrumented('keywords')
+    def extract_keywords_bulk(self, texts, batch_size=None, n_process=None):
+        """
+        Extract keywords from many texts with nlp.pipe
+
+        Produces the same strings as calling extract_keywords on each text,
+        but streams the texts through spaCy in batches and, with
+        n_process > 1, across several worker processes.
+
+        Args:
+            texts (iterable): Review texts
+            batch_size (int): Texts per batch (defaults to self.batch_size)
+            n_process (int): Worker processes (defaults to self.n_process)
+
+        Returns:
+            list: Keyword string per text, in input order
+        """
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        n_process = n_process or self.n_process
+        # Non-strings make nlp() raise, which extract_keywords maps to ""
+        valid = [i for i, text in enumerate(texts) if isinstance(text, str)]
+        keywords = [""] * len(texts)
         try:
-            # Extract keywords from reviews
-            df['keywords'] = df['review_text'].apply(self.extract_keywords)
-            
-            # Get TF-IDF features
-            tfidf_matrix = self.vectorizer.fit_transform(df['keywords'])
-            feature_names = self.vectorizer.get_feature_names_out()
-            
-            # Group by bank and get top themes
+            docs = self.nlp.pipe((texts[i] for i in valid), batch_size=batch_size, n_process=n_process)
+            batch_start = time.perf_counter()
+            for n, (i, doc) in enumerate(zip(valid, docs), 1):
+                keywords[i] = self._doc_keywords(doc)
+                # Time to receive each batch_size docs from the pipe
+                if n % batch_size == 0 or n == len(valid):
+                    metrics.observe('keyword_batch', time.perf_counter() - batch_start)
+                    batch_start = time.perf_counter()
+        except Exception as e:
+            logging.error(f"Error in bulk keyword extraction, falling back to single reviews: {str(e)}")
+            keywords = [self.extract_keywords(text) for text in texts]
+        return keywords
+
+    @instrumented('themes', rows=lambda result, self, df, *args, **kwargs: len(df))
+    def identify_themes(self, df, group_by='bank_name', top_n=20):
+        """
+        Identify themes from reviews using TF-IDF
+
+        Args:
+            df (pd.DataFrame): Reviews with review_text and the grouping columns
+            group_by: Column name, or list of column names / Series, to group
+                by, e.g. ['bank_name', df['date'].dt.strftime('%Y-%m')] for bank x month
+            top_n (int): Keywords per group considered for themes
+
+        Returns:
+            dict: Group label (tuple for several keys) -> {theme: keywords};
+                with a theme_model, every group the model has seen
+        """
+        try:
+            # Extract keywords from reviews and tag each review with its themes;
+            # rows labelled non-English by the preprocessor get neither
+            mask = model_mask(df)
+            english = df['review_text'][mask]
+            df['keywords'] = expand_to_rows(self.extract_keywords_bulk(english), mask, "", df.index)
+            df['themes'] = expand_to_rows(self.tag_themes(english).tolist(), mask, "", df.index)
+            enforce_schema(df)
+            codes, labels = self._group_codes(df, group_by)
+
+            if self.theme_model is not None:
+                # Only this call's reviews are new to the model
+                groups = [labels[code] if code >= 0 else None for code in codes]
+                top_by_group = self.theme_model.partial_fit(df['keywords'], groups).top_keywords(top_n)
+                labels, top_keywords = list(top_by_group), list(top_by_group.values())
+            else:
+                # Get TF-IDF features
+                tfidf_matrix = self.vectorizer.fit_transform(df['keywords'])
+                feature_names = self.vectorizer.get_feature_names_out()
+
+                # Top keywords for every group in one sparse pass
+                top_keywords = self._group_top_keywords(tfidf_matrix, codes, len(labels), feature_names, top_n)
+
             themes_by_bank = {}
-            for bank in df['bank_name'].unique():
-                bank_reviews = df[df['bank_name'] == bank]
-                bank_tfidf = tfidf_matrix[bank_reviews.index]
-                
-                # Get top keywords for this bank
-                top_keywords = self._get_top_keywords(bank_tfidf, feature_names)
-                themes = self._cluster_into_themes(top_keywords)
-                themes_by_bank[bank] = themes
+            for label, keywords in zip(labels, top_keywords):
+                themes_by_bank[label] = self._cluster_into_themes(keywords)
             
             return themes_by_bank
         except Exception as e:
             logging.error(f"Error identifying themes: {str(e)}")
             raise
 
-    def _get_top_keywords(self, tfidf_matrix, feature_names, top_n=20):
-        """Get top keywords from TF-IDF matrix"""
+    @staticmethod
+    def _group_codes(df, group_by):
+        """
+        Positional group code per row plus the group labels
+
+        Codes are positions into labels (-1 for rows with a missing key), so
+        they line up with TF-IDF matrix rows whatever the DataFrame index is.
+        """
+        keys = list(group_by) if isinstance(group_by, (list, tuple)) else [group_by]
+        arrays = [df[key].to_numpy() if isinstance(key, str) else np.asarray(key) for key in keys]
+        if len(arrays) == 1:
+            codes, uniques = pd.factorize(arrays[0])
+        else:
+            codes, uniques = pd.factorize(pd.MultiIndex.from_arrays(arrays))
+        return codes, list(uniques)
+
+    def _group_top_keywords(self, tfidf_matrix, codes, n_groups, feature_names, top_n=20):
+        """
+        Top keywords for every group from one sparse matrix product
+
+        A sparse group-indicator matrix (groups x reviews) times the TF-IDF
+        matrix gives per-group score sums; top_keywords_by_row then picks
+        each group's top_n features. Features with a zero score for a
+        group are left out.
+
+        Returns:
+            list: Keyword lists, one per group code
+        """
+        from scipy import sparse
+
         try:
-            # Sum TF-IDF scores for each feature
-            scores = tfidf_matrix.sum(axis=0).A1
-            # Get indices of top scores
-            top_indices = scores.argsort()[-top_n:][::-1]
-            return [feature_names[i] for i in top_indices]
+            rows = np.flatnonzero(codes >= 0)
+            indicator = sparse.csr_matrix(
+                (np.ones(len(rows)), (codes[rows], rows)),
+                shape=(n_groups, tfidf_matrix.shape[0])
+            )
+            scores = (indicator @ tfidf_matrix).toarray()
+            # Keywords a group never used score 0 and are not its themes
+            return top_keywords_by_row(scores, feature_names, top_n)
         except Exception as e:
             logging.error(f"Error getting top keywords: {str(e)}")
-            return []
+            return [[] for _ in range(n_groups)]
+
+    def _get_top_keywords(self, tfidf_matrix, feature_names, top_n=20):
+        """Get top keywords from TF-IDF matrix"""
+        codes = np.zeros(tfidf_matrix.shape[0], dtype=np.intp)
+        return self._group_top_keywords(tfidf_matrix, codes, 1, feature_names, top_n)[0]
+
+    def tag_themes(self, texts):
+        """
+        Tag each review with the taxonomy themes it mentions
+
+        Args:
+            texts (pd.Series): Review texts
+
+        Returns:
+            pd.Series: THEME_SEPARATOR-joined theme IDs per review
+        """
+        return self.theme_tagger.tag(texts)
 
     def _cluster_into_themes(self, keywords):
-        """Cluster keywords into themes (simplified version)"""
-        # Predefined theme categories
-        themes = {
-            'Account Access': ['login', 'password', 'account', 'access'],
-            'Transaction': ['transfer', 'payment', 'transaction', 'money'],
-            'UI/UX': ['interface', 'app', 'screen', 'design'],
-            'Support': ['support', 'service', 'help', 'contact'],
-            'Performance': ['slow', 'fast', 'crash', 'error']
-        }
-        
-        # Assign keywords to themes
+        """Group keywords by the taxonomy themes they match"""
         theme_matches = {}
-        for theme, theme_keywords in themes.items():
-            matches = [k for k in keywords if any(tk in k for tk in theme_keywords)]
-            if matches:
-                theme_matches[theme] = matches
-        
-        return theme_matches 
\ No newline at end of file
+        for keyword in keywords:
+            for theme in self.theme_tagger.match(keyword):
+                theme_matches.setdefault(theme, []).append(keyword)
+
+        # Keep taxonomy order
+        return {theme: theme_matches[theme] for theme in self.theme_tagger.theme_ids if theme in theme_matches}
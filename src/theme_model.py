@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import numpy as np
+
+# Bumped when the saved layout changes
+STATE_VERSION = 1
+
+
+def top_keywords_by_row(scores, feature_names, top_n=20):
+    """
+    Highest-scoring features of every row of a dense score matrix
+
+    argpartition picks the top_n features of each row without sorting the
+    whole vocabulary; features with a zero score are left out.
+
+    Args:
+        scores (np.ndarray): (rows, features) scores
+        feature_names (array-like): Name of each feature column
+        top_n (int): Keywords per row
+
+    Returns:
+        list: Keyword lists, one per row
+    """
+    k = min(top_n, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(scores.shape[0])]
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    return [[feature_names[i] for i in row if row_scores[i] > 0] for row, row_scores in zip(top, scores)]
+
+
+class IncrementalThemeModel:
+    def __init__(self, max_features=100, ngram_range=(1, 2), stop_words='english'):
+        """
+        TF-IDF theme model that is updated with new reviews instead of refit
+
+        Keeps a growing vocabulary with running document frequencies and
+        term counts, plus, per group (e.g. bank), the sum of its reviews'
+        L2-normalized term frequencies as a sparse matrix. partial_fit folds
+        in a batch of new keyword strings in time proportional to the batch,
+        not to the vocabulary: counters grow by doubling and group sums are
+        merged into the matrix only once the pending batches outgrow it. IDF
+        weights and the max_features most frequent terms are applied when
+        scores are read, so group scores never need the old reviews again.
+
+        Unlike a refit TfidfVectorizer, term frequencies are normalized
+        before IDF weighting and over the whole vocabulary, which keeps
+        stored sums valid as IDF and the feature set drift.
+
+        Args:
+            max_features (int): Most frequent terms used for scoring
+            ngram_range (tuple): Word n-gram sizes, as in TfidfVectorizer
+            stop_words (str or list): Stop words, as in TfidfVectorizer
+        """
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.vocabulary = {}
+        self.terms = []
+        # Counters with spare capacity at the end; doc_freq and term_count are views
+        self._doc_freq = np.zeros(0, dtype=np.int64)
+        self._term_count = np.zeros(0, dtype=np.int64)
+        self.n_docs = 0
+        self.group_labels = []
+        self._group_index = {}
+        # Merged group sums plus (rows, columns, values) of batches not merged yet
+        self._group_tf = None
+        self._pending_tf = []
+        self._pending_nnz = 0
+        # Free-form progress markers saved with the model, e.g. chunks folded in
+        self.meta = {}
+        self._analyzer = None
+
+    @property
+    def doc_freq(self):
+        """Reviews containing each vocabulary term"""
+        return self._doc_freq[:len(self.terms)]
+
+    @doc_freq.setter
+    def doc_freq(self, value):
+        self._doc_freq = np.asarray(value, dtype=np.int64)
+
+    @property
+    def term_count(self):
+        """Occurrences of each vocabulary term"""
+        return self._term_count[:len(self.terms)]
+
+    @term_count.setter
+    def term_count(self, value):
+        self._term_count = np.asarray(value, dtype=np.int64)
+
+    @property
+    def group_tf(self):
+        """
+        Returns:
+            scipy.sparse.csr_matrix: (groups, terms) sums of L2-normalized term frequencies
+        """
+        self._merge_pending()
+        return self._group_tf
+
+    @group_tf.setter
+    def group_tf(self, value):
+        from scipy import sparse
+
+        self._group_tf = sparse.csr_matrix(value)
+        self._pending_tf, self._pending_nnz = [], 0
+
+    def _merge_pending(self):
+        """Grow the group sums to the current groups and terms and add the pending batches"""
+        from scipy import sparse
+
+        shape = (len(self.group_labels), len(self.terms))
+        if self._group_tf is None:
+            self._group_tf = sparse.csr_matrix(shape)
+        if self._group_tf.shape != shape:
+            self._group_tf.resize(shape)
+        if self._pending_tf:
+            rows, columns, values = (np.concatenate(part) for part in zip(*self._pending_tf))
+            self._group_tf = self._group_tf + sparse.csr_matrix((values, (rows, columns)), shape=shape)
+            self._pending_tf, self._pending_nnz = [], 0
+
+    def _reserve(self, n_terms):
+        """Make room for n_terms counters, doubling capacity so growth is amortized"""
+        capacity = len(self._doc_freq)
+        if n_terms > capacity:
+            capacity = max(n_terms, 2 * capacity, 1024)
+            for name in ('_doc_freq', '_term_count'):
+                current = getattr(self, name)
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:len(current)] = current
+                setattr(self, name, grown)
+
+    @property
+    def analyzer(self):
+        """Same tokenization, stop words and n-grams as TfidfVectorizer"""
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+            self._analyzer = CountVectorizer(ngram_range=self.ngram_range,
+                                             stop_words=self.stop_words).build_analyzer()
+        return self._analyzer
+
+    def _counts(self, texts, grow):
+        """Sparse term counts, adding unseen terms to the vocabulary when grow is set"""
+        from scipy import sparse
+
+        indices, indptr = [], [0]
+        for text in texts:
+            if isinstance(text, str):
+                for term in self.analyzer(text):
+                    index = self.vocabulary.get(term)
+                    if index is None:
+                        if not grow:
+                            continue
+                        index = self.vocabulary[term] = len(self.terms)
+                        self.terms.append(term)
+                    indices.append(index)
+            indptr.append(len(indices))
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(self.terms))
+        )
+        counts.sum_duplicates()
+        return counts
+
+    @staticmethod
+    def _l2_normalize(matrix):
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return matrix.multiply(1.0 / norms[:, None]).tocsr()
+
+    def _group_rows(self, groups):
+        """Row of group_tf per group label, adding rows for unseen groups (None for no group)"""
+        rows = []
+        for label in groups:
+            if label is None or (isinstance(label, float) and np.isnan(label)):
+                rows.append(-1)
+                continue
+            if label not in self._group_index:
+                self._group_index[label] = len(self.group_labels)
+                self.group_labels.append(label)
+            rows.append(self._group_index[label])
+        return np.asarray(rows, dtype=np.int64)
+
+    def partial_fit(self, texts, groups=None):
+        """
+        Fold a batch of keyword strings into the model
+
+        Args:
+            texts (iterable): Keyword string per review
+            groups (iterable): Group label per review (None to skip a review's
+                group update); None counts every review towards document
+                frequencies only
+
+        Returns:
+            IncrementalThemeModel: self
+        """
+        from scipy import sparse
+
+        texts = list(texts)
+        counts = self._counts(texts, grow=True)
+        n_terms = len(self.terms)
+
+        # Only the counters of terms in the batch are touched
+        self._reserve(n_terms)
+        np.add.at(self._doc_freq, counts.indices, 1)
+        np.add.at(self._term_count, counts.indices, counts.data.astype(np.int64))
+        self.n_docs += len(texts)
+
+        if groups is not None:
+            rows = self._group_rows(groups)
+            keep = np.flatnonzero(rows >= 0)
+            indicator = sparse.csr_matrix((np.ones(len(keep)), (rows[keep], keep)),
+                                          shape=(len(self.group_labels), len(texts)))
+            delta = (indicator @ self._l2_normalize(counts)).tocoo()
+            self._pending_tf.append((delta.row, delta.col, delta.data))
+            self._pending_nnz += delta.nnz
+            # Merge once the pending sums outgrow the matrix, so each batch costs amortized O(batch)
+            if self._group_tf is None or self._pending_nnz > self._group_tf.nnz:
+                self._merge_pending()
+        logging.info(f"Theme model updated with {len(texts)} reviews "
+                     f"({self.n_docs} total, {n_terms} terms)")
+        return self
+
+    def idf(self):
+        """Smoothed IDF of every vocabulary term, as TfidfVectorizer computes it"""
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+
+    def feature_mask(self):
+        """Vocabulary terms among the max_features most frequent"""
+        mask = np.zeros(len(self.terms), dtype=bool)
+        if self.max_features is None or self.max_features >= len(self.terms):
+            mask[:] = True
+        else:
+            mask[np.argsort(-self.term_count, kind='stable')[:self.max_features]] = True
+        return mask
+
+    def transform(self, texts):
+        """
+        TF-IDF vectors of texts under the current vocabulary and IDF
+
+        Terms outside the vocabulary are ignored; the model is not changed.
+
+        Returns:
+            scipy.sparse.csr_matrix: (len(texts), len(terms)) weights, zero
+                outside the scored features
+        """
+        weights = self._l2_normalize(self._counts(list(texts), grow=False))
+        return weights.multiply(self.idf() * self.feature_mask()).tocsr()
+
+    def group_scores(self):
+        """
+        Returns:
+            np.ndarray: (groups, terms) TF-IDF score sums, zero outside the scored features
+        """
+        return self.group_tf.multiply(self.idf() * self.feature_mask()).toarray()
+
+    def top_keywords(self, top_n=20):
+        """
+        Highest-scoring keywords of every group seen so far
+
+        Only the scored feature columns are densified.
+
+        Returns:
+            dict: Group label -> keyword list
+        """
+        features = np.flatnonzero(self.feature_mask())
+        scores = self.group_tf[:, features].multiply(self.idf()[features]).toarray()
+        top = top_keywords_by_row(scores, [self.terms[i] for i in features], top_n)
+        return dict(zip(self.group_labels, top))
+
+    def save(self, path):
+        """
+        Write the model state as a compressed .npz file
+
+        The file is written next to path and renamed into place, so an
+        interrupted save never leaves a truncated model behind.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        settings = {
+            'version': STATE_VERSION,
+            'max_features': self.max_features,
+            'ngram_range': list(self.ngram_range),
+            'stop_words': self.stop_words,
+            'n_docs': self.n_docs,
+            'group_labels': [list(label) if isinstance(label, tuple) else label for label in self.group_labels],
+            'meta': self.meta
+        }
+        group_tf = self.group_tf
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                settings=np.array(json.dumps(settings, default=str)),
+                terms=np.array(self.terms, dtype=str),
+                doc_freq=self.doc_freq,
+                term_count=self.term_count,
+                group_tf_data=group_tf.data,
+                group_tf_indices=group_tf.indices,
+                group_tf_indptr=group_tf.indptr
+            )
+        os.replace(tmp_path, path)
+        logging.info(f"Theme model saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """Read a model written by save"""
+        from scipy import sparse
+
+        with np.load(path, allow_pickle=False) as state:
+            settings = json.loads(str(state['settings']))
+            if settings['version'] != STATE_VERSION:
+                raise ValueError(f"Theme model {path} has state version {settings['version']}, "
+                                 f"expected {STATE_VERSION}")
+            model = cls(settings['max_features'], tuple(settings['ngram_range']), settings['stop_words'])
+            model.terms = state['terms'].tolist()
+            model.doc_freq = state['doc_freq']
+            model.term_count = state['term_count']
+            shape = (len(settings['group_labels']), len(model.terms))
+            model.group_tf = sparse.csr_matrix(
+                (state['group_tf_data'], state['group_tf_indices'], state['group_tf_indptr']), shape=shape
+            )
+        model.vocabulary = {term: index for index, term in enumerate(model.terms)}
+        model.n_docs = settings['n_docs']
+        model.group_labels = [tuple(label) if isinstance(label, list) else label for label in settings['group_labels']]
+        model._group_index = {label: index for index, label in enumerate(model.group_labels)}
+        model.meta = settings['meta']
+        return model
+
+    @classmethod
+    def load_or_create(cls, path, **kwargs):
+        """Load the model at path, or start an empty one if there is none"""
+        if path and os.path.exists(path):
+            return cls.load(path)
+        return cls(**kwargs)
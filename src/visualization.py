@@ -1,11 +1,32 @@
+import functools
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import dates as mdates
-import seaborn as sns
-from wordcloud import WordCloud
-# Set seaborn style for better visuals
-sns.set(style="whitegrid")
+from .aggregates import AggregateCube
+
+
+def use_headless_backend():
+    """Render with Agg, which needs no display; call before the first plot"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+@functools.lru_cache(maxsize=None)
+def _plotting():
+    """Import matplotlib and seaborn on first use, so loading data stays cheap"""
+    import matplotlib.pyplot as plt
+    from matplotlib import dates as mdates
+    import seaborn as sns
+    # Set seaborn style for better visuals
+    sns.set(style="whitegrid")
+    return plt, mdates, sns
+
+
+def _cube(data):
+    """Plots render from an AggregateCube; review frames are aggregated first"""
+    return data if isinstance(data, AggregateCube) else AggregateCube.from_frame(data)
+
 class Visualization:
+    @staticmethod
     def load_data(file_path):
         """Load processed reviews data from a CSV file."""
         try:
@@ -16,65 +37,109 @@ class Visualization:
             print(f"Error loading data: {str(e)}")
             raise
 
-    def plot_sentiment_trends(df):
-        """Plot sentiment trends for the most recent week."""
-        try:
-            # Ensure 'date' is datetime
-            df['date'] = pd.to_datetime(df['date'])
+    @staticmethod
+    def load_aggregates(directory, fallback_path=None):
+        """Load the aggregate cube, or build it from an analyzed reviews CSV if there is none."""
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            cube = AggregateCube.load(directory)
+            print("Aggregates loaded successfully.")
+            return cube
+        return AggregateCube.from_frame(Visualization.load_data(fallback_path))
+
+    @staticmethod
+    def _axes(plt, fig):
+        """Axes on a fresh figure, or on fig cleared for reuse"""
+        if fig is None:
+            fig = plt.figure(figsize=(10, 5))
+        else:
+            fig.clf()
+        return fig, fig.add_subplot()
 
-            # Filter for the last 7 days based on the latest date in the dataset to decrease dencity
-            max_date = df['date'].max()
-            one_week_df = df[df['date'] >= (max_date - pd.Timedelta(days=6))]
+    @staticmethod
+    def _finish(plt, fig, reused, output_path, show):
+        """Save and/or show a finished figure, closing it unless the caller reuses it"""
+        fig.tight_layout()
+        if output_path:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            fig.savefig(output_path)
+        if show:
+            plt.show()
+        elif not reused:
+            plt.close(fig)
 
-            # Group by day and bank, average sentiment
-            daily_avg = one_week_df.groupby([one_week_df['date'].dt.date, 'bank_name'])['sentiment_score'].mean().reset_index()
-            daily_avg.rename(columns={'date': 'day'}, inplace=True)
+    @staticmethod
+    def plot_sentiment_trends(data, output_path=None, show=True, fig=None, days=7):
+        """
+        Plot daily sentiment per bank from an AggregateCube (or reviews frame).
 
-            plt.figure(figsize=(10, 5))
-            sns.lineplot(data=daily_avg, x='day', y='sentiment_score', hue='bank_name', marker='o')
+        Args:
+            output_path (str): Save the chart here (PNG, SVG, ... by extension)
+            show (bool): Open the chart in a window
+            fig (Figure): Figure to clear and draw into instead of a new one
+            days (int): Most recent days to plot (None for all)
 
-            plt.title('Sentiment Trends Over the Last 7 Days')
-            plt.xlabel('Date')
-            plt.ylabel('Average Sentiment Score')
+        Returns:
+            bool: Whether the chart was created
+        """
+        try:
+            plt, mdates, sns = _plotting()
+            # Last days before the latest date in the data, to decrease density
+            daily_avg = _cube(data).daily_sentiment(days=days)
 
-            # Format x-axis to show day only
-            plt.gca().xaxis.set_major_locator(mdates.DayLocator())
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
+            figure, ax = Visualization._axes(plt, fig)
+            sns.lineplot(data=daily_avg, x='day', y='sentiment_score', hue='bank_name', marker='o', ax=ax)
 
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.show()
+            ax.set_title(f'Sentiment Trends Over the Last {days} Days' if days else 'Sentiment Trends')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Average Sentiment Score')
 
-            print("7-day sentiment trends plot created successfully.")
+            # Format x-axis to show day only
+            ax.xaxis.set_major_locator(mdates.DayLocator())
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
+            ax.tick_params(axis='x', labelrotation=45)
+
+            Visualization._finish(plt, figure, fig is not None, output_path, show)
+            print("Sentiment trends plot created successfully.")
+            return True
         except Exception as e:
             print(f"Error creating sentiment trends plot: {str(e)}")
+            return False
 
-    def plot_rating_distributions(df):
-        """Plot rating distributions by bank."""
+    @staticmethod
+    def plot_rating_distributions(data, output_path=None, show=True, fig=None):
+        """Plot rating distributions by bank from an AggregateCube (or reviews frame); see plot_sentiment_trends."""
         try:
-            plt.figure(figsize=(10, 5))
-            sns.countplot(data=df, x='rating', hue='bank_name')
-            plt.title('Rating Distributions by Bank')
-            plt.xlabel('Rating')
-            plt.ylabel('Count')
-            plt.tight_layout()
-            plt.show()
+            plt, _, sns = _plotting()
+            counts = _cube(data).rating_counts()
+            figure, ax = Visualization._axes(plt, fig)
+            sns.barplot(data=counts, x='rating', y='count', hue='bank_name', ax=ax)
+            ax.set_title('Rating Distributions by Bank')
+            ax.set_xlabel('Rating')
+            ax.set_ylabel('Count')
+            Visualization._finish(plt, figure, fig is not None, output_path, show)
             print("Rating distributions plot created successfully.")
+            return True
         except Exception as e:
             print(f"Error creating rating distributions plot: {str(e)}")
+            return False
 
-    def plot_keyword_cloud(df):
-        """Generate a keyword cloud from review texts."""
+    @staticmethod
+    def plot_keyword_cloud(data, output_path=None, show=True, fig=None):
+        """Generate a keyword cloud from the term counts of an AggregateCube (or reviews frame); see plot_sentiment_trends."""
         try:
-            text = ' '.join(df['review_text'])
-            wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
-            
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.title('Keyword Cloud from Reviews')
-            plt.tight_layout()
-            plt.show()
+            from wordcloud import STOPWORDS, WordCloud
+            plt, _, _ = _plotting()
+            frequencies = {term: count for term, count in _cube(data).term_frequencies(top_n=400).items()
+                           if term not in STOPWORDS}
+            wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies)
+
+            figure, ax = Visualization._axes(plt, fig)
+            ax.imshow(wordcloud, interpolation='bilinear')
+            ax.axis('off')
+            ax.set_title('Keyword Cloud from Reviews')
+            Visualization._finish(plt, figure, fig is not None, output_path, show)
             print("Keyword cloud plot created successfully.")
+            return True
         except Exception as e:
-            print(f"Error creating keyword cloud: {str(e)}")
\ No newline at end of file
+            print(f"Error creating keyword cloud: {str(e)}")
+            return False
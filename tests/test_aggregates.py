@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.aggregates import AggregateCube
+
+
+class TestAggregateCube(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'review_text': ["login fails", "great app", "transfer slow", "app ok", "ሎጊን", "login app"],
+            'rating': [1, 5, 2, 4, 3, 5],
+            'date': ['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-08', '2024-01-08', '2024-01-09'],
+            'bank_name': ['cbe', 'cbe', 'boe', 'cbe', 'cbe', 'boe'],
+            'sentiment_label': ['NEGATIVE', 'POSITIVE', 'NEGATIVE', 'POSITIVE', 'SKIPPED', 'POSITIVE'],
+            'sentiment_score': [0.8, 0.9, 0.7, 0.6, np.nan, 1.0],
+            'keywords': ["login", "app", "transfer", "app", "", "login app"]
+        })
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def sorted_facts(cube):
+        return cube.facts.sort_values(['day', 'bank_name', 'rating', 'sentiment_label']).reset_index(drop=True)
+
+    def test_updates_match_one_pass(self):
+        """Test folding in batches gives the same aggregates as one pass."""
+        whole = AggregateCube.from_frame(self.df)
+        batched = AggregateCube().update(self.df.iloc[:3]).update(self.df.iloc[3:]).update(self.df.iloc[:0])
+        pd.testing.assert_frame_equal(self.sorted_facts(whole), self.sorted_facts(batched))
+        self.assertEqual(whole.term_frequencies(), batched.term_frequencies())
+        self.assertEqual(int(whole.facts['count'].sum()), 6)
+
+    def test_daily_sentiment(self):
+        """Test daily means use scored reviews only and respect the window."""
+        daily = AggregateCube.from_frame(self.df).daily_sentiment()
+        cbe_jan_8 = daily[(daily['bank_name'] == 'cbe') & (daily['day'] == '2024-01-08')].iloc[0]
+        self.assertAlmostEqual(cbe_jan_8['sentiment_score'], 0.6)
+        self.assertEqual(cbe_jan_8['reviews'], 2)
+        cbe_jan_1 = daily[(daily['bank_name'] == 'cbe') & (daily['day'] == '2024-01-01')].iloc[0]
+        self.assertAlmostEqual(cbe_jan_1['sentiment_score'], 0.85)
+
+        recent = AggregateCube.from_frame(self.df).daily_sentiment(days=7)
+        self.assertEqual(sorted(recent['day'].dt.strftime('%Y-%m-%d').unique()), ['2024-01-08', '2024-01-09'])
+
+    def test_rating_and_label_counts(self):
+        cube = AggregateCube.from_frame(self.df)
+        ratings = cube.rating_counts()
+        self.assertEqual(ratings[ratings['rating'] == 5].set_index('bank_name')['count'].to_dict(),
+                         {'boe': 1, 'cbe': 1})
+        labels = cube.label_counts().set_index(['bank_name', 'sentiment_label'])['count']
+        self.assertEqual(labels[('cbe', 'SKIPPED')], 1)
+
+    def test_term_frequencies(self):
+        """Test term counts by bank and window, and pruning to the top terms per day."""
+        cube = AggregateCube.from_frame(self.df)
+        self.assertEqual(cube.term_frequencies(), {'app': 3, 'login': 2, 'transfer': 1})
+        self.assertEqual(cube.term_frequencies(bank='boe'), {'transfer': 1, 'login': 1, 'app': 1})
+        self.assertEqual(cube.term_frequencies(days=2), {'app': 2, 'login': 1})
+        pruned = AggregateCube(terms_per_day=1).update(self.df)
+        self.assertEqual(len(pruned.terms), pruned.terms[['day', 'bank_name']].drop_duplicates().shape[0])
+
+    def test_without_analysis_columns(self):
+        """Test processed reviews without sentiment or keywords still aggregate."""
+        cube = AggregateCube.from_frame(self.df[['review_text', 'rating', 'date', 'bank_name']])
+        self.assertEqual(set(cube.facts['sentiment_label']), {'UNSCORED'})
+        self.assertTrue(cube.daily_sentiment().empty)
+        self.assertEqual(cube.term_frequencies()['login'], 2)
+
+    def test_save_and_load(self):
+        """Test a saved cube loads back with the same answers."""
+        cube = AggregateCube.from_frame(self.df)
+        cube.meta['chunks_done'] = 2
+        cube.save(self.tmp_dir)
+        loaded = AggregateCube.load(self.tmp_dir)
+        pd.testing.assert_frame_equal(loaded.daily_sentiment(), cube.daily_sentiment(), check_dtype=False)
+        pd.testing.assert_frame_equal(loaded.rating_counts(), cube.rating_counts(), check_dtype=False)
+        self.assertEqual(loaded.term_frequencies(), cube.term_frequencies())
+        self.assertEqual(loaded.meta, {'chunks_done': 2})
+        loaded.update(self.df)
+        self.assertEqual(int(loaded.facts['count'].sum()), 12)
+
+    def test_interrupted_save_keeps_the_previous_cube(self):
+        """Test a crash before meta.json is replaced leaves tables and meta of the last save."""
+        cube = AggregateCube.from_frame(self.df)
+        cube.meta['batches_done'] = 1
+        cube.save(self.tmp_dir)
+        cube.update(self.df)
+        cube.meta['batches_done'] = 2
+        replace = os.replace
+
+        def crash_on_meta(src, dst):
+            if dst.endswith('meta.json'):
+                raise OSError("killed")
+            replace(src, dst)
+        with patch('src.aggregates.os.replace', side_effect=crash_on_meta), self.assertRaises(OSError):
+            cube.save(self.tmp_dir)
+        loaded = AggregateCube.load(self.tmp_dir)
+        self.assertEqual((int(loaded.facts['count'].sum()), loaded.meta), (6, {'batches_done': 1}))
+
+        cube.save(self.tmp_dir)
+        self.assertEqual(int(AggregateCube.load(self.tmp_dir).facts['count'].sum()), 12)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['facts.2.csv', 'meta.json', 'terms.2.csv'])
+
+    def test_load_or_create(self):
+        cube = AggregateCube.load_or_create(self.tmp_dir, terms_per_day=5)
+        self.assertTrue(cube.facts.empty)
+        self.assertEqual(cube.terms_per_day, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
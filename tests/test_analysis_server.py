@@ -0,0 +1,131 @@
+import threading
+import unittest
+import pandas as pd
+from src.analysis_server import AnalysisClient, AnalysisServer, LatencyStats, MicroBatcher
+from src.sentiment_analyzer import ANALYZED_AT, SentimentAnalyzer
+
+
+class FakeSentimentAnalyzer:
+    batch_size = 16
+
+    def __init__(self):
+        self.calls = []
+
+    def _score_texts(self, texts, batch_size):
+        self.calls.append(len(texts))
+        return [{'label': 'NEGATIVE' if text and 'slow' in text else 'POSITIVE', 'score': 0.9}
+                for text in texts]
+
+
+def fake_pipeline(texts, **kwargs):
+    """Stand-in for a transformers pipeline, scoring like FakeSentimentAnalyzer"""
+    texts = [texts] if isinstance(texts, str) else texts
+    return [{'label': 'NEGATIVE' if 'slow' in text else 'POSITIVE', 'score': 0.9} for text in texts]
+
+
+class FakeThemeAnalyzer:
+    def extract_keywords_bulk(self, texts):
+        return [text.split()[0] if text else '' for text in texts]
+
+    def tag_themes(self, texts):
+        return texts.map(lambda text: 'Performance' if text and 'slow' in text else '')
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_queued_requests_share_a_batch(self):
+        """Test requests queued while a batch runs are combined into the next one."""
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fn(items):
+            calls.append(list(items))
+            if len(calls) == 1:
+                started.set()
+                release.wait(5)
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(fn, max_batch=10, max_wait=0.05)
+        first = batcher.submit([1])
+        started.wait(5)
+        futures = [batcher.submit([i, i + 1]) for i in (10, 20, 30)]
+        release.set()
+        self.assertEqual(first.result(5), [2])
+        self.assertEqual([f.result(5) for f in futures], [[20, 22], [40, 42], [60, 62]])
+        self.assertEqual(calls[1], [10, 11, 20, 21, 30, 31])
+        batcher.close()
+
+    def test_errors_reach_every_caller(self):
+        """Test a failing batch fails each waiting future."""
+        def fn(items):
+            raise RuntimeError("model crashed")
+
+        batcher = MicroBatcher(fn, max_wait=0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(['a']).result(5)
+        self.assertEqual(batcher.submit([]).result(5), [])
+        batcher.close()
+
+    def test_latency_percentiles(self):
+        """Test percentiles come from the recorded samples."""
+        stats = LatencyStats()
+        for ms in range(1, 101):
+            stats.record('/sentiment', ms / 1000)
+        stats.record('/sentiment', 0.5, error=True)
+        report = stats.snapshot()['/sentiment']
+        self.assertEqual(report['count'], 101)
+        self.assertEqual(report['errors'], 1)
+        self.assertEqual(report['p50_ms'], 51.0)
+
+
+class TestAnalysisServer(unittest.TestCase):
+
+    def setUp(self):
+        """Start a server with fake analyzers on a free port."""
+        self.sentiment = FakeSentimentAnalyzer()
+        self.server = AnalysisServer(self.sentiment, FakeThemeAnalyzer(), port=0).start()
+        self.client = AnalysisClient(self.server.url, request_size=2)
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_client_matches_analyzer_contract(self):
+        """Test the client fills the same columns as the local analyzers."""
+        df = pd.DataFrame({
+            'review_text': ["great app", "slow transfer", None],
+            'bank_name': ['cbe', 'cbe', 'boa'],
+            'rating': [5, 1, 3]
+        }, index=[7, 8, 9])
+        df, agg = self.client.analyze_reviews(df)
+        self.assertEqual(df['sentiment_label'].tolist(), ['POSITIVE', 'NEGATIVE', 'POSITIVE'])
+        self.assertAlmostEqual(agg[('cbe', 5)], 0.9)
+        self.assertEqual(self.client.extract_keywords_bulk(df['review_text']), ['great', 'slow', ''])
+        self.assertEqual(self.client.tag_themes(df['review_text']).to_dict(),
+                         {7: '', 8: 'Performance', 9: ''})
+
+    def test_client_writes_the_local_columns(self):
+        """Test remote and local scoring produce the same columns, analyzed_at included."""
+        df = pd.DataFrame({
+            'review_text': ["great app", "slow transfer"],
+            'bank_name': ['cbe', 'cbe'],
+            'rating': [5, 1]
+        })
+        remote, _ = self.client.analyze_reviews(df.copy())
+        local, _ = SentimentAnalyzer(analyzer=fake_pipeline).analyze_reviews(df.copy())
+        self.assertEqual(list(remote.columns), list(local.columns))
+        self.assertIn(ANALYZED_AT, remote.columns)
+        self.assertTrue(remote[ANALYZED_AT].notna().all())
+
+    def test_health_and_metrics(self):
+        """Test health, latency metrics and request validation."""
+        self.assertEqual(self.client.health()['status'], 'ok')
+        self.client.analyze_sentiment_batch(["a", "b", "c"])
+        with self.assertRaises(Exception):
+            self.client._request('/sentiment', {'texts': 'not a list'})
+        metrics = self.client.metrics()
+        self.assertEqual(metrics['endpoints']['/sentiment']['count'], 3)
+        self.assertEqual(metrics['endpoints']['/sentiment']['errors'], 1)
+        self.assertEqual(metrics['batching']['sentiment']['items'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,337 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from src import analyze_reviews
+from src.review_store import CsvReviewStore
+from src.theme_analyzer import ThemeTagger
+from src.theme_model import IncrementalThemeModel
+from src.aggregates import AggregateCube
+from src.search_index import ReviewSearchIndex
+from src.drift_monitor import DriftMonitor
+from src.stream_ledger import StreamLedger
+from src.sentiment_analyzer import ANALYZED_AT, SentimentAnalyzer
+from src.theme_analyzer import ThemeAnalyzer
+from scripts.database_setup import SQLiteConnectionManager, SQLiteDialect, create_tables, sync_analyzed_reviews
+from benchmarks.stubs import StubNlp, StubSentimentPipeline
+
+
+class FakeSentiment:
+    def __init__(self):
+        self.rows = 0
+
+    def analyze_reviews(self, df):
+        self.rows += len(df)
+        df['sentiment_label'] = ['NEGATIVE' if 'bad' in t else 'POSITIVE' for t in df['review_text']]
+        df['sentiment_score'] = 0.9
+        return df, None
+
+
+class FakeThemes:
+    def __init__(self, fail_at_call=None):
+        self.calls = 0
+        self.fail_at_call = fail_at_call
+        self.tagger = ThemeTagger({'Quality': ['bad']})
+
+    def extract_keywords_bulk(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_at_call:
+            raise RuntimeError("worker killed")
+        return [t.split()[0].lower() for t in texts]
+
+    def tag_themes(self, texts):
+        return self.tagger.tag(texts)
+
+
+class TestStreamingPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Set up processed CSVs with duplicates spread across chunks."""
+        self.base_dir = tempfile.mkdtemp()
+        self.store = CsvReviewStore(self.base_dir)
+        reviews = pd.DataFrame({
+            'review': [f"review number {i}" for i in range(10)] + ["review number 1", "bad app"],
+            'rating': [5, 4, 3, 2, 1] * 2 + [4, 1],
+            'date': ['2024-01-01'] * 12,
+            'bank': ['cbe'] * 12,
+            'source': ['google_play'] * 12
+        })
+        self.store.write(reviews.rename(columns={'bank': 'bank_name'}), 'processed')
+        self.output = os.path.join(self.base_dir, 'analyzed.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def run_pipeline(self, themes, **kwargs):
+        return analyze_reviews.run_streaming(
+            chunk_size=4, output_path=self.output, store=self.store,
+            sentiment_analyzer=FakeSentiment(), theme_analyzer=themes, **kwargs
+        )
+
+    def test_streams_in_chunks_and_dedupes(self):
+        """Test chunked output matches a deduplicated corpus."""
+        themes = FakeThemes()
+        agg = self.run_pipeline(themes)
+        output = pd.read_csv(self.output)
+        self.assertEqual(themes.calls, 3)
+        self.assertEqual(len(output), 11)
+        self.assertFalse(output['review_text'].duplicated().any())
+        self.assertEqual(output.loc[output['review_text'] == "bad app", 'themes'].tolist(), ['Quality'])
+        self.assertAlmostEqual(agg[('cbe', 5)], 0.9)
+
+    def test_resume_after_crash(self):
+        """Test a rerun resumes after the last committed chunk."""
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(fail_at_call=2))
+        self.assertEqual(len(pd.read_csv(self.output)), 4)
+
+        themes = FakeThemes()
+        self.run_pipeline(themes)
+        output = pd.read_csv(self.output)
+        self.assertEqual(themes.calls, 2)
+        self.assertEqual(len(output), 11)
+        self.assertFalse(output['review_text'].duplicated().any())
+
+    def test_derived_state_survives_resume(self):
+        """Test the theme model and aggregate cube count every review once across a crash and resume."""
+        model_path = os.path.join(self.base_dir, 'themes.npz')
+        cube_dir = os.path.join(self.base_dir, 'aggregates')
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(fail_at_call=2), theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(IncrementalThemeModel.load(model_path).n_docs, 4)
+        self.assertEqual(int(AggregateCube.load(cube_dir).facts['count'].sum()), 4)
+
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        model = IncrementalThemeModel.load(model_path)
+        self.assertEqual(model.n_docs, 11)
+        self.assertEqual(model.meta['batches_done'], 3)
+        self.assertEqual(model.top_keywords(top_n=2), {'cbe': ['review', 'bad']})
+        cube = AggregateCube.load(cube_dir)
+        self.assertEqual(int(cube.facts['count'].sum()), 11)
+        self.assertEqual(cube.term_frequencies(), {'review': 10, 'bad': 1})
+
+    def test_streaming_updates_search_index(self):
+        """Test every analyzed review is searchable after a crash and resume."""
+        index_path = os.path.join(self.base_dir, 'index.sqlite')
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(fail_at_call=2), search_index_path=index_path)
+        self.run_pipeline(FakeThemes(), search_index_path=index_path)
+        search_index = ReviewSearchIndex(index_path)
+        self.assertEqual(len(search_index), 11)
+        self.assertEqual(search_index.meta['batches_done'], 3)
+        self.assertEqual(len(search_index.search('review', limit=100)), 10)
+        self.assertTrue(search_index.search('', limit=100)['keywords'].notna().all())
+        search_index.close()
+
+    def test_drift_monitor_counts_each_review_once(self):
+        """Test the drift monitor's open day holds every review once across a crash and resume."""
+        state_path = os.path.join(self.base_dir, 'drift.json')
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(fail_at_call=2), drift_state_path=state_path)
+        self.run_pipeline(FakeThemes(), drift_state_path=state_path)
+        monitor = DriftMonitor.load(state_path)
+        window = monitor.banks['cbe']['days']['2024-01-01']
+        self.assertEqual((window['reviews'], window['negative']), (11, 1))
+        self.assertEqual(window['themes'], {'Quality': 1})
+        self.assertEqual(monitor.meta['batches_done'], 3)
+
+    def test_drift_alerts_are_sent_once_after_the_state_is_saved(self):
+        """Test alerts are sent at the end of a run, survive a failed send and are not replayed by a rebuild."""
+        days = [f'2024-02-{day:02d}' for day in range(1, 11)]
+        reviews = pd.DataFrame({
+            'review_text': [f"{'bad' if i < (40 if day == days[-2] else 5) else 'fine'} review {day} {i}"
+                            for day in days for i in range(50)],
+            'rating': 3, 'date': [day for day in days for _ in range(50)], 'bank_name': 'boe',
+            'source': 'google_play'
+        })
+        # Newest reviews first, as the scraper stores them
+        self.store.write(reviews[::-1], 'processed', append=True)
+        state_path = os.path.join(self.base_dir, 'drift.json')
+
+        def run(sinks):
+            analyze_reviews.run_streaming(
+                chunk_size=100, output_path=self.output, store=self.store, sentiment_analyzer=FakeSentiment(),
+                theme_analyzer=FakeThemes(), drift_state_path=state_path, alert_sinks=sinks
+            )
+
+        class FailingSink:
+            def emit(self, alerts):
+                raise OSError("webhook down")
+        with self.assertRaises(OSError):
+            run([FailingSink()])
+        queued = DriftMonitor.load(state_path).outbox
+        self.assertEqual(sorted((a['bank_name'], a['metric'], a['window_end']) for a in queued),
+                         [('boe', 'negative_rate', days[-2]), ('boe', 'theme:Quality', days[-2])])
+
+        sink = []
+        sinks = [type('ListSink', (), {'emit': lambda self, alerts: sink.extend(alerts)})()]
+        run(sinks)
+        self.assertEqual([a['id'] for a in sink], [a['id'] for a in queued])
+        self.assertEqual(DriftMonitor.load(state_path).outbox, [])
+
+        os.remove(state_path)
+        run(sinks)
+        self.assertEqual(len(sink), 2)
+        self.assertEqual(DriftMonitor.load(state_path).banks['boe']['closed_through'], days[-2])
+
+    def test_resume_with_another_chunk_size(self):
+        """Test progress is tracked per review, so a resume may use any chunk size."""
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(fail_at_call=2))
+        sentiment = FakeSentiment()
+        analyze_reviews.run_streaming(chunk_size=5, output_path=self.output, store=self.store,
+                                      sentiment_analyzer=sentiment, theme_analyzer=FakeThemes())
+        output = pd.read_csv(self.output)
+        self.assertEqual(sentiment.rows, 7)
+        self.assertEqual(len(output), 11)
+        self.assertFalse(output['review_text'].duplicated().any())
+
+    def test_rerun_analyzes_only_new_reviews(self):
+        """Test reviews added to the store after a finished run are the only ones analyzed next time."""
+        self.run_pipeline(FakeThemes())
+        new = pd.DataFrame({
+            'review_text': [f"new review {i}" for i in range(6)] + ["review number 3"],
+            'rating': [2] * 7, 'date': ['2024-01-02'] * 7, 'bank_name': ['boe'] * 6 + ['cbe'],
+            'source': ['google_play'] * 7
+        })
+        self.store.write(new, 'processed', append=True)
+
+        sentiment = FakeSentiment()
+        analyze_reviews.run_streaming(chunk_size=4, output_path=self.output, store=self.store,
+                                      sentiment_analyzer=sentiment, theme_analyzer=FakeThemes())
+        output = pd.read_csv(self.output)
+        self.assertEqual(sentiment.rows, 6)
+        self.assertEqual(len(output), 17)
+        self.assertFalse(output['review_text'].duplicated().any())
+
+    def derived_counts(self, model_path, cube_dir):
+        return (IncrementalThemeModel.load(model_path).n_docs,
+                int(AggregateCube.load(cube_dir).facts['count'].sum()))
+
+    def test_derived_state_follows_a_growing_store(self):
+        """Test derived state counts reviews added between runs exactly once."""
+        model_path = os.path.join(self.base_dir, 'themes.npz')
+        cube_dir = os.path.join(self.base_dir, 'aggregates')
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        new = pd.DataFrame({
+            'review_text': [f"new review {i}" for i in range(6)], 'rating': [2] * 6,
+            'date': ['2024-01-02'] * 6, 'bank_name': ['boe'] * 6, 'source': ['google_play'] * 6
+        })
+        self.store.write(new, 'processed', append=True)
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(self.derived_counts(model_path, cube_dir), (17, 17))
+
+    def test_state_enabled_later_is_rebuilt(self):
+        """Test state first requested on a rerun is built from the reviews analyzed before."""
+        model_path = os.path.join(self.base_dir, 'themes.npz')
+        cube_dir = os.path.join(self.base_dir, 'aggregates')
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path)
+        themes = FakeThemes()
+        self.run_pipeline(themes, theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(themes.calls, 0)
+        self.assertEqual(self.derived_counts(model_path, cube_dir), (11, 11))
+        self.assertEqual(AggregateCube.load(cube_dir).term_frequencies(), {'review': 10, 'bad': 1})
+
+    def test_state_saved_before_a_failed_commit_is_rebuilt(self):
+        """Test state holding a batch the ledger never committed is rebuilt, not trusted."""
+        model_path = os.path.join(self.base_dir, 'themes.npz')
+        cube_dir = os.path.join(self.base_dir, 'aggregates')
+        commit = StreamLedger.commit
+        calls = []
+
+        def failing_commit(ledger, keys, progress):
+            calls.append(progress['batches_done'])
+            if len(calls) == 2:
+                raise RuntimeError("killed before commit")
+            commit(ledger, keys, progress)
+        with patch.object(StreamLedger, 'commit', failing_commit), self.assertRaises(RuntimeError):
+            self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(AggregateCube.load(cube_dir).meta['batches_done'], 2)
+
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(self.derived_counts(model_path, cube_dir), (11, 11))
+
+    def test_state_of_a_discarded_ledger_is_rebuilt(self):
+        """Test deleting the checkpoint restarts derived state along with the output."""
+        model_path = os.path.join(self.base_dir, 'themes.npz')
+        cube_dir = os.path.join(self.base_dir, 'aggregates')
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        os.remove(f'{self.output}.checkpoint.sqlite')
+        self.run_pipeline(FakeThemes(), theme_model_path=model_path, aggregates_dir=cube_dir)
+        self.assertEqual(len(pd.read_csv(self.output)), 11)
+        self.assertEqual(self.derived_counts(model_path, cube_dir), (11, 11))
+
+    def test_near_duplicates_collapse_within_chunks(self):
+        """Test the streaming run keeps one review per near-duplicate cluster of a chunk."""
+        copies = pd.DataFrame({
+            'review': ["the app never loads my balance after login"] * 2
+                      + ["the app never loads my balance after login!"],
+            'rating': [1, 1, 1],
+            'date': ['2024-01-02', '2024-01-03', '2024-01-04'],
+            'bank_name': ['cbe'] * 3,
+            'source': ['google_play'] * 3
+        })
+        CsvReviewStore(self.base_dir).write(copies, 'processed')
+        self.run_pipeline(FakeThemes(), collapse_near_duplicates=True)
+        output = pd.read_csv(self.output)
+        self.assertEqual(len(output), 1)
+        self.assertEqual(output['cluster_size'].tolist(), [2])
+
+    def test_missing_output_starts_over(self):
+        """Test a deleted output file restarts the run instead of failing to resume."""
+        self.run_pipeline(FakeThemes())
+        os.remove(self.output)
+        self.run_pipeline(FakeThemes())
+        self.assertEqual(len(pd.read_csv(self.output)), 11)
+
+class TestBatchPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Set up processed reviews, offline analyzers and a SQLite stand-in for the database."""
+        self.base_dir = tempfile.mkdtemp()
+        self.store = CsvReviewStore(self.base_dir)
+        self.reviews = pd.DataFrame({
+            'review': ["great fast app", "bad slow login", "transfer failed"],
+            'rating': [5, 1, 2],
+            'date': ['2024-01-01', '2024-01-02', '2024-01-03'],
+            'bank_name': ['cbe'] * 3,
+            'source': ['google_play'] * 3
+        })
+        self.store.write(self.reviews, 'processed')
+        patchers = [
+            patch.object(analyze_reviews, 'SentimentCache'),
+            patch.object(analyze_reviews, 'SentimentAnalyzer',
+                         lambda **kwargs: SentimentAnalyzer(analyzer=StubSentimentPipeline())),
+            patch.object(analyze_reviews, 'ThemeAnalyzer', lambda: ThemeAnalyzer(nlp=StubNlp()))
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.connection = SQLiteConnectionManager()._connection
+        create_tables(self.connection, SQLiteDialect)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.base_dir)
+
+    def run_and_sync(self):
+        analyze_reviews.main(store=self.store, aggregates_dir=None)
+        return sync_analyzed_reviews(self.connection, os.path.join(self.base_dir, 'analyzed_reviews.csv'),
+                                     SQLiteDialect)
+
+    def test_rerun_on_the_same_data_ships_nothing(self):
+        """Test unchanged reviews keep their analyzed_at, so a second sync ships 0 rows."""
+        self.assertEqual(self.run_and_sync(), 3)
+        first = self.store.read('analyzed')[ANALYZED_AT].tolist()
+        self.assertEqual(self.run_and_sync(), 0)
+        self.assertEqual(self.store.read('analyzed')[ANALYZED_AT].tolist(), first)
+
+        new_review = self.reviews.iloc[[0]].assign(review="new review", date='2024-01-04')
+        self.store.write(pd.concat([self.reviews, new_review]), 'processed')
+        self.assertEqual(self.run_and_sync(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from benchmarks.run_benchmarks import compare, run_benchmarks
+from benchmarks.synthetic import generate_reviews, iter_reviews
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+
+    def test_seeded_and_schema(self):
+        """Test equal seeds give equal corpora in the scraper layout."""
+        first = generate_reviews(500, seed=3)
+        self.assertTrue(first.equals(generate_reviews(500, seed=3)))
+        self.assertFalse(first.equals(generate_reviews(500, seed=4)))
+        self.assertEqual(list(first.columns), ['review', 'rating', 'date', 'bank', 'source'])
+        self.assertTrue(first['rating'].between(1, 5).all())
+        self.assertTrue(first['review'].duplicated().any())
+
+    def test_chunks_cover_all_rows(self):
+        """Test chunked generation yields exactly n rows."""
+        self.assertEqual(sum(len(chunk) for chunk in iter_reviews(2500, chunk_size=1000)), 2500)
+
+
+class TestHarness(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        """Test a small run produces timings and flags slowdowns against a baseline."""
+        current = run_benchmarks(rows=300, repeat=1, only=['clean_reviews', 'sentiment', 'db_insert'])
+        self.assertEqual(set(current['results']), {'clean_reviews', 'sentiment', 'db_insert'})
+        self.assertGreater(current['results']['db_insert']['median_seconds'], 0)
+
+        baseline = {'results': {
+            'clean_reviews': dict(current['results']['clean_reviews'], median_seconds=1e-9),
+            'sentiment': dict(current['results']['sentiment'], rows=10)
+        }}
+        statuses = {row['name']: row['status'] for row in compare(current, baseline)}
+        self.assertEqual(statuses, {'clean_reviews': 'regression', 'sentiment': 'incomparable', 'db_insert': 'new'})
+
+if __name__ == '__main__':
+    unittest.main()
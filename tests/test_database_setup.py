@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import oracledb
+import pandas as pd
+from scripts.database_setup import (
+    OracleDialect, SQLiteConnectionManager, SQLiteDialect,
+    create_tables, insert_banks, insert_reviews, load_reviews,
+    get_sync_watermark, migrate_schema, sync_analyzed_reviews
+)
+
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an in-memory SQLite stand-in with the schema and banks."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = SQLiteConnectionManager()
+        with self.manager.connection() as connection:
+            create_tables(connection, SQLiteDialect)
+            insert_banks(connection, SQLiteDialect)
+        self.reviews_path = os.path.join(self.tmp_dir, 'cbe_review.csv')
+        pd.DataFrame({
+            'review_text': ["Great app", "Login fails", None, "x" * 5000, "Slow"],
+            'rating': [5, 1, 3, 2, None],
+            'date': ['2024-01-05', '2024-01-20', '2024-02-03', 'not a date', '2024-03-01'],
+            'bank_name': ['CBE'] * 5
+        }).to_csv(self.reviews_path, index=False)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def fetch_reviews(self):
+        with self.manager.connection() as connection:
+            return connection.execute(
+                "SELECT review_text, rating, review_date, bank_id FROM Reviews ORDER BY review_id"
+            ).fetchall()
+
+    def test_batches_insert_all_rows(self):
+        """Test every row is inserted across several batches with NULLs kept."""
+        total = load_reviews(self.manager, {'CBE': self.reviews_path}, batch_size=2)
+        self.assertEqual(total, 5)
+        rows = self.fetch_reviews()
+        self.assertEqual(rows[0], ("Great app", 5, '2024-01-05', 1))
+        self.assertEqual(rows[1][2], '2024-01-20')
+        self.assertEqual(rows[2][0], None)
+        self.assertEqual(rows[3][2], None)
+        self.assertEqual(rows[4][1], None)
+
+    def test_executemany_per_batch(self):
+        """Test one executemany and one commit per batch."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchone.return_value = (1,)
+        insert_reviews(connection, self.reviews_path, 'CBE', batch_size=2, dialect=SQLiteDialect)
+        self.assertEqual(cursor.executemany.call_count, 3)
+        self.assertEqual(connection.commit.call_count, 3)
+        cursor.execute.assert_called_once()
+
+    def test_reload_is_idempotent(self):
+        """Test loading a file and the banks twice adds no rows."""
+        load_reviews(self.manager, {'CBE': self.reviews_path})
+        self.assertEqual(load_reviews(self.manager, {'CBE': self.reviews_path}), 5)
+        with self.manager.connection() as connection:
+            insert_banks(connection, SQLiteDialect)
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM Banks").fetchone()[0], 3)
+        self.assertEqual(len(self.fetch_reviews()), 5)
+
+    def test_sync_updates_loaded_rows(self):
+        """Test analyzing loaded reviews fills in their rows instead of adding new ones."""
+        reviews = pd.read_csv(self.reviews_path).iloc[:2]
+        reviews.to_csv(self.reviews_path, index=False)
+        load_reviews(self.manager, {'CBE': self.reviews_path})
+        load_reviews(self.manager, {'CBE': self.reviews_path})
+        analyzed_path = os.path.join(self.tmp_dir, 'analyzed_reviews.csv')
+        reviews.assign(bank_name='cbe', sentiment_label=['POSITIVE', 'NEGATIVE'],
+                       sentiment_score=[0.9, 0.8], keywords=['app', 'login']).to_csv(analyzed_path, index=False)
+        with self.manager.connection() as connection:
+            self.assertEqual(sync_analyzed_reviews(connection, analyzed_path, SQLiteDialect), 2)
+            rows = connection.execute(
+                "SELECT review_text, bank_id, sentiment_label FROM Reviews ORDER BY review_id"
+            ).fetchall()
+        self.assertEqual(rows, [("Great app", 1, 'POSITIVE'), ("Login fails", 1, 'NEGATIVE')])
+
+        # Reloading the unanalyzed file keeps the synced analysis
+        load_reviews(self.manager, {'CBE': self.reviews_path})
+        with self.manager.connection() as connection:
+            labels = [r[0] for r in connection.execute("SELECT sentiment_label FROM Reviews")]
+        self.assertEqual(labels, ['POSITIVE', 'NEGATIVE'])
+
+    def test_oracle_long_text_binding(self):
+        """Test batches with texts over 4000 bytes bind review_text as a CLOB."""
+        cursor = MagicMock()
+        OracleDialect.prepare_upsert_batch(cursor, ["short", None])
+        cursor.setinputsizes.assert_called_with(None, 5, None, None, None, None, None, None)
+        OracleDialect.prepare_upsert_batch(cursor, ["x" * 5000])
+        cursor.setinputsizes.assert_called_with(None, oracledb.DB_TYPE_CLOB, None, None, None, None, None, None)
+
+
+class TestAnalyzedSync(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a SQLite stand-in and an analyzed reviews CSV."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.connection = SQLiteConnectionManager()._connection
+        create_tables(self.connection, SQLiteDialect)
+        insert_banks(self.connection, SQLiteDialect)
+        self.analyzed_path = os.path.join(self.tmp_dir, 'analyzed_reviews.csv')
+        self.analyzed = pd.DataFrame({
+            'review_text': ["Great app", "Login fails", "Slow transfer"],
+            'rating': [5, 1, 2],
+            'date': ['2024-01-05', '2024-01-06', '2024-01-07'],
+            'bank_name': ['cbe', 'cbe', 'telebirr'],
+            'source': ['google_play'] * 3,
+            'sentiment_label': ['POSITIVE', 'NEGATIVE', 'NEGATIVE'],
+            'sentiment_score': [0.99, 0.97, 0.88],
+            'keywords': ['app', 'login', 'transfer'],
+            'analyzed_at': [f'2024-02-01T10:0{minute}:00.000000+00:00' for minute in range(3)]
+        })
+        self.analyzed.to_csv(self.analyzed_path, index=False)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def sync(self, **kwargs):
+        return sync_analyzed_reviews(self.connection, self.analyzed_path, SQLiteDialect, batch_size=2, **kwargs)
+
+    def test_rerun_is_idempotent(self):
+        """Test syncing twice does not duplicate rows."""
+        self.sync()
+        self.sync(full=True)
+        count = self.connection.execute("SELECT COUNT(*) FROM Reviews").fetchone()[0]
+        self.assertEqual(count, 3)
+        banks = [r[0] for r in self.connection.execute("SELECT bank_name FROM Banks")]
+        self.assertIn('telebirr', banks)
+
+    def test_only_rows_changed_since_watermark_are_shipped(self):
+        """Test the change-time watermark ships new rows and re-scored old ones."""
+        self.assertEqual(self.sync(), 3)
+        self.assertEqual(get_sync_watermark(self.connection, 'analyzed_reviews', SQLiteDialect),
+                         '2024-02-01T10:02:00.000000+00:00')
+        self.assertEqual(self.sync(), 0)
+
+        later = '2024-02-02T09:00:00.000000+00:00'
+        # The oldest review is re-scored, and a newer one arrives
+        self.analyzed.loc[0, ['sentiment_label', 'analyzed_at']] = ['NEGATIVE', later]
+        new_row = self.analyzed.iloc[[1]].assign(review_text="New review", date='2024-01-08', analyzed_at=later)
+        pd.concat([self.analyzed, new_row]).to_csv(self.analyzed_path, index=False)
+        self.assertEqual(self.sync(), 2)
+        self.assertEqual(get_sync_watermark(self.connection, 'analyzed_reviews', SQLiteDialect), later)
+
+        rows = self.connection.execute(
+            "SELECT review_text, sentiment_label FROM Reviews ORDER BY review_date"
+        ).fetchall()
+        self.assertEqual(rows[0], ("Great app", 'NEGATIVE'))
+        self.assertEqual(len(rows), 4)
+
+    def test_rows_without_change_time_are_always_shipped(self):
+        """Test files written before analyzed_at existed are shipped in full."""
+        self.analyzed.drop(columns='analyzed_at').to_csv(self.analyzed_path, index=False)
+        self.assertEqual(self.sync(), 3)
+        self.assertIsNone(get_sync_watermark(self.connection, 'analyzed_reviews', SQLiteDialect))
+        self.assertEqual(self.sync(), 3)
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM Reviews").fetchone()[0], 3)
+
+    def test_migrate_existing_schema(self):
+        """Test an old Reviews table gains the sync columns."""
+        connection = SQLiteConnectionManager()._connection
+        connection.execute("CREATE TABLE Banks (bank_id INTEGER PRIMARY KEY, bank_name TEXT)")
+        connection.execute("CREATE TABLE Reviews (review_id INTEGER PRIMARY KEY, review_text TEXT, "
+                           "rating INTEGER, review_date TEXT, bank_id INTEGER)")
+        migrate_schema(connection, SQLiteDialect)
+        migrate_schema(connection, SQLiteDialect)
+        columns = [r[1] for r in connection.execute("PRAGMA table_info(Reviews)")]
+        self.assertIn('content_hash', columns)
+        indexes = [r[1] for r in connection.execute("PRAGMA index_list(Banks)")]
+        self.assertIn('banks_name_uk', indexes)
+        sync_analyzed_reviews(connection, self.analyzed_path, SQLiteDialect)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM Reviews").fetchone()[0], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.drift_monitor import DriftMonitor, JsonLinesAlertSink, WebhookAlertSink
+
+
+def batch(bank, reviews, negative, day, themes=None, seed=0):
+    """Analyzed reviews with a given number of NEGATIVE ones"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'bank_name': bank,
+        'date': day,
+        'sentiment_label': ['NEGATIVE'] * negative + ['POSITIVE'] * (reviews - negative),
+        'sentiment_score': rng.uniform(0.85, 0.95, reviews),
+        'themes': themes or [''] * reviews
+    })
+
+
+class ListSink:
+    def __init__(self):
+        self.alerts = []
+
+    def emit(self, alerts):
+        self.alerts.extend(alerts)
+
+
+class TestDriftMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.sink = ListSink()
+        self.monitor = DriftMonitor(warmup=5, min_reviews=20, sinks=[self.sink])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def baseline(self, bank='cbe', days=8):
+        return pd.concat([batch(bank, 20, 4 + i % 2, f'2024-01-{i + 1:02d}', seed=i) for i in range(days)])
+
+    def test_flags_negative_rate_jump(self):
+        """Test a jump in negative reviews alerts once warmed up, and only for that bank."""
+        self.monitor.observe(pd.concat([self.baseline(), self.baseline('boe')]))
+        self.assertEqual(self.monitor.close_days(through='2024-01-08'), [])
+        self.monitor.observe(pd.concat([batch('cbe', 20, 16, '2024-01-20'), batch('boe', 20, 5, '2024-01-20')]))
+        alerts = self.monitor.close_days(through='2024-01-20')
+        self.assertEqual([(a['bank_name'], a['metric'], a['direction']) for a in alerts],
+                         [('cbe', 'negative_rate', 'up')])
+        self.assertEqual(alerts[0]['value'], 0.8)
+        self.assertEqual(alerts[0]['id'], 'cbe|negative_rate|2024-01-20')
+
+        # Alerts wait in the outbox until they are sent
+        self.assertEqual((self.sink.alerts, self.monitor.outbox), ([], alerts))
+        self.assertEqual(self.monitor.emit_alerts(), 1)
+        self.assertEqual((self.sink.alerts, self.monitor.outbox), (alerts, []))
+
+    def test_days_are_scored_in_date_order(self):
+        """Test a regression on the newest day alerts even when batches arrive newest first."""
+        reviews = pd.concat([batch('cbe', 20, 16, '2024-01-20'), self.baseline()[::-1]])
+        for start in range(0, len(reviews), 30):
+            self.monitor.observe(reviews.iloc[start:start + 30])
+        # The newest day is still open until a later one arrives
+        self.assertEqual(self.monitor.close_days(), [])
+        self.monitor.observe(batch('cbe', 3, 0, '2024-01-21'))
+        alerts = self.monitor.close_days()
+        self.assertEqual([(a['metric'], a['window_end']) for a in alerts], [('negative_rate', '2024-01-20')])
+        self.assertEqual(self.monitor.banks['cbe']['closed_through'], '2024-01-20')
+        self.assertEqual(list(self.monitor.banks['cbe']['days']), ['2024-01-21'])
+
+    def test_no_alerts_during_warmup(self):
+        for i in range(4):
+            self.monitor.observe(batch('cbe', 20, 0 if i % 2 else 20, f'2024-01-0{i + 1}'))
+        self.assertEqual(self.monitor.close_days(through='2024-01-04'), [])
+        self.assertEqual(self.monitor.banks['cbe']['observations'], 4)
+
+    def test_small_days_are_pooled(self):
+        """Test consecutive days below min_reviews are pooled into one observation."""
+        self.monitor.observe(pd.concat([batch('cbe', 8, 2, '2024-01-01'), batch('cbe', 8, 2, '2024-01-02')]))
+        self.monitor.close_days(through='2024-01-02')
+        state = self.monitor.banks['cbe']
+        self.assertEqual((state['observations'], state['pooled']['scored']), (0, 16))
+        self.monitor.observe(batch('cbe', 8, 2, '2024-01-03'))
+        self.monitor.close_days(through='2024-01-03')
+        self.assertEqual((state['observations'], state['pooled']['scored']), (1, 0))
+        self.assertAlmostEqual(state['stats']['negative_rate']['mean'], self.monitor.alpha * 6 / 24)
+
+    def test_reviews_for_closed_days_are_late(self):
+        self.monitor.observe(self.baseline(days=3))
+        self.monitor.close_days(through='2024-01-02')
+        self.assertEqual(self.monitor.observe(batch('cbe', 5, 0, '2024-01-02')), 5)
+        self.assertEqual(self.monitor.observe(batch('cbe', 5, 0, '2024-01-03')), 0)
+        state = self.monitor.banks['cbe']
+        self.assertEqual((state['late'], state['days']['2024-01-03']['reviews']), (5, 25))
+
+    def test_skipped_rows_are_not_scored(self):
+        df = batch('cbe', 20, 5, '2024-01-01')
+        df.loc[:9, 'sentiment_label'] = 'SKIPPED'
+        df.loc[:9, 'sentiment_score'] = np.nan
+        self.monitor.observe(df)
+        window = self.monitor.banks['cbe']['days']['2024-01-01']
+        self.assertEqual(window, {'reviews': 20, 'scored': 10, 'score_sum': window['score_sum'], 'negative': 0,
+                                  'themes': {}, 'start': '2024-01-01', 'end': '2024-01-01'})
+
+    def test_new_theme_surge(self):
+        """Test a theme never seen before alerts against a zero baseline."""
+        self.monitor.observe(self.baseline())
+        self.monitor.observe(batch('cbe', 20, 5, '2024-01-20', themes=['crash;login'] * 10 + [''] * 10))
+        alerts = self.monitor.close_days(through='2024-01-20')
+        self.assertEqual({a['metric'] for a in alerts}, {'theme:crash', 'theme:login'})
+        summary = self.monitor.summary().set_index('metric')
+        self.assertEqual(summary.loc['theme:crash', 'observations'], 9)
+
+    def test_save_and_load(self):
+        """Test a saved monitor resumes with the same statistics, open days and queued alerts."""
+        path = os.path.join(self.tmp_dir, 'nested', 'drift.json')
+        self.monitor.observe(self.baseline())
+        self.monitor.observe(batch('cbe', 20, 16, '2024-01-09'))
+        self.monitor.observe(batch('cbe', 5, 1, '2024-01-10'))
+        self.assertEqual(len(self.monitor.close_days()), 1)
+        self.monitor.meta['batches_done'] = 4
+        self.monitor.save(path)
+        loaded = DriftMonitor.load(path, sinks=[self.sink])
+        self.assertEqual((loaded.banks, loaded.outbox), (self.monitor.banks, self.monitor.outbox))
+        self.assertEqual((loaded.min_reviews, loaded.meta), (20, {'batches_done': 4}))
+        self.assertEqual(loaded.emit_alerts(), 1)
+        self.assertEqual(self.sink.alerts[0]['window_end'], '2024-01-09')
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['drift.json'])
+        self.assertEqual(DriftMonitor.load_or_create(os.path.join(self.tmp_dir, 'missing.json')).banks, {})
+
+    def test_version_1_state_starts_over(self):
+        path = os.path.join(self.tmp_dir, 'drift.json')
+        with open(path, 'w') as f:
+            json.dump({'version': 1, 'settings': {'alpha': 0.3, 'threshold': 3.0, 'warmup': 5, 'min_reviews': 50,
+                                                  'min_std': 0.02}, 'banks': {'cbe': {}}, 'meta': {}}, f)
+        with self.assertLogs(level='WARNING'):
+            monitor = DriftMonitor.load(path)
+        self.assertEqual((monitor.alpha, monitor.banks), (0.3, {}))
+
+    def test_json_lines_sink(self):
+        path = os.path.join(self.tmp_dir, 'alerts', 'drift.jsonl')
+        sink = JsonLinesAlertSink(path)
+        sink.emit([{'metric': 'a'}])
+        sink.emit([{'metric': 'b'}])
+        with open(path) as f:
+            self.assertEqual([json.loads(line)['metric'] for line in f], ['a', 'b'])
+
+    def test_webhook_errors_are_logged(self):
+        with patch('urllib.request.urlopen', side_effect=OSError("refused")) as urlopen:
+            with self.assertLogs(level='ERROR'):
+                WebhookAlertSink('http://127.0.0.1:9/hook').emit([{'metric': 'a'}])
+        request = urlopen.call_args[0][0]
+        self.assertEqual(json.loads(request.data), {'alerts': [{'metric': 'a'}]})
+
+
+if __name__ == '__main__':
+    unittest.main()
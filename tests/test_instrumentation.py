@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src.instrumentation import Instrumentation, LatencyHistogram, instrumented, metrics
+from src.review_preprocessor import ReviewPreprocessor
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        """Start each test from empty shared metrics."""
+        self.tmp_dir = tempfile.mkdtemp()
+        metrics.reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        metrics.reset()
+
+    def test_stage_accumulates_calls(self):
+        """Test repeated stage calls add up rows, time and calls."""
+        instrumentation = Instrumentation()
+        for rows in (3, 4):
+            with instrumentation.stage('preprocess') as call:
+                call.rows = rows
+        stats = instrumentation.report()['stages']['preprocess']
+        self.assertEqual((stats['calls'], stats['rows']), (2, 7))
+        self.assertGreaterEqual(stats['wall_seconds'], 0)
+        self.assertIn('peak_rss_mb', stats)
+
+    def test_decorator_counts_rows(self):
+        """Test decorated functions count rows from results, dicts and tuples."""
+        @instrumented('scrape')
+        def scrape():
+            return {'cbe': pd.DataFrame({'a': [1, 2]}), 'boa': pd.DataFrame({'a': [3]})}
+
+        @instrumented('sentiment')
+        def analyze(df):
+            return df, None
+
+        scrape()
+        analyze(pd.DataFrame({'a': range(5)}))
+        stages = metrics.report()['stages']
+        self.assertEqual(stages['scrape']['rows'], 3)
+        self.assertEqual(stages['sentiment']['rows'], 5)
+
+    def test_failed_call_still_recorded(self):
+        """Test a stage that raises is still timed."""
+        @instrumented('db_sync')
+        def sync():
+            raise RuntimeError("database down")
+
+        with self.assertRaises(RuntimeError):
+            sync()
+        self.assertEqual(metrics.report()['stages']['db_sync']['calls'], 1)
+
+    def test_histogram_buckets(self):
+        """Test samples land in the first bucket whose bound they do not exceed."""
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.to_dict()['buckets'], {'0.1': 2, '1.0': 1, '+Inf': 1})
+
+    def test_report_and_prometheus_files(self):
+        """Test the JSON report and the cumulative Prometheus histogram."""
+        with metrics.stage('themes', rows=10):
+            pass
+        metrics.observe('sentiment_batch', 0.02)
+        metrics.observe('sentiment_batch', 2.0)
+
+        report_path = os.path.join(self.tmp_dir, 'reports', 'run.json')
+        prom_path = os.path.join(self.tmp_dir, 'pipeline.prom')
+        metrics.write_report(report_path)
+        metrics.write_prometheus(prom_path)
+
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(report['stages']['themes']['rows'], 10)
+        self.assertEqual(report['histograms']['sentiment_batch']['count'], 2)
+        with open(prom_path) as f:
+            text = f.read()
+        self.assertIn('review_pipeline_stage_rows{stage="themes"} 10', text)
+        self.assertIn('review_pipeline_batch_latency_seconds_bucket{name="sentiment_batch",le="0.025"} 1', text)
+        self.assertIn('review_pipeline_batch_latency_seconds_bucket{name="sentiment_batch",le="+Inf"} 2', text)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['pipeline.prom', 'reports'])
+
+    def test_preprocessor_is_instrumented(self):
+        """Test process_reviews reports its output rows."""
+        df = pd.DataFrame({
+            'review': ["Great app!", "Great app!", "Slow"],
+            'rating': [5, 5, 2],
+            'date': ['2024-01-01'] * 3,
+            'bank': ['cbe'] * 3
+        })
+        ReviewPreprocessor().process_reviews(df)
+        self.assertEqual(metrics.report()['stages']['preprocess']['rows'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.language_detector import LanguageDetector, expand_to_rows, model_mask
+from src.review_preprocessor import ReviewPreprocessor
+
+
+class TestLanguageDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = LanguageDetector()
+        self.texts = [
+            "Great app, very fast",
+            "በጣም ጥሩ መተግበሪያ ነው",
+            "Great app with login ቆንጆ ነው",
+            "ok ቆንጆ ነው good app",
+            "Отличное приложение",
+            "12345 !!",
+            None,
+        ]
+        self.expected = ['en', 'am', 'en', 'mixed', 'other', 'unknown', 'unknown']
+
+    def test_detect_by_dominant_script(self):
+        """Test each text is labelled by the script most of its letters use."""
+        self.assertEqual(self.detector.detect(self.texts).tolist(), self.expected)
+
+    def test_detect_keeps_index_and_string_dtypes(self):
+        """Test Series input keeps its index and gives equal labels for object and string dtypes."""
+        index = [5, 2, 9, 1, 0, 7, 3]
+        as_object = pd.Series(self.texts, index=index, dtype=object)
+        as_string = pd.Series([t or '' for t in self.texts], index=index, dtype='string')
+        self.assertEqual(self.detector.detect(as_object).index.tolist(), index)
+        self.assertEqual(self.detector.detect(as_string).tolist(), self.expected)
+
+    def test_model_mask(self):
+        """Test only English rows go to the models, and every row without a language column."""
+        df = pd.DataFrame({'review_text': ['a', 'b', 'c'], 'language': ['en', 'am', 'mixed']})
+        self.assertEqual(model_mask(df).tolist(), [True, False, False])
+        self.assertTrue(model_mask(df.drop(columns='language')).all())
+
+    def test_expand_to_rows(self):
+        """Test masked results land on their rows and the rest get the fill value."""
+        expanded = expand_to_rows(['x', 'y'], np.array([False, True, True]), '', pd.Index([4, 5, 6]))
+        self.assertEqual(expanded.to_dict(), {4: '', 5: 'x', 6: 'y'})
+
+    def test_process_reviews_adds_language(self):
+        """Test the preprocessor records the language of every kept review."""
+        df = pd.DataFrame({
+            'review': ["Works well", "በጣም ጥሩ ነው"],
+            'rating': [5, 4],
+            'date': ['2023-01-01', '2023-01-02'],
+            'bank': ['cbe', 'cbe'],
+        })
+        processed = ReviewPreprocessor().process_reviews(df)
+        self.assertEqual(processed['language'].tolist(), ['en', 'am'])
+
+
+if __name__ == '__main__':
+    unittest.main()
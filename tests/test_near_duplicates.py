@@ -0,0 +1,91 @@
+import unittest
+import unittest.mock
+import numpy as np
+import pandas as pd
+from src.near_duplicates import NearDuplicateDetector
+from src.review_preprocessor import ReviewPreprocessor
+
+
+class TestNearDuplicateDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = NearDuplicateDetector()
+
+    def test_signatures_are_deterministic(self):
+        """Equal texts get equal signatures; chunking does not change them."""
+        texts = ["The app keeps crashing on login", "Great app", "The app keeps crashing on login"]
+        signatures = self.detector.signatures(texts)
+        self.assertEqual(signatures.shape, (3, 64))
+        np.testing.assert_array_equal(signatures[0], signatures[2])
+        chunked = NearDuplicateDetector(chunk_size=1).signatures(texts)
+        np.testing.assert_array_equal(signatures, chunked)
+
+    def test_cluster_near_duplicates(self):
+        """Reviews differing by a word or an emoji share a cluster; others do not."""
+        texts = [
+            "This app is terrible, it crashes every time I try to transfer money",
+            "Great service and very fast transfers",
+            "This app is terrible, it crashes every time I try to transfer money!!",
+            "this app is terrible it crashes every time i try to transfer money 😡",
+            "The login page does not load after the update",
+        ]
+        labels = self.detector.cluster(texts)
+        self.assertEqual(labels.tolist(), [0, 1, 0, 0, 2])
+
+    def test_cluster_respects_groups(self):
+        """Identical texts of different groups stay in separate clusters."""
+        texts = ["Money transfer fails every single time"] * 2
+        self.assertEqual(self.detector.cluster(texts, ['cbe', 'boe']).tolist(), [0, 1])
+        self.assertEqual(self.detector.cluster(texts, ['cbe', 'cbe']).tolist(), [0, 0])
+
+    def test_cluster_empty_and_non_string(self):
+        """Empty input gives no labels; non-strings are treated as empty text."""
+        self.assertEqual(len(self.detector.cluster([])), 0)
+        self.assertEqual(len(self.detector.cluster([None, 'ok', float('nan')])), 3)
+
+    def test_bucket_members_are_compared_beyond_neighbours(self):
+        """Test A~C is linked when a dissimilar B sorts between them in a bucket."""
+        a = np.arange(1, 9, dtype=np.uint32)
+        b = np.concatenate([a[:4], [50, 51, 52, 53]]).astype(np.uint32)
+        c = np.concatenate([a[:7], [99]]).astype(np.uint32)
+        signatures = np.stack([a, b, c])
+        groups = np.zeros(3, dtype=np.int64)
+        for max_bucket_pairs in (16, 1):
+            detector = NearDuplicateDetector(num_perm=8, bands=2, max_bucket_pairs=max_bucket_pairs)
+            first, second = detector._candidate_pairs(signatures, groups)
+            self.assertIn((0, 2), set(zip(first.tolist(), second.tolist())))
+            with unittest.mock.patch.object(detector, 'signatures', return_value=signatures):
+                self.assertEqual(detector.cluster(['a', 'b', 'c']).tolist(), [0, 1, 0])
+
+    def test_bands_must_divide_num_perm(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateDetector(num_perm=64, bands=10)
+
+
+class TestCollapseNearDuplicates(unittest.TestCase):
+
+    def test_process_reviews_collapses_clusters(self):
+        """One representative per cluster is kept, carrying the cluster size."""
+        df = pd.DataFrame({
+            'review': [
+                "Worst banking app ever, it never loads my balance",
+                "Worst banking app ever, it never loads my balance!",
+                "Worst banking app ever it never loads my balance 👎",
+                "Customer support solved my problem quickly",
+            ],
+            'rating': [1, 1, 1, 5],
+            'date': ['2023-01-01', '2023-01-02', '2023-01-03', '2023-01-04'],
+            'bank': ['cbe', 'cbe', 'cbe', 'cbe'],
+        })
+        preprocessor = ReviewPreprocessor()
+
+        processed = preprocessor.process_reviews(df, collapse_near_duplicates=True)
+
+        self.assertEqual(len(processed), 2)
+        self.assertEqual(processed['date'].dt.strftime('%Y-%m-%d').tolist(), ['2023-01-01', '2023-01-04'])
+        self.assertEqual(processed['cluster_size'].tolist(), [3, 1])
+        self.assertNotIn('cluster_id', preprocessor.process_reviews(df).columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
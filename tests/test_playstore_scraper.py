@@ -0,0 +1,221 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pandas as pd
+from src.playstore_scraper import PlayStoreScraper, TokenBucket
+
+
+class FakeToken:
+    def __init__(self, token):
+        self.token = token
+
+
+class FakeReviews:
+    """Offline stand-in for google_play_scraper.reviews, newest first."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = []
+
+    def add(self, app_id, count, start):
+        existing = self.store.setdefault(app_id, [])
+        for i in range(count):
+            n = len(existing)
+            existing.insert(0, {
+                'reviewId': f'{app_id}-{n}',
+                'content': f'review {n}',
+                'score': 1 + n % 5,
+                'at': start + timedelta(minutes=i)
+            })
+
+    def __call__(self, app_id, lang='en', country='us', sort=None, count=100, continuation_token=None, **kwargs):
+        self.calls.append(app_id)
+        offset = int(continuation_token.token) if continuation_token else 0
+        page = self.store.get(app_id, [])[offset:offset + count]
+        next_offset = offset + len(page)
+        token = FakeToken(str(next_offset) if next_offset < len(self.store.get(app_id, [])) else None)
+        return page, token
+
+
+class TestPlayStoreScraper(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a scraper writing to a temporary raw directory."""
+        self.raw_dir = tempfile.mkdtemp()
+        self.fake = FakeReviews({})
+        self.scraper = PlayStoreScraper(reviews_fn=self.fake, raw_dir=self.raw_dir)
+        self.scraper.apps = {'cbe': 'app.cbe'}
+
+    def tearDown(self):
+        shutil.rmtree(self.raw_dir)
+
+    def test_get_reviews_uses_injected_fn(self):
+        """Test get_reviews fetches through the injected function."""
+        self.fake.add('app.cbe', 3, datetime(2024, 1, 1))
+        df = self.scraper.get_reviews('app.cbe', count=10)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(self.fake.calls, ['app.cbe'])
+
+    def test_incremental_appends_only_new_reviews(self):
+        """Test a second run appends only reviews newer than the watermark."""
+        self.fake.add('app.cbe', 5, datetime(2024, 1, 1))
+        first = self.scraper.scrape_incremental(page_size=2)
+        self.assertEqual(len(first['cbe']), 5)
+
+        self.fake.add('app.cbe', 3, datetime(2024, 1, 2))
+        self.fake.calls.clear()
+        second = self.scraper.scrape_incremental(page_size=2)
+        self.assertEqual(len(second['cbe']), 3)
+        # Paging stops at the first review older than the watermark,
+        # not at the end of the 8-review history
+        self.assertEqual(len(self.fake.calls), 3)
+
+        saved = pd.read_csv(os.path.join(self.raw_dir, 'cbe_review.csv'))
+        self.assertEqual(len(saved), 8)
+        self.assertEqual(list(saved.columns), ['review', 'rating', 'date', 'bank', 'source'])
+
+    def test_incremental_no_new_reviews(self):
+        """Test nothing is appended when no new reviews exist."""
+        self.fake.add('app.cbe', 2, datetime(2024, 1, 1))
+        self.scraper.scrape_incremental()
+        self.assertEqual(self.scraper.scrape_incremental(), {})
+        state = self.scraper.load_state()
+        self.assertEqual(state['app.cbe']['review_id'], 'app.cbe-1')
+
+    def saved_ids(self):
+        saved = pd.read_csv(os.path.join(self.raw_dir, 'cbe_review.csv'))
+        return sorted(saved['review'])
+
+    def test_truncated_fetch_resumes_into_the_gap(self):
+        """Test running out of pages keeps the watermark and the next run pages on from the saved token."""
+        self.fake.add('app.cbe', 5, datetime(2024, 1, 1))
+        self.scraper.scrape_incremental(page_size=2)
+        self.fake.add('app.cbe', 10, datetime(2024, 1, 2))
+
+        partial = self.scraper.scrape_incremental(page_size=2, max_pages=2)
+        self.assertEqual(len(partial['cbe']), 4)
+        state = self.scraper.load_state()['app.cbe']
+        self.assertEqual(state['review_id'], 'app.cbe-4')
+        self.assertEqual(state['sweep']['token'], '4')
+
+        # A review arriving meanwhile shifts the pages; already stored ones are skipped
+        self.fake.add('app.cbe', 1, datetime(2024, 1, 3))
+        self.fake.calls.clear()
+        rest = self.scraper.scrape_incremental(page_size=2, max_pages=10)
+        self.assertEqual(len(rest['cbe']), 6)
+        self.assertEqual(len(self.fake.calls), 5)
+        state = self.scraper.load_state()['app.cbe']
+        self.assertEqual((state['review_id'], 'sweep' in state), ('app.cbe-14', False))
+
+        newest = self.scraper.scrape_incremental(page_size=2)
+        self.assertEqual(newest['cbe']['review'].tolist(), ['review 15'])
+        self.assertEqual(self.saved_ids(), sorted(f'review {n}' for n in range(16)))
+
+    def test_rejected_token_restarts_from_newest(self):
+        """Test a sweep whose token fails re-pages from the newest review without duplicates."""
+        self.fake.add('app.cbe', 6, datetime(2024, 1, 1))
+        self.scraper.scrape_incremental(page_size=2, max_pages=1)
+        state = self.scraper.load_state()
+        state['app.cbe']['sweep']['token'] = 'expired'
+        self.scraper.save_state(state)
+
+        self.scraper.scrape_incremental(page_size=2, max_pages=10)
+        self.assertEqual(self.saved_ids(), sorted(f'review {n}' for n in range(6)))
+        self.assertEqual(self.scraper.load_state()['app.cbe']['review_id'], 'app.cbe-5')
+
+    def test_sweep_restarts_without_the_private_token_class(self):
+        """Test a library without _ContinuationToken restarts an unfinished sweep instead of failing."""
+        self.fake.add('app.cbe', 6, datetime(2024, 1, 1))
+        self.scraper.scrape_incremental(page_size=2, max_pages=1)
+        self.assertIn('sweep', self.scraper.load_state()['app.cbe'])
+
+        with patch('src.playstore_scraper._ContinuationToken', None):
+            self.scraper.scrape_incremental(page_size=2, max_pages=10)
+        self.assertEqual(self.saved_ids(), sorted(f'review {n}' for n in range(6)))
+        self.assertEqual(self.scraper.load_state()['app.cbe']['review_id'], 'app.cbe-5')
+
+
+class FlakyReviews(FakeReviews):
+    """Fake that fails the first few calls for an app."""
+
+    def __init__(self, store, failures):
+        super().__init__(store)
+        self.failures = failures
+
+    def __call__(self, app_id, **kwargs):
+        if self.failures.get(app_id, 0) > 0:
+            self.failures[app_id] -= 1
+            self.calls.append(app_id)
+            raise ConnectionError("rate limited")
+        return super().__call__(app_id, **kwargs)
+
+
+class TestConcurrentScraping(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a scraper over two apps with a stubbed reviews function."""
+        self.raw_dir = tempfile.mkdtemp()
+        self.sleeps = []
+
+    def tearDown(self):
+        shutil.rmtree(self.raw_dir)
+
+    def make_scraper(self, failures):
+        fake = FlakyReviews({}, failures)
+        fake.add('app.cbe', 4, datetime(2024, 1, 1))
+        fake.add('app.boe', 2, datetime(2024, 1, 1))
+        scraper = PlayStoreScraper(reviews_fn=fake, raw_dir=self.raw_dir)
+        scraper.apps = {'cbe': 'app.cbe', 'boe': 'app.boe'}
+        return scraper, fake
+
+    def test_targets_cover_locales(self):
+        """Test targets are the product of apps, languages and countries."""
+        scraper, _ = self.make_scraper({})
+        targets = scraper.build_targets(langs=('en', 'am'), countries=('us', 'et'))
+        self.assertEqual(len(targets), 8)
+
+    def test_retries_with_backoff(self):
+        """Test failing targets are retried with growing delays."""
+        scraper, fake = self.make_scraper({'app.cbe': 2})
+        result = scraper.scrape_concurrent(rate=1000, backoff_base=1.0, sleep=self.sleeps.append)
+        self.assertEqual(len(result['cbe']), 4)
+        self.assertEqual(len(result['boe']), 2)
+        self.assertEqual(fake.calls.count('app.cbe'), 3)
+        backoffs = [s for s in self.sleeps if s >= 1.0]
+        self.assertEqual(len(backoffs), 2)
+        self.assertTrue(1.0 <= backoffs[0] < 2.0 <= backoffs[1] < 4.0)
+
+    def test_gives_up_after_max_retries(self):
+        """Test a target that keeps failing is skipped, others still saved."""
+        scraper, fake = self.make_scraper({'app.cbe': 10})
+        result = scraper.scrape_concurrent(rate=1000, max_retries=2, sleep=self.sleeps.append)
+        self.assertNotIn('cbe', result)
+        self.assertEqual(fake.calls.count('app.cbe'), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.raw_dir, 'boe_review.csv')))
+
+    def test_locales_merged_per_bank(self):
+        """Test duplicate reviews across locales are saved once."""
+        scraper, _ = self.make_scraper({})
+        targets = scraper.build_targets(countries=('us', 'et'))
+        result = scraper.scrape_concurrent(targets=targets, rate=1000, sleep=self.sleeps.append)
+        self.assertEqual(len(result['cbe']), 4)
+
+    def test_token_bucket_waits_when_empty(self):
+        """Test the bucket sleeps for the time needed to refill one token."""
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2.0, capacity=1, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(waits, [0.5])
+
+if __name__ == '__main__':
+    unittest.main()
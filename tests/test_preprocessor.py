@@ -40,6 +40,17 @@ class TestReviewPreprocessor(unittest.TestCase):
         cleaned = self.preprocessor.clean_review(review)
         self.assertEqual(cleaned, "")
 
+    def test_clean_reviews_matches_clean_review(self):
+        """Test the column cleaner gives byte-identical output to clean_review."""
+        reviews = pd.Series([
+            "  This is a great app!  ", "Awesome! #loveit", "Too    many   spaces",
+            "snake_case\tand\nnewlines", "Amharic ሰላም and emoji 😀!", "Ünïcödé café №5 ½",
+            "a\u00a0b\u2003c\x1fd", "__--__", "", "   ", 123, None, float('nan')
+        ], index=[5, 3, 9, 1, 0, 2, 4, 6, 7, 8, 10, 11, 12])
+        cleaned = self.preprocessor.clean_reviews(reviews)
+        self.assertEqual(list(cleaned.index), list(reviews.index))
+        self.assertEqual(cleaned.tolist(), [self.preprocessor.clean_review(r) for r in reviews])
+
     def test_process_reviews_standard(self):
         """Test standard DataFrame processing."""
         data = {
@@ -80,7 +91,7 @@ class TestReviewPreprocessor(unittest.TestCase):
     def test_process_all_banks(self, mock_to_csv, mock_read_csv, mock_glob, mock_makedirs):
         """Test processing of all banks with file system mocking."""
         # Mock glob to return a dummy file path
-        mock_glob.return_value = ['../data/raw/bankA_review.csv']
+        mock_glob.return_value = [os.path.join('data', 'raw', 'bankA_review.csv')]
         
         # Mock read_csv to return a dummy DataFrame
         dummy_data = {
@@ -94,13 +105,13 @@ class TestReviewPreprocessor(unittest.TestCase):
         self.preprocessor.process_all_banks()
         
         # Assert that makedirs was called
-        mock_makedirs.assert_called_once_with('../data/processed', exist_ok=True)
+        mock_makedirs.assert_called_once_with(os.path.join('data', 'processed'), exist_ok=True)
         
         # Assert that read_csv was called with the correct path
-        mock_read_csv.assert_called_once_with('../data/raw/bankA_review.csv')
+        mock_read_csv.assert_called_once_with(os.path.join('data', 'raw', 'bankA_review.csv'))
         
         # Assert that to_csv was called with the correct path
-        expected_path = os.path.join('../data/processed', 'bankA_review.csv')
+        expected_path = os.path.join('data', 'processed', 'bankA_review.csv')
         mock_to_csv.assert_called_once_with(expected_path, index=False)
 
 if __name__ == '__main__':
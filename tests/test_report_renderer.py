@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from src.aggregates import AggregateCube
+from src.report_renderer import ReportRenderer
+
+
+def fake_render(job):
+    """Stand-in for the matplotlib worker: touch each output file"""
+    chart, cube, paths = job
+    for path in paths:
+        with open(path, 'w') as f:
+            f.write(chart)
+    return True
+
+
+class TestReportRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'review_text': ["login fails", "great app", "transfer slow", "app ok", "login app"],
+            'rating': [1, 5, 2, 4, 5],
+            'date': ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-09', '2024-01-10'],
+            'bank_name': ['cbe', 'cbe', 'boe', 'cbe', 'boe'],
+            'sentiment_label': ['NEGATIVE', 'POSITIVE', 'NEGATIVE', 'POSITIVE', 'POSITIVE'],
+            'sentiment_score': [0.8, 0.9, 0.7, 0.6, 1.0],
+            'keywords': ["login", "app", "transfer", "app", "login app"]
+        })
+        self.tmp_dir = tempfile.mkdtemp()
+        patchers = [patch('src.report_renderer._init_worker'),
+                    patch('src.report_renderer._render_job', side_effect=fake_render)]
+        self.render_job = [patcher.start() for patcher in patchers][1]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def renderer(self, cube, **kwargs):
+        return ReportRenderer(cube, self.tmp_dir, workers=0, **kwargs)
+
+    def test_periods(self):
+        """Test periods end at the latest day and are labelled by ISO week or month."""
+        cube = AggregateCube.from_frame(self.df)
+        weeks = self.renderer(cube).periods(last=2)
+        self.assertEqual([label for label, _, _ in weeks], ['2024-W01', '2024-W02'])
+        self.assertEqual((weeks[1][1], weeks[1][2]), (pd.Timestamp('2024-01-08'), pd.Timestamp('2024-01-14')))
+        months = self.renderer(cube, period='month').periods(last=1)
+        self.assertEqual(months[0][0], '2024-01')
+
+    def test_plan_skips_empty_slices(self):
+        """Test one job per chart for every bank and period with reviews."""
+        jobs = self.renderer(AggregateCube.from_frame(self.df), formats=('png', 'svg')).plan(last=3)
+        self.assertEqual(len(jobs), 2 * 2 * 3)
+        job = next(job for job in jobs if job['key'] == 'cbe/2024-W02/trends')
+        self.assertEqual(job['paths'], [os.path.join(self.tmp_dir, 'cbe', '2024-W02', f'trends.{fmt}')
+                                        for fmt in ('png', 'svg')])
+        self.assertEqual(int(job['cube'].facts['count'].sum()), 1)
+
+    def test_only_changed_charts_rerender(self):
+        """Test a second run skips everything until one bank-period's aggregates change."""
+        cube = AggregateCube.from_frame(self.df)
+        first = self.renderer(cube).render()
+        self.assertEqual(len(first['rendered']), 12)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'boe', '2024-W01', 'cloud.png')))
+
+        second = self.renderer(cube).render()
+        self.assertEqual((second['rendered'], len(second['skipped'])), ([], 12))
+
+        cube.update(self.df.iloc[[4]])
+        third = self.renderer(cube).render()
+        self.assertEqual(sorted(third['rendered']),
+                         ['boe/2024-W02/cloud', 'boe/2024-W02/ratings', 'boe/2024-W02/trends'])
+        self.assertEqual(self.render_job.call_count, 15)
+
+        forced = self.renderer(cube).render(banks=['cbe'], force=True)
+        self.assertEqual(len(forced['rendered']), 6)
+
+    def test_missing_or_failed_outputs_rerender(self):
+        """Test deleted files are redrawn and failed charts are not recorded."""
+        cube = AggregateCube.from_frame(self.df)
+        self.renderer(cube).render(banks=['cbe'])
+        os.remove(os.path.join(self.tmp_dir, 'cbe', '2024-W01', 'ratings.png'))
+        self.render_job.side_effect = lambda job: job[0] != 'cloud' and fake_render(job)
+        result = self.renderer(cube).render(banks=['cbe'])
+        self.assertEqual(result['rendered'], ['cbe/2024-W01/ratings'])
+        self.assertEqual(result['failed'], [])
+
+        result = self.renderer(cube).render(banks=['cbe'], force=True)
+        self.assertEqual(sorted(result['failed']), ['cbe/2024-W01/cloud', 'cbe/2024-W02/cloud'])
+        with open(os.path.join(self.tmp_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertNotIn('cbe/2024-W01/cloud', manifest)
+        self.assertIn('cbe/2024-W01/trends', manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'manifest.json.tmp')))
+
+    def test_invalid_settings(self):
+        cube = AggregateCube()
+        with self.assertRaises(ValueError):
+            ReportRenderer(cube, self.tmp_dir, period='year')
+        with self.assertRaises(ValueError):
+            ReportRenderer(cube, self.tmp_dir, charts=('pie',))
+        self.assertEqual(ReportRenderer(cube, self.tmp_dir).render(), {'rendered': [], 'skipped': [], 'failed': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src.review_store import CsvReviewStore, ParquetReviewStore, get_store
+from src.review_preprocessor import ReviewPreprocessor
+
+
+def sample_reviews():
+    return pd.DataFrame({
+        'review_text': ["Great app", "Login fails", "Slow transfer", "Nice", "Crashes"],
+        'rating': [5, 1, 2, 4, 1],
+        'date': ['2024-01-05', '2024-01-20', '2024-02-03', '2024-02-10', '2024-03-01'],
+        'bank_name': ['cbe', 'cbe', 'boe', 'cbe', 'boe'],
+        'source': ['google_play'] * 5
+    })
+
+
+class TestParquetReviewStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a Parquet store in a temporary directory."""
+        self.base_dir = tempfile.mkdtemp()
+        self.store = ParquetReviewStore(self.base_dir)
+        self.store.write(sample_reviews(), 'processed')
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_partitioned_by_bank_and_month(self):
+        """Test the dataset is laid out by bank and month."""
+        root = os.path.join(self.base_dir, 'processed_parquet')
+        self.assertTrue(os.path.isdir(os.path.join(root, 'bank_name=cbe', 'month=2024-01')))
+        self.assertEqual(self.store.banks('processed'), ['boe', 'cbe'])
+
+    def test_typed_columns(self):
+        """Test columns come back with compact types."""
+        df = self.store.read('processed')
+        self.assertEqual(len(df), 5)
+        self.assertEqual(str(df['bank_name'].dtype), 'category')
+        self.assertEqual(str(df['rating'].dtype), 'int8')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['date']))
+        self.assertNotIn('month', df.columns)
+
+    def test_projection_and_filters(self):
+        """Test column projection and predicate pushdown."""
+        df = self.store.read(
+            'processed',
+            columns=['review_text', 'rating'],
+            filters=[('bank_name', '=', 'cbe'), ('date', '>=', '2024-01-15')]
+        )
+        self.assertEqual(list(df.columns), ['review_text', 'rating'])
+        self.assertEqual(sorted(df['review_text']), ["Login fails", "Nice"])
+
+    def test_rewrite_replaces_bank(self):
+        """Test writing a bank again replaces its partitions."""
+        self.store.write(sample_reviews().iloc[:1], 'processed')
+        df = self.store.read('processed', filters=[('bank_name', '=', 'cbe')])
+        self.assertEqual(df['review_text'].tolist(), ["Great app"])
+        self.assertEqual(len(self.store.read('processed', filters=[('bank_name', '=', 'boe')])), 2)
+
+    def test_append(self):
+        """Test appended rows are added next to existing ones."""
+        self.store.write(sample_reviews().iloc[:1], 'processed', append=True)
+        self.assertEqual(len(self.store.read('processed')), 6)
+
+
+class TestCsvReviewStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a CSV store in a temporary directory."""
+        self.base_dir = tempfile.mkdtemp()
+        self.store = get_store('csv', self.base_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_original_layout_and_filters(self):
+        """Test CSV files keep the {bank}_review.csv layout and filters apply."""
+        self.store.write(sample_reviews(), 'processed')
+        self.assertTrue(os.path.exists(os.path.join(self.base_dir, 'processed', 'cbe_review.csv')))
+        df = self.store.read('processed', columns=['review_text'], filters=[('rating', '<=', 2)])
+        self.assertEqual(sorted(df['review_text']), ["Crashes", "Login fails", "Slow transfer"])
+
+    def test_preprocessor_uses_store(self):
+        """Test load_data and process_all_banks go through the store."""
+        raw = sample_reviews().rename(columns={'review_text': 'review', 'bank_name': 'bank'})
+        self.store.write(raw, 'raw')
+        preprocessor = ReviewPreprocessor(store=self.store)
+        preprocessor.process_all_banks()
+        df = preprocessor.load_data(filters=[('bank_name', '=', 'boe')])
+        self.assertEqual(sorted(df['review_text']), ["Crashes", "Slow transfer"])
+        self.assertIsInstance(self.store, CsvReviewStore)
+
+if __name__ == '__main__':
+    unittest.main()
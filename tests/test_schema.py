@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.schema import enforce_schema, memory_report
+
+
+class TestSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'review_text': ["Great app", "Login fails", "Slow transfers"],
+            'rating': [5, 1, 2],
+            'date': ['2024-01-05 10:31:00', '2024-01-06 00:00:00', '2024-01-07 23:59:59'],
+            'bank_name': ['cbe', 'boe', 'cbe'],
+            'source': ['google_play'] * 3,
+            'sentiment_label': ['POSITIVE', 'NEGATIVE', 'NEGATIVE'],
+            'sentiment_score': [0.99, 0.87, 0.75],
+            'keywords': ["great app", "login fails", "slow transfers"],
+            'extra': [object(), object(), object()]
+        }).astype({'review_text': object, 'bank_name': object, 'keywords': object})
+
+    def test_enforce_schema_types(self):
+        """Test known columns get their compact types and unknown ones are kept."""
+        typed = enforce_schema(self.df.copy())
+        for column in ('bank_name', 'source', 'sentiment_label'):
+            self.assertIsInstance(typed[column].dtype, pd.CategoricalDtype)
+        self.assertEqual(typed['rating'].dtype, np.int8)
+        self.assertEqual(typed['sentiment_score'].dtype, np.float32)
+        self.assertIsInstance(typed['review_text'].dtype, pd.StringDtype)
+        self.assertIsInstance(typed['keywords'].dtype, pd.StringDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(typed['date']))
+        self.assertEqual(typed['date'].dt.strftime('%Y-%m-%d').tolist(), ['2024-01-05', '2024-01-06', '2024-01-07'])
+        self.assertEqual(typed['extra'].dtype, object)
+
+    def test_missing_values(self):
+        """Test missing ratings use the nullable integer type and bad dates become NaT."""
+        df = pd.DataFrame({'rating': [5, None], 'date': ['2024-01-01', 'not a date'], 'bank_name': ['cbe', None]})
+        typed = enforce_schema(df)
+        self.assertEqual(str(typed['rating'].dtype), 'Int8')
+        self.assertTrue(pd.isna(typed['date'].iloc[1]))
+        self.assertTrue(pd.isna(typed['bank_name'].iloc[1]))
+
+    def test_enforce_schema_is_idempotent(self):
+        """Test casting a typed frame again leaves it unchanged."""
+        typed = enforce_schema(self.df.drop(columns='extra'))
+        pd.testing.assert_frame_equal(enforce_schema(typed.copy()), typed)
+
+    def test_csv_round_trip_keeps_dates(self):
+        """Test typed frames still write YYYY-MM-DD dates to CSV."""
+        typed = enforce_schema(self.df.drop(columns='extra'))
+        self.assertIn('2024-01-05,cbe', typed.to_csv(index=False))
+
+    def test_memory_report(self):
+        """Test the report covers every column and shrinks after typing."""
+        df = pd.concat([self.df.drop(columns='extra')] * 200, ignore_index=True)
+        before = memory_report(df)
+        after = memory_report(enforce_schema(df.copy()))
+        self.assertEqual(before['rows'], 600)
+        self.assertEqual(set(after['columns']), set(df.columns))
+        self.assertEqual(after['columns']['rating']['dtype'], 'int8')
+        self.assertLess(after['total_mb'], before['total_mb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
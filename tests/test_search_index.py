@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.review_store import CsvReviewStore
+from src.search_index import ReviewSearchIndex, build_match_query
+
+
+class TestReviewSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'review_text': ["OTP never arrives, login failed", "Login works great", "Transfer failed twice",
+                            "otp code expired before login", "Nice app", "Login failing after update"],
+            'rating': [1, 5, 2, 1, 4, 2],
+            'date': ['2024-01-05', '2024-01-06', '2024-02-01', '2024-02-03', '2024-02-04', '2024-02-10'],
+            'bank_name': ['Dashen', 'Dashen', 'CBE', 'Dashen', 'BOE', 'CBE'],
+            'sentiment_label': ['NEGATIVE', 'POSITIVE', 'NEGATIVE', 'NEGATIVE', 'POSITIVE', 'NEGATIVE'],
+            'sentiment_score': [0.9, 0.8, 0.7, 0.95, 0.6, np.nan],
+            'keywords': ["otp login", "login", "transfer", "otp code login", "app", "login update"]
+        })
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = ReviewSearchIndex(os.path.join(self.tmp_dir, 'index.sqlite'))
+        self.index.add(self.df)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_match_query_quotes_words(self):
+        self.assertEqual(build_match_query('OTP/login fail*'), '"OTP" AND "login" AND "fail"*')
+        self.assertEqual(build_match_query('otp OR', match_all=False), '"otp" OR "OR"')
+        self.assertEqual(build_match_query(' ?! '), '')
+
+    def test_ranked_search_with_filters(self):
+        """Test matching is stemmed and case-insensitive and every filter applies."""
+        results = self.index.search('otp login', bank='dashen')
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results['rank'].is_monotonic_increasing)
+
+        failures = self.index.search('login fail')
+        self.assertEqual(set(failures['review_text']),
+                         {"OTP never arrives, login failed", "Login failing after update"})
+        self.assertEqual(len(self.index.search('login', start='2024-02-01', end='2024-02-28')), 2)
+        self.assertEqual(len(self.index.search('login', ratings=[5])), 1)
+        self.assertEqual(len(self.index.search('login', label='POSITIVE')), 1)
+        self.assertEqual(len(self.index.search('transfer otp', match_all=False)), 3)
+        self.assertEqual(len(self.index.search('log*', limit=2)), 2)
+
+    def test_filter_only_search_is_newest_first(self):
+        results = self.index.search('', label='NEGATIVE')
+        self.assertEqual(results['review_date'].tolist(), ['2024-02-10', '2024-02-03', '2024-02-01', '2024-01-05'])
+
+    def test_incremental_updates(self):
+        """Test re-adding is a no-op, analysis fills in processed rows and changes are reindexed."""
+        self.assertEqual(self.index.add(self.df), 0)
+
+        new = pd.DataFrame({'review_text': ["Balance not showing"], 'rating': [2], 'date': ['2024-03-01'],
+                            'bank_name': ['BOE']})
+        self.assertEqual(self.index.add(new), 1)
+        self.assertEqual(self.index.search('balance')['sentiment_label'].tolist(), [None])
+
+        analyzed = new.assign(sentiment_label='NEGATIVE', sentiment_score=0.8, keywords='balance statement')
+        self.assertEqual(self.index.add(analyzed), 1)
+        self.assertEqual(self.index.search('statement')['sentiment_label'].tolist(), ['NEGATIVE'])
+
+        self.assertEqual(self.index.add(new), 0)
+        self.assertEqual(self.index.search('statement')['sentiment_score'].tolist(), [0.8])
+        self.assertEqual(len(self.index), 7)
+
+    def test_add_store_and_meta_persist(self):
+        """Test a store stage can be indexed and meta markers survive reopening."""
+        store = CsvReviewStore(self.tmp_dir)
+        store.write(self.df, 'analyzed')
+        self.assertEqual(self.index.add_store(store, chunk_size=4), 0)
+        self.index.meta['chunks_done'] = 2
+        self.index.save()
+        reopened = ReviewSearchIndex(self.index.path)
+        self.assertEqual(reopened.meta, {'chunks_done': 2})
+        self.assertEqual(len(reopened), 6)
+        reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pandas as pd
+
+
+class FakePipeline:
+    """Stand-in for a transformers sentiment pipeline."""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, texts, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls.append(list(texts))
+        results = []
+        for text in texts:
+            if not isinstance(text, str) or text == self.fail_on:
+                raise ValueError("bad input")
+            label = 'NEGATIVE' if 'bad' in text else 'POSITIVE'
+            results.append({'label': label, 'score': 0.5 + len(text) / 1000})
+        return results
+
+
+fake_transformers = types.ModuleType('transformers')
+fake_transformers.pipeline = lambda *args, **kwargs: FakePipeline()
+
+from src.sentiment_analyzer import ANALYZED_AT, PARITY_SAMPLE, SentimentAnalyzer, check_parity, stamp_analyzed
+from src.sentiment_cache import SentimentCache
+
+# transformers is imported when a SentimentAnalyzer is built, so the fake stays installed for the module
+transformers_patch = patch.dict(sys.modules, {'transformers': fake_transformers})
+
+
+def setUpModule():
+    transformers_patch.start()
+
+
+def tearDownModule():
+    transformers_patch.stop()
+
+
+class TestSentimentAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an analyzer backed by the fake pipeline."""
+        self.analyzer = SentimentAnalyzer(batch_size=2)
+        self.df = pd.DataFrame({
+            'review_text': ["great app", "bad login", "a much longer review about a bad update", "ok"],
+            'bank_name': ['A', 'A', 'B', 'B'],
+            'rating': [5, 1, 2, 4]
+        }, index=[10, 3, 7, 1])
+
+    def test_batch_results_keep_row_order(self):
+        """Test batched results line up with the original rows."""
+        df, _ = self.analyzer.analyze_reviews(self.df.copy())
+        expected = [self.analyzer.analyze_sentiment(t) for t in self.df['review_text']]
+        self.assertEqual(df['sentiment_label'].tolist(), [e['label'] for e in expected])
+        # Scores are stored as float32
+        np.testing.assert_allclose(df['sentiment_score'], [e['score'] for e in expected], rtol=1e-6)
+
+    def test_batches_sorted_by_length(self):
+        """Test reviews are grouped into batches of similar length."""
+        self.analyzer.analyzer.calls.clear()
+        self.analyzer.analyze_sentiment_batch(self.df['review_text'].tolist())
+        self.assertEqual(self.analyzer.analyzer.calls[0], ["ok", "great app"])
+        self.assertEqual(len(self.analyzer.analyzer.calls), 2)
+
+    def test_batch_error_falls_back_per_row(self):
+        """Test a failing batch only marks the bad review as ERROR."""
+        self.analyzer.analyzer.fail_on = "bad login"
+        results = self.analyzer.analyze_sentiment_batch(["great app", "bad login", None])
+        self.assertEqual(results[0]['label'], 'POSITIVE')
+        self.assertEqual(results[1], {'label': 'ERROR', 'score': 0.0})
+        self.assertEqual(results[2], {'label': 'ERROR', 'score': 0.0})
+
+    def test_unbatched_mode(self):
+        """Test batch_size=1 keeps the one-review-per-call path."""
+        self.analyzer.analyzer.calls.clear()
+        df, agg = self.analyzer.analyze_reviews(self.df.copy(), batch_size=1)
+        self.assertEqual(len(self.analyzer.analyzer.calls), len(self.df))
+        self.assertEqual(len(agg), 4)
+
+    def test_unchanged_rows_keep_their_stamp(self):
+        """Test only new or re-labelled rows get a new analyzed_at."""
+        first, _ = self.analyzer.analyze_reviews(self.df.copy())
+        previous = first.astype({'sentiment_score': float}).assign(**{ANALYZED_AT: 'earlier'})
+        previous.loc[3, 'sentiment_label'] = 'POSITIVE'
+        previous = previous.drop(index=1)
+        stamped = stamp_analyzed(first.copy(), previous)
+        self.assertEqual(stamped[ANALYZED_AT].eq('earlier').to_dict(), {10: True, 3: False, 7: True, 1: False})
+
+    def test_non_english_rows_skipped(self):
+        """Test rows labelled non-English are not sent to the model."""
+        df = self.df.copy()
+        df['language'] = ['en', 'am', 'en', 'mixed']
+        self.analyzer.analyzer.calls.clear()
+        df, agg = self.analyzer.analyze_reviews(df)
+        sent = [text for call in self.analyzer.analyzer.calls for text in call]
+        self.assertEqual(sorted(sent), sorted(["great app", "a much longer review about a bad update"]))
+        self.assertEqual(df['sentiment_label'].tolist(), ['POSITIVE', 'SKIPPED', 'NEGATIVE', 'SKIPPED'])
+        self.assertTrue(df.loc[[3, 1], 'sentiment_score'].isna().all())
+        self.assertEqual(len(agg.dropna()), 2)
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_quantized_backend(self):
+        """Test the quantized backend quantizes Linear layers and keys the cache separately."""
+        transformers, torch = MagicMock(), MagicMock()
+        transformers.pipeline.return_value = FakePipeline()
+        torch.quantization.quantize_dynamic.return_value = 'int8 model'
+        with patch.dict(sys.modules, {'transformers': transformers, 'torch': torch}):
+            analyzer = SentimentAnalyzer(backend='quantized')
+        self.assertEqual(transformers.pipeline.call_args.kwargs['model'], 'int8 model')
+        args, kwargs = torch.quantization.quantize_dynamic.call_args
+        self.assertEqual(args[1], {torch.nn.Linear})
+        self.assertEqual(analyzer.analyze_sentiment("good")['label'], 'POSITIVE')
+        self.assertTrue(analyzer.model_id.endswith('@main+quantized'))
+        self.assertEqual(SentimentAnalyzer().model_id, f"{SentimentAnalyzer.model_name}@main")
+
+    def test_onnx_export_is_cached(self):
+        """Test the ONNX backend exports once and loads the saved model afterwards."""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        transformers, onnxruntime = MagicMock(), MagicMock()
+        transformers.pipeline.return_value = FakePipeline()
+        ort_model = onnxruntime.ORTModelForSequenceClassification
+
+        def save_pretrained(path):
+            os.makedirs(path)
+            open(os.path.join(path, 'model.onnx'), 'w').close()
+        ort_model.from_pretrained.return_value.save_pretrained.side_effect = save_pretrained
+
+        modules = {'transformers': transformers, 'optimum': MagicMock(), 'optimum.onnxruntime': onnxruntime}
+        with patch.dict(sys.modules, modules), patch('src.sentiment_analyzer.data_path',
+                                                     lambda *parts: os.path.join(tmp_dir, *parts)):
+            SentimentAnalyzer(backend='onnx')
+            SentimentAnalyzer(backend='onnx')
+        cache_dir = os.path.join(tmp_dir, 'onnx', f"{SentimentAnalyzer.model_name}@main")
+        first, second = ort_model.from_pretrained.call_args_list
+        self.assertTrue(first.kwargs['export'])
+        self.assertEqual(second.args, (cache_dir,))
+        self.assertTrue(os.path.exists(os.path.join(cache_dir, 'model.onnx')))
+
+    def test_unknown_backend(self):
+        """Test an unknown backend is rejected."""
+        with patch.dict(sys.modules, {'transformers': MagicMock()}):
+            with self.assertRaises(ValueError):
+                SentimentAnalyzer(backend='tpu')
+
+    def test_parity_report(self):
+        """Test parity compares labels and positive-class scores on the fixed sample."""
+        reference = SentimentAnalyzer()
+        candidate = SentimentAnalyzer()
+        report = check_parity(reference, candidate)
+        self.assertEqual(report['samples'], len(PARITY_SAMPLE))
+        self.assertEqual(report['label_agreement'], 1.0)
+        self.assertTrue(report['passed'])
+
+        candidate.analyzer = lambda texts, **kwargs: [
+            {'label': 'NEGATIVE', 'score': r['score']} for r in FakePipeline()(texts)
+        ]
+        report = check_parity(reference, candidate, texts=["good app", "nice"])
+        self.assertEqual(report['label_agreement'], 0.0)
+        self.assertFalse(report['passed'])
+
+
+class TestSentimentCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an in-memory cache."""
+        self.cache = SentimentCache(':memory:', max_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_hits_and_misses(self):
+        """Test cached texts are served and counted."""
+        self.cache.put_many(["good"], [{'label': 'POSITIVE', 'score': 0.9}], 'model@main')
+        hits = self.cache.get_many(["good", "new"], 'model@main')
+        self.assertEqual(hits, {0: {'label': 'POSITIVE', 'score': 0.9}})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_key_includes_model(self):
+        """Test results from another model revision are not served."""
+        self.cache.put_many(["good"], [{'label': 'POSITIVE', 'score': 0.9}], 'model@main')
+        self.assertEqual(self.cache.get_many(["good"], 'model@v2'), {})
+
+    def test_errors_not_cached(self):
+        """Test ERROR fallbacks are never stored."""
+        self.cache.put_many(["x"], [{'label': 'ERROR', 'score': 0.0}], 'model@main')
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted past the cap."""
+        self.cache.put_many(["a"], [{'label': 'POSITIVE', 'score': 0.1}], 'm')
+        self.cache.put_many(["b"], [{'label': 'POSITIVE', 'score': 0.2}], 'm')
+        self.cache.get_many(["a"], 'm')
+        self.cache.put_many(["c"], [{'label': 'POSITIVE', 'score': 0.3}], 'm')
+        self.assertEqual(sorted(self.cache.get_many(["a", "b", "c"], 'm')), [0, 2])
+
+    def test_analyzer_only_scores_misses(self):
+        """Test a second run sends nothing to the model."""
+        analyzer = SentimentAnalyzer(cache=self.cache)
+        df = pd.DataFrame({'review_text': ["good", "bad"], 'bank_name': ['A', 'A'], 'rating': [5, 1]})
+        first, _ = analyzer.analyze_reviews(df.copy())
+        analyzer.analyzer.calls.clear()
+        second, _ = analyzer.analyze_reviews(df.copy())
+        self.assertEqual(analyzer.analyzer.calls, [])
+        self.assertEqual(first['sentiment_score'].tolist(), second['sentiment_score'].tolist())
+
+    def test_injected_analyzer_bypasses_the_cache(self):
+        """Test results of an injected scorer never reach the shared cache."""
+        analyzer = SentimentAnalyzer(cache=self.cache, analyzer=FakePipeline())
+        self.assertIsNone(analyzer.cache)
+        analyzer.analyze_reviews(pd.DataFrame({'review_text': ["good"], 'bank_name': ['A'], 'rating': [5]}))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
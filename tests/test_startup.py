@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only load when a command actually needs them
+HEAVY_MODULES = ['transformers', 'torch', 'spacy', 'sklearn', 'scipy', 'matplotlib', 'seaborn', 'wordcloud']
+
+# Generous enough for a cold pandas import on a slow CI runner
+IMPORT_BUDGET_SECONDS = 3.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.cli, src.analyze_reviews, src.analysis_server, src.review_preprocessor
+import src.playstore_scraper, src.sentiment_analyzer, src.theme_analyzer, src.visualization
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % HEAVY_MODULES
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_imports_are_light(self):
+        """Test importing the package loads no model or plotting library and writes no files."""
+        with tempfile.TemporaryDirectory() as cwd:
+            result = subprocess.run(
+                [sys.executable, '-c', PROBE], cwd=cwd, capture_output=True, text=True,
+                env={**os.environ, 'PYTHONPATH': ROOT}, check=True
+            )
+            self.assertEqual(os.listdir(cwd), [])
+        report = json.loads(result.stdout)
+        self.assertEqual(report['loaded'], [])
+        self.assertLess(report['seconds'], IMPORT_BUDGET_SECONDS)
+
+    def test_cli_help(self):
+        """Test the CLI lists every pipeline command."""
+        result = subprocess.run([sys.executable, '-m', 'src', '--help'], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        for command in ('scrape', 'preprocess', 'analyze', 'load-db', 'plot', 'report', 'index', 'search', 'serve'):
+            self.assertIn(command, result.stdout)
+
+    def test_default_paths_share_the_data_root(self):
+        """Test every default path of every command lives under DATA_DIR."""
+        from src.cli import build_parser
+        from src.paths import DATA_DIR
+        parser = build_parser()
+        commands = parser._subparsers._group_actions[0].choices
+        defaults = {}
+        for name, command in commands.items():
+            for action in command._actions:
+                if action.dest in ('data_dir', 'raw_dir', 'output', 'aggregates', 'analyzed', 'input',
+                                   'index', 'cache'):
+                    defaults[f"{name} --{action.dest}"] = action.default
+        self.assertIn('scrape --raw_dir', defaults)
+        for option, default in defaults.items():
+            self.assertEqual(os.path.normpath(default).split(os.sep)[0], DATA_DIR, option)
+
+if __name__ == '__main__':
+    unittest.main()
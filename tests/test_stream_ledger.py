@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src.stream_ledger import StreamLedger, review_keys
+
+
+class TestStreamLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'nested', 'ledger.sqlite')
+        self.df = pd.DataFrame({'review_text': ["a", "b", "a", "c"], 'bank_name': ['cbe', 'cbe', 'boe', 'cbe']})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_keys_depend_on_text_and_bank(self):
+        keys = review_keys(self.df)
+        self.assertEqual(keys.dtype, 'int64')
+        self.assertEqual(keys.nunique(), 4)
+        self.assertEqual(review_keys(self.df.iloc[[1]]).iloc[0], keys.iloc[1])
+
+    def test_commit_and_reopen(self):
+        """Test committed keys and progress survive reopening."""
+        ledger = StreamLedger(self.path)
+        self.assertEqual(ledger.progress['batches_done'], 0)
+        keys = review_keys(self.df)
+        ledger.commit(keys.iloc[:2], {'batches_done': 1, 'rows_written': 2, 'output_bytes': 10,
+                                      'sentiment_totals': []})
+        ledger_id = ledger.ledger_id
+        ledger.close()
+
+        reopened = StreamLedger(self.path)
+        self.assertEqual(reopened.unseen(keys).tolist(), [False, False, True, True])
+        self.assertEqual((reopened.ledger_id, reopened.progress['rows_written'], len(reopened)), (ledger_id, 2, 2))
+        reopened.close()
+
+    def test_reset(self):
+        ledger = StreamLedger(self.path)
+        ledger_id = ledger.ledger_id
+        ledger.commit(review_keys(self.df), {'batches_done': 1, 'rows_written': 4, 'output_bytes': 10,
+                                             'sentiment_totals': []})
+        ledger.reset()
+        self.assertEqual((len(ledger), ledger.progress['batches_done']), (0, 0))
+        self.assertNotEqual(ledger.ledger_id, ledger_id)
+        ledger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import sys
+import types
+import unittest
+from unittest.mock import patch
+import pandas as pd
+# Imported up front so patch.dict below does not drop it from sys.modules
+import sklearn.feature_extraction.text  # noqa: F401
+
+
+class FakeToken:
+    def __init__(self, text):
+        self.text = text
+        # Capitalised words act as proper nouns, words ending in "s" as nouns
+        if text[:1].isupper():
+            self.pos_ = 'PROPN'
+        elif text.endswith('s') or text in ('app', 'login', 'transfer', 'money'):
+            self.pos_ = 'NOUN'
+        else:
+            self.pos_ = 'VERB'
+        self.is_stop = text.lower() in ('this', 'is', 'the')
+
+
+class FakeNlp:
+    """Whitespace-tokenising stand-in for a spaCy pipeline."""
+
+    def __init__(self):
+        self.pipe_calls = []
+
+    def __call__(self, text):
+        if not isinstance(text, str):
+            raise TypeError("text must be str")
+        return [FakeToken(word) for word in text.split()]
+
+    def pipe(self, texts, batch_size=1, n_process=1):
+        self.pipe_calls.append((batch_size, n_process))
+        for text in texts:
+            yield self(text)
+
+
+fake_spacy = types.ModuleType('spacy')
+fake_spacy.load = lambda *args, **kwargs: FakeNlp()
+
+from src.theme_analyzer import ThemeAnalyzer, ThemeTagger
+from src.theme_model import IncrementalThemeModel
+
+# spaCy is imported when a ThemeAnalyzer is built, so the fake stays installed for the module
+spacy_patch = patch.dict(sys.modules, {'spacy': fake_spacy})
+
+
+def setUpModule():
+    spacy_patch.start()
+
+
+def tearDownModule():
+    spacy_patch.stop()
+
+
+class TestThemeAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an analyzer backed by the fake spaCy pipeline."""
+        self.analyzer = ThemeAnalyzer(batch_size=8, n_process=2)
+        self.texts = ["Dashen app crashes on login", "this is slow", "transfer money fails", None]
+
+    def test_bulk_matches_per_review(self):
+        """Test bulk extraction returns the per-review keyword strings."""
+        expected = [self.analyzer.extract_keywords(text) for text in self.texts]
+        self.assertEqual(self.analyzer.extract_keywords_bulk(self.texts), expected)
+
+    def test_bulk_uses_pipe_settings(self):
+        """Test nlp.pipe receives the configured batch size and process count."""
+        self.analyzer.extract_keywords_bulk(self.texts)
+        self.assertEqual(self.analyzer.nlp.pipe_calls, [(8, 2)])
+
+    def test_identify_themes_sets_keywords(self):
+        """Test identify_themes fills the keywords column from bulk extraction."""
+        df = pd.DataFrame({
+            'review_text': ["app crashes on login", "transfer money fails", "Dashen login errors"],
+            'bank_name': ['A', 'A', 'B']
+        })
+        themes = self.analyzer.identify_themes(df)
+        self.assertEqual(df['keywords'].tolist(), ["app crashes login", "transfer money fails", "dashen login errors"])
+        self.assertIn('Account Access', themes['A'])
+        self.assertEqual(df['themes'].tolist(), ["Account Access;UI/UX;Performance", "Transaction", "Account Access;Performance"])
+
+    def test_identify_themes_skips_non_english(self):
+        """Test non-English rows get no keywords or themes."""
+        df = pd.DataFrame({
+            'review_text': ["app crashes on login", "ሎጊን አይሰራም", "transfer money fails"],
+            'bank_name': ['A', 'A', 'B'],
+            'language': ['en', 'am', 'en']
+        })
+        self.analyzer.identify_themes(df)
+        self.assertEqual(df['keywords'].tolist(), ["app crashes login", "", "transfer money fails"])
+        self.assertEqual(df['themes'].tolist(), ["Account Access;UI/UX;Performance", "", "Transaction"])
+
+    def test_identify_themes_updates_theme_model(self):
+        """Test a theme model accumulates reviews across calls instead of refitting."""
+        model = IncrementalThemeModel()
+        analyzer = ThemeAnalyzer(theme_model=model)
+        analyzer.identify_themes(pd.DataFrame({'review_text': ["login fails"], 'bank_name': ['A']}))
+        themes = analyzer.identify_themes(pd.DataFrame({'review_text': ["transfer money fails"], 'bank_name': ['B']}))
+        self.assertEqual(model.n_docs, 2)
+        self.assertEqual(set(themes), {'A', 'B'})
+        self.assertIn('Account Access', themes['A'])
+        self.assertIn('Transaction', themes['B'])
+
+    def test_groups_use_row_positions(self):
+        """Test per-bank keywords are right with a non-RangeIndex frame."""
+        df = pd.DataFrame({
+            'review_text': ["login login login", "transfer money", "app crashes", "money transfer"],
+            'bank_name': ['A', 'B', 'A', 'B'],
+        }, index=[40, 7, 19, 2])
+        themes = self.analyzer.identify_themes(df)
+        self.assertEqual(list(themes), ['A', 'B'])
+        self.assertEqual(themes['A']['Account Access'][0], 'login')
+        self.assertNotIn('Account Access', themes['B'])
+        self.assertIn('transfer', themes['B']['Transaction'])
+
+    def test_group_by_several_keys(self):
+        """Test grouping by bank x month gives tuple labels."""
+        df = pd.DataFrame({
+            'review_text': ["login fails", "transfer money", "app crashes"],
+            'bank_name': ['A', 'A', 'B'],
+            'date': pd.to_datetime(['2024-01-02', '2024-02-03', '2024-01-04'])
+        })
+        themes = self.analyzer.identify_themes(df, group_by=['bank_name', df['date'].dt.strftime('%Y-%m')])
+        self.assertEqual(list(themes), [('A', '2024-01'), ('A', '2024-02'), ('B', '2024-01')])
+        self.assertIn('Account Access', themes[('A', '2024-01')])
+
+    def test_top_keywords_match_full_sort(self):
+        """Test argpartition top-k equals a full sort of group sums."""
+        import numpy as np
+        from scipy import sparse
+        rng = np.random.default_rng(0)
+        matrix = sparse.random(50, 30, density=0.2, random_state=0, format='csr')
+        codes = rng.integers(0, 4, size=50)
+        names = np.array([f'f{i}' for i in range(30)])
+        top = self.analyzer._group_top_keywords(matrix, codes, 4, names, top_n=5)
+        for group in range(4):
+            sums = np.asarray(matrix[codes == group].sum(axis=0)).ravel()
+            expected = [i for i in np.argsort(-sums, kind='stable')[:5] if sums[i] > 0]
+            self.assertEqual(top[group], list(names[expected]))
+
+
+class TestThemeTagger(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a tagger with overlapping keywords across themes."""
+        self.tagger = ThemeTagger({
+            'Payments': ['pay', 'transfer'],
+            'Fees': ['payment fee', 'charge'],
+            'Access': ['login']
+        })
+
+    def test_match_word_starts_and_overlaps(self):
+        """Test keywords match at word starts and overlapping keywords all apply."""
+        self.assertEqual(self.tagger.match("The Payment fee is high"), ('Payments', 'Fees'))
+        self.assertEqual(self.tagger.match("LOGIN then transfers"), ('Payments', 'Access'))
+        self.assertEqual(self.tagger.match("repay nothing"), ())
+        self.assertEqual(self.tagger.match(None), ())
+
+    def test_tag_series(self):
+        """Test tag and tag_matrix keep the input index."""
+        texts = pd.Series(["login fails", "extra charge on transfer", "fine"], index=[5, 3, 9])
+        self.assertEqual(self.tagger.tag(texts).to_dict(), {5: "Access", 3: "Payments;Fees", 9: ""})
+        matrix = self.tagger.tag_matrix(texts)
+        self.assertEqual(list(matrix.columns), ['Payments', 'Fees', 'Access'])
+        self.assertEqual(matrix.loc[3].tolist(), [True, True, False])
+
+    def test_default_taxonomy_file(self):
+        """Test the bundled taxonomy loads with the original themes."""
+        tagger = ThemeTagger.from_file()
+        self.assertEqual(tagger.theme_ids, ['Account Access', 'Transaction', 'UI/UX', 'Support', 'Performance'])
+
+if __name__ == '__main__':
+    unittest.main()
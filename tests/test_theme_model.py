@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from scipy import sparse
+from src.theme_model import IncrementalThemeModel, top_keywords_by_row
+
+
+class TestIncrementalThemeModel(unittest.TestCase):
+
+    def setUp(self):
+        self.keywords = ["login error", "login otp", "transfer money", "transfer failed money",
+                         "app crash", "login app crash"]
+        self.banks = ['cbe', 'cbe', 'boe', 'boe', 'cbe', 'dashen']
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_same_state(self, left, right):
+        self.assertEqual(left.terms, right.terms)
+        self.assertEqual(left.group_labels, right.group_labels)
+        self.assertEqual(left.n_docs, right.n_docs)
+        np.testing.assert_array_equal(left.doc_freq, right.doc_freq)
+        np.testing.assert_array_equal(left.term_count, right.term_count)
+        np.testing.assert_allclose(left.group_tf.toarray(), right.group_tf.toarray())
+
+    def test_partial_fits_match_one_fit(self):
+        """Test folding in batches gives the state of one fit over all reviews."""
+        whole = IncrementalThemeModel().partial_fit(self.keywords, self.banks)
+        batched = IncrementalThemeModel()
+        batched.partial_fit(self.keywords[:2], self.banks[:2])
+        batched.partial_fit(self.keywords[2:], self.banks[2:])
+        self.assert_same_state(whole, batched)
+        self.assertEqual(whole.top_keywords(), batched.top_keywords())
+
+    def test_document_frequencies_and_bigrams(self):
+        """Test document frequencies count reviews, with bigrams and stop words dropped."""
+        model = IncrementalThemeModel().partial_fit(["the login is failing login", "login works"])
+        self.assertEqual(model.doc_freq[model.vocabulary['login']], 2)
+        self.assertEqual(model.term_count[model.vocabulary['login']], 3)
+        self.assertIn('login failing', model.vocabulary)
+        self.assertNotIn('the', model.vocabulary)
+        self.assertEqual(model.group_labels, [])
+
+    def test_top_keywords_per_group(self):
+        """Test each group's keywords come from its own reviews."""
+        top = IncrementalThemeModel().partial_fit(self.keywords, self.banks).top_keywords(top_n=3)
+        self.assertEqual(set(top), {'cbe', 'boe', 'dashen'})
+        self.assertIn('transfer', top['boe'])
+        self.assertNotIn('transfer', top['cbe'])
+        self.assertTrue(all(len(words) <= 3 for words in top.values()))
+
+    def test_max_features_limits_scored_terms(self):
+        """Test only the most frequent terms are scored."""
+        model = IncrementalThemeModel(max_features=1).partial_fit(self.keywords, self.banks)
+        scored = {model.terms[i] for i in np.flatnonzero(model.feature_mask())}
+        self.assertEqual(scored, {'login'})
+        self.assertTrue(set(sum(model.top_keywords().values(), [])) <= scored)
+
+    def test_transform_ignores_unknown_terms(self):
+        """Test transform uses the current vocabulary without growing it."""
+        model = IncrementalThemeModel().partial_fit(self.keywords, self.banks)
+        size = len(model.terms)
+        weights = model.transform(["login balance", None])
+        self.assertEqual(weights.shape, (2, size))
+        self.assertEqual(len(model.terms), size)
+        self.assertGreater(weights[0, model.vocabulary['login']], 0)
+        self.assertEqual(weights[1].nnz, 0)
+
+    def test_save_and_load(self):
+        """Test a saved model loads back with the same state and can keep updating."""
+        path = os.path.join(self.tmp_dir, 'nested', 'themes.npz')
+        model = IncrementalThemeModel().partial_fit(self.keywords, [('cbe', '2024-01')] * 6)
+        model.meta['chunks_done'] = 3
+        model.save(path)
+        loaded = IncrementalThemeModel.load(path)
+        self.assert_same_state(model, loaded)
+        self.assertEqual(loaded.group_labels, [('cbe', '2024-01')])
+        self.assertEqual(loaded.meta, {'chunks_done': 3})
+        loaded.partial_fit(["statement download"], [('cbe', '2024-02')])
+        self.assertEqual(loaded.n_docs, 7)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['themes.npz'])
+
+    def test_group_sums_stay_sparse(self):
+        """Test group sums are kept sparse across batches and match a single fit."""
+        whole = IncrementalThemeModel().partial_fit(self.keywords, self.banks)
+        batched = IncrementalThemeModel()
+        for keyword, bank in zip(self.keywords, self.banks):
+            batched.partial_fit([keyword], [bank])
+        self.assertTrue(sparse.issparse(batched.group_tf))
+        self.assertEqual(batched.group_tf.nnz, whole.group_tf.nnz)
+        self.assert_same_state(whole, batched)
+
+    def test_load_or_create(self):
+        model = IncrementalThemeModel.load_or_create(os.path.join(self.tmp_dir, 'missing.npz'), max_features=5)
+        self.assertEqual((model.n_docs, model.max_features), (0, 5))
+
+    def test_top_keywords_by_row_skips_zero_scores(self):
+        scores = np.array([[0.0, 2.0, 1.0], [0.0, 0.0, 0.0]])
+        self.assertEqual(top_keywords_by_row(scores, ['a', 'b', 'c'], top_n=3), [['b', 'c'], []])
+
+
+if __name__ == '__main__':
+    unittest.main()